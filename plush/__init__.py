@@ -2,6 +2,7 @@ from __future__ import absolute_import
 
 from .application import Plush
 from .deferred import Deferred
+from .params import Param
 from .request import Request
 from .server import Server
 
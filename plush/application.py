@@ -4,12 +4,17 @@ from collections import OrderedDict
 
 from tornado.ioloop import IOLoop
 
-from .deferred import Deferred
+from .deferred import Deferred, Debounced, Throttled, Batch
+from .wheel import TimingWheel
+from .scheduler import Job
+from .http import HTTPClient
 from .request import Request
 from .backend import Backend
 from .server import Server
-from .conf import Settings
-from .util.lang import tap, curry
+from .conf import Settings, SettingsWatcher
+from .metrics import metrics_endpoint
+from .decorators import cached, blocking, in_process
+from .util.lang import tap, curry, cachedproperty
 
 __all__ = "Plush".split()
 
@@ -31,17 +36,69 @@ class Plush(object):
     #: The default deffered class.
     deferred_class = Deferred
 
+    #: The default recurring job class.
+    job_class = Job
+
+    #: The default HTTP client class.
+    http_client_class = HTTPClient
+
+    #: The default timing wheel class.
+    timing_wheel_class = TimingWheel
+
     #: The default io loop class.
     io_loop_class = IOLoop
 
     def __init__(self, module_name, io_loop=None, **user_settings):
         self.module_name = module_name
-        self.io_loop = io_loop or self.io_loop_class.instance()
         self.settings = Settings(user_settings)
         self.routes = OrderedDict()
         self.transforms = []
         self.decorators = []
         self.mixins = []
+        self.jobs = []
+        self.settings_watcher = None
+
+        if io_loop is not None:
+            self.io_loop = io_loop
+
+    @cachedproperty
+    def io_loop(self):
+        '''
+        Returns the application IO loop.
+
+        Resolved on first use, so :meth:`run` can fork workers before any IO
+        loop is created.
+        '''
+
+        return self.io_loop_class.instance()
+
+    @cachedproperty
+    def timing_wheel(self):
+        '''
+        Returns the application timing wheel, ticking every `TIMING_WHEEL`
+        milliseconds.
+        '''
+
+        return self.timing_wheel_class(self.settings['TIMING_WHEEL'],
+                                       io_loop=self.io_loop)
+
+    @cachedproperty
+    def http(self):
+        '''
+        Returns the application HTTP client, shared by all of the requests.
+
+        Keeps at most `HTTP_MAX_PER_HOST` keep-alive connections per host and
+        times out after `HTTP_CONNECT_TIMEOUT` and `HTTP_REQUEST_TIMEOUT`
+        seconds by default.
+        '''
+
+        settings = self.settings
+
+        return self.http_client_class(
+            max_per_host=settings.get('HTTP_MAX_PER_HOST', 10),
+            connect_timeout=settings.get('HTTP_CONNECT_TIMEOUT', 20),
+            request_timeout=settings.get('HTTP_REQUEST_TIMEOUT', 20),
+            io_loop=self.io_loop)
 
     #: Features and customizations.
 
@@ -94,15 +151,62 @@ class Plush(object):
     def route(self, pattern, methods, **options):
         '''
         Routes a function accepting HTTP `pattern` and HTTP `methods`.
+
+        Functions routed for the same `pattern` with different `methods` are
+        served by a single request handler, so they must have the same
+        `mixins`. Routing a method again for the same pattern replaces the
+        previous function.
+
+        The supported `options` are:
+          * `decorators` - a list of decorators for the function.
+          * `mixins` - a list of mixins for the request handler.
+          * `params` - a mapping of parameter names to :class:`Param`
+                       instances or `type` callables. The request arguments
+                       are parsed to `request.params`, reporting all of the
+                       invalid ones in a single bad request.
+          * `cache` - the time to live of the cached `GET` responses in
+                      seconds or a mapping of :func:`cached` arguments.
+          * `blocking` - run the function in the application thread pool.
+                         See :func:`blocking`.
+          * `process` - run the function in the application process pool.
+                        See :func:`in_process`.
+          * `stream_body` - call the function once the request headers are
+                            in and hand it the body in chunks, through
+                            `request.body_stream`.
+          * `max_body_size` - reject the larger request bodies with
+                              `413 Request Entity Too Large`, without
+                              reading them.
         '''
 
         def wrapper(func):
-            self.routes[pattern] = func
+            table = self.routes.setdefault(pattern, OrderedDict())
+            for method in methods:
+                table[method] = func
 
             func.pattern = pattern
             func.methods = methods
             func.decorators = options.get('decorators', []) + self.decorators
             func.mixins = options.get('mixins', []) + self.mixins
+            func.filters = dict(before=[], after=[])
+            func.params = options.get('params')
+            func.body = {}
+
+            if 'stream_body' in options:
+                func.body['stream'] = options['stream_body']
+            if 'max_body_size' in options:
+                func.body['max_size'] = options['max_body_size']
+
+            cache = options.get('cache')
+            if cache:
+                func.decorators.insert(0, cached(**cache) if
+                                       isinstance(cache, dict) else
+                                       cached(cache))
+
+            if options.get('blocking'):
+                func.decorators.insert(0, blocking)
+
+            if options.get('process'):
+                func.decorators.insert(0, in_process)
 
             return func
 
@@ -120,12 +224,108 @@ class Plush(object):
     def defer(self, milliseconds, callback):
         '''
         Defers the execution of a `callback` for `milliseconds`.
+
+        If the `TIMING_WHEEL` setting is given, the callback is scheduled on
+        the application :class:`TimingWheel` with that resolution. Prefer it
+        for lots of deferreds, which are mostly canceled, like the idle
+        timeouts.
         '''
 
-        return self.deferred_class(milliseconds, callback, self.io_loop)
+        wheel = self.timing_wheel if self.settings.get('TIMING_WHEEL') else None
+
+        return self.deferred_class(milliseconds, callback, self.io_loop,
+                                   wheel=wheel)
 
     delay = defer
 
+    def debounce(self, milliseconds, callback=None):
+        '''
+        Wraps a `callback` to be called with the latest arguments only once
+        the calls have stopped for `milliseconds`.
+
+        Can be used as a decorator, if the `callback` is not given.
+        '''
+
+        if callback is None:
+            return curry(self.debounce, milliseconds)
+
+        return Debounced(milliseconds, callback, self.defer)
+
+    def throttle(self, milliseconds, callback=None):
+        '''
+        Wraps a `callback` to be called at most once every `milliseconds`,
+        with the latest arguments.
+
+        Can be used as a decorator, if the `callback` is not given.
+        '''
+
+        if callback is None:
+            return curry(self.throttle, milliseconds)
+
+        return Throttled(milliseconds, callback, self.defer)
+
+    def batch(self, max_items, max_delay, callback=None):
+        '''
+        Wraps a `callback` to be called with a list of the items it is called
+        with, once `max_items` are collected or `max_delay` milliseconds
+        after the first one.
+
+        Can be used as a decorator, if the `callback` is not given.
+        '''
+
+        if callback is None:
+            return curry(self.batch, max_items, max_delay)
+
+        return Batch(max_items, max_delay, callback, self.defer)
+
+    def every(self, milliseconds, callback=None, **options):
+        '''
+        Runs a `callback` every `milliseconds`. Returns a :class:`Job`.
+
+        The supported `options` are the ones of :class:`Job`: `jitter`,
+        `max_concurrent`, `overrun` and `asynchronous`.
+
+        The job starts right away if the IO loop is already in use. Otherwise
+        it starts in every worker once :meth:`run` serves. Can be used as a
+        decorator, if the `callback` is not given.
+        '''
+
+        if callback is None:
+            return lambda callback: self.every(milliseconds, callback,
+                                               **options)
+
+        job = self.job_class(milliseconds, callback, **options)
+        self.jobs.append(job)
+
+        if 'io_loop' in vars(self):
+            job.start(self.io_loop)
+
+        return job
+
+    def watch_settings(self, milliseconds=1000, validate=None):
+        '''
+        Reloads the settings from their files, if they changed, every
+        `milliseconds`. Returns the :class:`SettingsWatcher`.
+
+        The reloaded settings are checked with `validate`, if given. Subscribe
+        to the watcher to be notified about the changes of specific settings.
+        The served application reloads its configuration on every change.
+        '''
+
+        self.settings_watcher = SettingsWatcher(self.settings, validate)
+        self.every(milliseconds, self.settings_watcher.check)
+
+        return self.settings_watcher
+
+    def start_jobs(self):
+        '''
+        Starts the recurring jobs, which are not started yet.
+        '''
+
+        for job in self.jobs:
+            if not job.started:
+                job.start(self.io_loop)
+
     #: Filters.
 
     def filter(self, *functions, **options):
@@ -136,26 +336,24 @@ class Plush(object):
         the type of the filter will be.
 
         Types:
-          * before - runs the filter before the handler code
+          * before - runs the filter before the handler code. If it finishes
+                     the request, the handler is not run.
           * after  - runs the filter after the handler code, if it did not
                      raised an exception or explicitly returned a value.
 
+        The filters of a route are compiled with its handler into a single
+        flat pipeline when the application is prepared.
+
         You will rarely have to use it explicitly, use :meth:`before` and
         :meth:`after` instead.
         '''
 
-        from .decorators import before, after
-
         def wrapper(filter):
-            def decorate_safetly(func, action, filter):
-                func.decorators.append(lambda f: action(func)(filter))
-
             for func in functions:
                 if not hasattr(func, 'pattern') or func.pattern not in self.routes:
                     raise ValueError('Function %s is not routed' % func.__name__)
 
-                action = before if options['type'] == 'before' else after
-                decorate_safetly(func, action, filter)
+                func.filters[options['type']].append(filter)
 
             return filter
 
@@ -170,14 +368,36 @@ class Plush(object):
         '''
         Creates request handlers out of the currently routed functions and
         creates a backend tornado application to run with them.
+
+        If the `METRICS_PATH` setting is given, the metrics of the routes are
+        served there in the Prometheus text format.
         '''
 
         routes = []
 
-        for pattern, func in self.routes.iteritems():
-            kw = dict(decorators=func.decorators, mixins=func.mixins)
-            methods = dict((method, func) for method in func.methods)
-            request = self.request_class.from_function(func, methods, **kw)
+        if self.settings.get('METRICS_PATH'):
+            routes.append((self.settings['METRICS_PATH'],
+                           self.request_class.from_function(metrics_endpoint,
+                                                            ['GET'])))
+
+        for pattern, table in self.routes.iteritems():
+            handlers, body = {}, {}
+
+            # The mixins of one verb would apply to all of the others.
+            mixins = next(table.itervalues()).mixins
+            if any(set(func.mixins) != set(mixins)
+                   for func in table.itervalues()):
+                raise ValueError('The functions routed for %s have different '
+                                 'mixins' % pattern)
+
+            for method, func in table.iteritems():
+                handlers[method] = self.request_class.compile(
+                    func, func.decorators, params=func.params, **func.filters)
+                body[method] = func.body
+
+            name = next(table.itervalues()).__name__
+            request = self.request_class.from_methods(handlers, mixins, name,
+                                                      body)
 
             routes.append((pattern, request))
 
@@ -185,5 +405,40 @@ class Plush(object):
                                   transforms=self.transforms, plush=self)
 
     def run(self, **options):
-        server = self.server_class(self.prepare(), self.io_loop)
-        server.serve(**options)
+        '''
+        Prepares the application and serves it.
+
+        The `options` are passed to :meth:`Server.serve`. Use `workers` to
+        serve with many processes. Their metrics are dumped every
+        `METRICS_DUMP_INTERVAL` milliseconds to the `METRICS_DIR` directory, a
+        temporary one by default, and aggregated when served.
+
+        The sampled stacks of every worker are dumped to `PROFILE_DIR` every
+        `PROFILE_DUMP_INTERVAL` milliseconds, a minute by default.
+        '''
+
+        backend = self.prepare()
+
+        if backend.metrics is not None and options.get('workers', 1) != 1:
+            backend.metrics.share()
+            self.every(self.settings.get('METRICS_DUMP_INTERVAL', 1000),
+                       backend.metrics.dump)
+
+        if self.settings_watcher is not None:
+            self.settings_watcher.subscribe(
+                lambda changes: backend.reload(self.settings))
+
+        if backend.sampler is not None:
+            self.every(self.settings.get('PROFILE_DUMP_INTERVAL', 60000),
+                       backend.sampler.dump)
+
+        def on_ready():
+            # The interval timers are not inherited by the forked workers.
+            if backend.sampler is not None:
+                backend.sampler.start()
+
+            self.start_jobs()
+
+        # Do not resolve the IO loop here, forked workers need their own.
+        server = self.server_class(backend, vars(self).get('io_loop'))
+        server.serve(on_ready=on_ready, **options)
@@ -1,8 +1,18 @@
 from __future__ import absolute_import
 
-from tornado.web import Application, URLSpec
+import os
+import tempfile
+
+from tornado.web import Application, URLSpec, ChunkedTransferEncoding
 
 from .conf import Setting, SettingsView
+from .codec import codec_for
+from .routing import DispatchIndex
+from .cache import ResponseCache
+from .pool import ThreadPool, ProcessPool
+from .httpserver import BodyPolicy
+from .metrics import Metrics, DEFAULT_BUCKETS, route_label
+from .profiling import Profiler, Sampler
 
 
 class Configuration(SettingsView):
@@ -34,12 +44,74 @@ class Configuration(SettingsView):
     cookie_secret = Setting('COOKIE_SECRET')
     xsrf_cookies = Setting('XSRF_COOKIES')
 
+    json_codec = Setting('JSON_CODEC', 'json')
+    json_separators = Setting('JSON_SEPARATORS', (',', ':'), type=tuple)
+    json_allow_nan = Setting('JSON_ALLOW_NAN', True)
+
+    response_cache_size = Setting('RESPONSE_CACHE_SIZE', 16 * 1024 * 1024,
+                                  type=int)
+
+    thread_pool_size = Setting('THREAD_POOL_SIZE', 10, type=int)
+    thread_pool_queue = Setting('THREAD_POOL_QUEUE', 100, type=int)
+
+    process_pool_size = Setting('PROCESS_POOL_SIZE')
+    process_pool_queue = Setting('PROCESS_POOL_QUEUE', 100, type=int)
+
+    max_body_size = Setting('MAX_BODY_SIZE')
+    body_spool_size = Setting('BODY_SPOOL_SIZE', 1024 * 1024, type=int)
+
+    metrics_path = Setting('METRICS_PATH')
+    metrics_dir = Setting('METRICS_DIR')
+    metrics_buckets = Setting('METRICS_BUCKETS', DEFAULT_BUCKETS, type=tuple)
+
+    profile_secret = Setting('PROFILE_SECRET')
+    profile_dir = Setting('PROFILE_DIR', os.path.join(
+        tempfile.gettempdir(), 'plush-profiles-%d' % os.getuid()))
+    profile_sample_interval = Setting('PROFILE_SAMPLE_INTERVAL')
+
+
+def close_after(request):
+    '''
+    Closes the connection of a `request` once it is finished.
+    '''
+
+    if request.connection is not None:
+        request.connection.no_keep_alive = True
+
 
 class Backend(Application):
     '''
     Extended tornado application to support our custom routings.
+
+    The converted settings are kept in a frozen `config` snapshot, which is
+    swapped on :meth:`reload`.
+
+    Every host handlers group is backed by a :class:`DispatchIndex`, so the
+    route lookup does not scan the patterns one by one.
+
+    Keeps track of the in-flight requests, so a server can drain them.
+
+    Creates the JSON codec named by the `JSON_CODEC` setting, shared by the
+    requests, and the :class:`ResponseCache` of the cached routes, limited
+    to `RESPONSE_CACHE_SIZE` bytes.
+
+    Runs the blocking requests in a :class:`ThreadPool` of `THREAD_POOL_SIZE`
+    threads, which queues at most `THREAD_POOL_QUEUE` of them, and the CPU
+    bound ones in a :class:`ProcessPool` of `PROCESS_POOL_SIZE` processes, one
+    per core by default.
+
+    Records the :class:`Metrics` of every route, if the `METRICS_PATH`
+    setting is given.
+
+    Profiles the requests asking for it with a token signed with the
+    `PROFILE_SECRET` setting, if given, and samples the stacks every
+    `PROFILE_SAMPLE_INTERVAL` milliseconds of CPU time, if given. The
+    profiles are written to `PROFILE_DIR`.
     '''
 
+    #: The default route lookup index class.
+    dispatch_index_class = DispatchIndex
+
     def __init__(self, handlers=None, default_host='', transforms=None,
                  wsgi=False, settings=None, plush=None, **rest):
 
@@ -47,6 +119,123 @@ class Backend(Application):
         settings.update(rest)
 
         self.plush = plush
+        self.config = settings.freeze()
+        self.json_codec = codec_for(settings['json_codec'],
+                                    separators=settings['json_separators'],
+                                    allow_nan=settings['json_allow_nan'])
+        self.response_cache = ResponseCache(settings['response_cache_size'])
+        self.thread_pool = ThreadPool(settings['thread_pool_size'],
+                                      settings['thread_pool_queue'])
+        self.process_pool = ProcessPool(settings.get('process_pool_size'),
+                                        settings['process_pool_queue'])
+        self.metrics = Metrics(settings['metrics_buckets'],
+                               settings.get('metrics_dir')) \
+                       if settings.get('metrics_path') else None
+        self.profiler = Profiler(settings['profile_secret'],
+                                 settings['profile_dir']) \
+                        if settings.get('profile_secret') else None
+        self.sampler = Sampler(settings['profile_sample_interval'],
+                               settings['profile_dir']) \
+                       if settings.get('profile_sample_interval') else None
+        self.dispatch_indexes = {}
+        self.in_flight = set()
+        self.draining = False
+
+        # Tornado frames the responses of unknown length, e.g. the streamed
+        # ones, only with its default transforms.
+        if transforms is not None and \
+           ChunkedTransferEncoding not in transforms:
+            transforms = list(transforms) + [ChunkedTransferEncoding]
 
         Application.__init__(self, rest.pop('routes', None) or handlers,
                                    default_host, transforms, wsgi, **settings)
+
+    def add_handlers(self, host_pattern, host_handlers):
+        Application.add_handlers(self, host_pattern, host_handlers)
+
+        self.dispatch_indexes = dict(
+            (id(handlers), self.dispatch_index_class(handlers))
+            for (_, handlers) in self.handlers)
+
+    def _get_host_handlers(self, request):
+        handlers = Application._get_host_handlers(self, request)
+
+        if handlers is not None:
+            specs = self.dispatch_indexes[id(handlers)].lookup(request.path)
+            request.spec = specs[0]
+
+            return specs
+
+    def body_policy(self, request):
+        '''
+        Returns the :class:`BodyPolicy` of the route handling a `request`.
+
+        The routes can stream their bodies and limit their size. The bodies
+        are limited to `MAX_BODY_SIZE` by default and the ones larger than
+        `BODY_SPOOL_SIZE` are spooled to temporary files.
+        '''
+
+        spec = (self._get_host_handlers(request) or [None])[0]
+        policies = getattr(getattr(spec, 'handler_class', None),
+                           'BODY_POLICIES', {})
+        options = policies.get(request.method, {})
+
+        return BodyPolicy(options.get('stream', False),
+                          options.get('max_size',
+                                      self.config.get('max_body_size')),
+                          self.config.body_spool_size)
+
+    def reload(self, settings):
+        '''
+        Swaps the configuration snapshot for the one of new `settings`.
+
+        The snapshot and the tornado settings are each swapped with a single
+        assignment, so the requests never read half of a reload. The thread
+        pool is resized and the pool queues are limited in place. The caches
+        and codecs built out of the previous settings are kept, along with
+        their warm state.
+        '''
+
+        config = Configuration(settings)
+
+        settings = dict((name, value) for (name, value)
+                        in self.settings.iteritems() if name not in self.config
+                        or name in config)
+        settings.update(config)
+        self.settings = settings
+
+        self.thread_pool.resize(config['thread_pool_size'])
+        self.thread_pool.max_queue = config['thread_pool_queue']
+        self.process_pool.max_queue = config['process_pool_queue']
+
+        self.config = config.freeze()
+
+    def __call__(self, request):
+        self.in_flight.add(request)
+
+        if self.draining:
+            close_after(request)
+
+        return Application.__call__(self, request)
+
+    def log_request(self, handler):
+        self.in_flight.discard(handler.request)
+
+        if self.metrics is not None:
+            self.metrics.observe(
+                route_label(getattr(handler.request, 'spec', None)),
+                handler.get_status(), handler.request.request_time(),
+                getattr(handler, 'bytes_written', 0))
+
+        Application.log_request(self, handler)
+
+    def drain(self):
+        '''
+        Closes the connections of the in-flight and the upcoming requests once
+        they are finished, instead of keeping them alive.
+        '''
+
+        self.draining = True
+
+        for request in self.in_flight:
+            close_after(request)
@@ -0,0 +1,232 @@
+from __future__ import absolute_import
+
+import time
+from email.utils import parsedate_tz, mktime_tz, formatdate
+
+from .util.lru import LRUCache
+
+__all__ = "ResponseCache CachedResponse ResponseCapture".split()
+
+
+#: Headers which are generated per response and not replayed from the cache.
+UNCACHED_HEADERS = frozenset(['Server', 'Date', 'Content-Length', 'Etag',
+                              'Last-Modified'])
+
+
+def parse_http_date(value):
+    '''
+    Returns the timestamp of a HTTP date `value` or `None` if it is invalid.
+    '''
+
+    parsed = parsedate_tz(value or '')
+
+    return mktime_tz(parsed) if parsed else None
+
+
+class CachedResponse(object):
+    '''
+    Fully rendered response, stored in a :class:`ResponseCache`.
+    '''
+
+    __slots__ = 'headers list_headers body etag last_modified expires'.split()
+
+    def __init__(self, headers, list_headers, body, etag, last_modified,
+                 expires):
+        self.headers = headers
+        self.list_headers = list_headers
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def size(self):
+        '''
+        Returns the approximate size of the response in bytes.
+        '''
+
+        return len(self.body) + sum(len(name) + len(str(value)) for
+                                    (name, value) in self.headers)
+
+    def not_modified(self, request):
+        '''
+        Checks whether the `request` conditions are met by the response
+        validators, so it can be answered with 304.
+        '''
+
+        none_match = request.headers.get('If-None-Match')
+        if none_match is not None:
+            return none_match == '*' or self.etag in none_match
+
+        modified_since = parse_http_date(request.headers.get('If-Modified-Since'))
+        if modified_since is not None:
+            return self.last_modified <= modified_since
+
+        return False
+
+    def serve(self, handler):
+        '''
+        Sends the response through a request `handler` and finishes it.
+        '''
+
+        for name, value in self.headers:
+            handler.set_header(name, value)
+        for name, value in self.list_headers:
+            handler.add_header(name, value)
+
+        handler.set_header('Etag', self.etag)
+        handler.set_header('Last-Modified', formatdate(self.last_modified,
+                                                       usegmt=True))
+
+        if self.not_modified(handler.request):
+            handler.set_status(304)
+            handler.finish()
+        else:
+            handler.finish(self.body)
+
+
+def vary_names(handler):
+    '''
+    Returns the sorted, lower cased header names of the _Vary_ headers of a
+    handler response.
+    '''
+
+    values = [value for (name, value) in handler._list_headers
+              if name == 'Vary']
+    if 'Vary' in handler._headers:
+        values.append(handler._headers['Vary'])
+
+    return tuple(sorted(set(name.strip().lower() for value in values
+                            for name in value.split(',') if name.strip())))
+
+
+class Variants(object):
+    '''
+    The headers the responses stored for a cache key vary on.
+    '''
+
+    __slots__ = 'names expires'.split()
+
+    def __init__(self, names, expires):
+        self.names = names
+        self.expires = expires
+
+    def size(self):
+        return sum(len(name) for name in self.names) + 1
+
+    def key_for(self, handler, key):
+        return key + (tuple(handler.request.headers.get(name)
+                            for name in self.names),)
+
+
+class ResponseCache(object):
+    '''
+    In-process cache of rendered responses.
+
+    Keeps at most `max_bytes` of responses, evicting the least recently used
+    ones first, and drops responses once their time to live expires.
+    '''
+
+    DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, max_bytes=None):
+        self.responses = LRUCache(max_bytes or self.DEFAULT_MAX_BYTES,
+                                  weigh=lambda response: response.size())
+
+    def get(self, key):
+        '''
+        Returns the fresh response stored for `key` or `None`.
+        '''
+
+        response = self.responses.get(key)
+
+        if response is not None and response.expires <= time.time():
+            self.responses.pop(key)
+            return None
+
+        return response
+
+    def set(self, key, response):
+        self.responses.set(key, response)
+
+    def lookup(self, handler, key):
+        '''
+        Returns the fresh response stored for `key`, which matches the
+        request headers the response varies on, or `None`.
+        '''
+
+        variants = self.get(('variants', key))
+        if variants is None:
+            return None
+
+        return self.get(variants.key_for(handler, key))
+
+    def store(self, handler, key, response):
+        '''
+        Stores the `response` of a `handler` for `key`, along with the values
+        of the request headers it varies on.
+        '''
+
+        names = vary_names(handler)
+        if '*' in names:
+            return
+
+        variants = Variants(names, response.expires)
+
+        self.set(('variants', key), variants)
+        self.set(variants.key_for(handler, key), response)
+
+    def clear(self):
+        self.responses.clear()
+
+    def key_for(self, handler, vary=(), params=()):
+        '''
+        Creates the cache key of a request `handler`.
+
+        The key includes the request path and the values of the `vary`
+        request headers and the `params` arguments. If no `params` are given,
+        the whole query string is part of the key.
+        '''
+
+        request = handler.request
+
+        return (request.path if params else request.uri,
+                tuple(request.headers.get(header) for header in vary),
+                tuple(tuple(request.arguments.get(param, ()))
+                      for param in params))
+
+
+class ResponseCapture(object):
+    '''
+    Captures the response of a request handler to store it in a cache.
+    '''
+
+    def __init__(self, cache, key, ttl):
+        self.cache = cache
+        self.key = key
+        self.ttl = ttl
+
+    def store(self, handler):
+        '''
+        Stores the buffered response of a `handler`, if it is cacheable.
+
+        Only successful responses without cookies, which are not streamed,
+        are stored. The responses are stored per the values of the request
+        headers in their _Vary_ headers, e.g. per _Accept_ when the format
+        is negotiated. Sets the `Last-Modified` header of the response.
+        '''
+
+        if (handler.get_status() != 200 or handler._headers_written or
+            getattr(handler, '_new_cookie', None)):
+            return
+
+        now = int(time.time())
+
+        headers = [(name, value) for (name, value) in handler._headers.items()
+                   if name not in UNCACHED_HEADERS]
+        body = ''.join(handler._write_buffer)
+
+        handler.set_header('Last-Modified', formatdate(now, usegmt=True))
+
+        self.cache.store(handler, self.key, CachedResponse(
+            headers, list(handler._list_headers), body, handler.compute_etag(),
+            now, now + self.ttl))
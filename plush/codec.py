@@ -0,0 +1,183 @@
+from __future__ import absolute_import
+
+import json
+import datetime
+
+from tornado.escape import json_encode, json_decode
+
+__all__ = "Codec CODECS register_codec codec_for".split()
+
+try:
+    import simplejson
+except ImportError:
+    SIMPLEJSON_ENABLED = False
+else:
+    SIMPLEJSON_ENABLED = True
+
+try:
+    import ujson
+except ImportError:
+    UJSON_ENABLED = False
+else:
+    UJSON_ENABLED = True
+
+
+#: The registered codecs by name.
+CODECS = {}
+
+
+def register_codec(codec):
+    '''
+    Class decorator registering a `codec` class under its name.
+    '''
+
+    CODECS[codec.name] = codec
+
+    return codec
+
+
+def codec_for(name, **options):
+    '''
+    Creates the codec registered under `name` with `options`.
+
+    Raises ``ValueError`` if there is no such codec.
+    '''
+
+    try:
+        codec = CODECS[name]
+    except KeyError:
+        raise ValueError('Unsupported JSON codec %s. Supported ones are %r.' %
+                         (name, sorted(CODECS)))
+
+    return codec(**options)
+
+
+def encode_default(value):
+    '''
+    Encodes the common types, which are not JSON serializable by default.
+    '''
+
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    elif isinstance(value, (set, frozenset)):
+        return list(value)
+
+    raise TypeError('%r is not JSON serializable' % (value,))
+
+
+class Codec(object):
+    '''
+    The base class for the JSON encoder and decoder implementations.
+
+    Codecs output JSON as is. Use :meth:`encode_for_html` when the output may
+    end up in a HTML `<script>` tag.
+    '''
+
+    #: The name of the codec in the `JSON_CODEC` setting.
+    name = None
+
+    def __init__(self, separators=(',', ':'), allow_nan=True):
+        self.separators = tuple(separators)
+        self.allow_nan = allow_nan
+
+    def encode(self, value):
+        '''
+        Encodes a `value` to JSON.
+        '''
+
+        raise NotImplementedError
+
+    def decode(self, content):
+        '''
+        Decodes JSON `content` to a value.
+        '''
+
+        raise NotImplementedError
+
+    def encode_for_html(self, value):
+        '''
+        Encodes a `value` to JSON, which is safe to embed in HTML.
+        '''
+
+        return self.encode(value).replace('</', '<\\/')
+
+
+@register_codec
+class StandardCodec(Codec):
+    '''
+    Codec using the standard library `json` module.
+
+    The encoder is created once, so the C accelerated encoding is used for
+    the builtin types without any per call setup.
+    '''
+
+    name = 'json'
+
+    def __init__(self, **options):
+        Codec.__init__(self, **options)
+
+        self.encoder = json.JSONEncoder(separators=self.separators,
+                                        allow_nan=self.allow_nan,
+                                        default=encode_default)
+        self.decoder = json.JSONDecoder()
+
+    def encode(self, value):
+        return self.encoder.encode(value)
+
+    def decode(self, content):
+        return self.decoder.decode(content)
+
+
+@register_codec
+class TornadoCodec(Codec):
+    '''
+    Codec using the `tornado.escape` JSON functions.
+
+    Always escapes the output for HTML and ignores the options.
+    '''
+
+    name = 'tornado'
+
+    def encode(self, value):
+        return json_encode(value)
+
+    def decode(self, content):
+        return json_decode(content)
+
+    encode_for_html = encode
+
+
+if SIMPLEJSON_ENABLED:
+    @register_codec
+    class SimpleJSONCodec(StandardCodec):
+        '''
+        Codec using the `simplejson` package.
+        '''
+
+        name = 'simplejson'
+
+        def __init__(self, **options):
+            Codec.__init__(self, **options)
+
+            self.encoder = simplejson.JSONEncoder(separators=self.separators,
+                                                  allow_nan=self.allow_nan,
+                                                  default=encode_default)
+            self.decoder = simplejson.JSONDecoder()
+
+
+if UJSON_ENABLED:
+    @register_codec
+    class UltraJSONCodec(Codec):
+        '''
+        Codec using the `ujson` package.
+
+        Always outputs compact JSON and rejects NaN and infinities.
+        '''
+
+        name = 'ujson'
+
+        def encode(self, value):
+            return ujson.dumps(value)
+
+        def decode(self, content):
+            return ujson.loads(content)
@@ -1,6 +1,13 @@
 from __future__ import absolute_import
 
 import os
+import re
+import sys
+import marshal
+import hashlib
+import logging
+import tempfile
+import cPickle as pickle
 
 try:
     from importlib import import_module
@@ -8,8 +15,11 @@ except ImportError:
     from .util.compat.importlib import import_module
 
 from .util.lang import try_in_order, tap, identity, Sentinel
+from .util.lru import LRUCache
+from .util.fs import is_private_directory
 
-__all__ = "Setting Settings SettingsView".split()
+__all__ = "Setting Settings SettingsView FrozenSettings SettingsWatcher " \
+          "SettingsCache".split()
 
 try:
     import yaml
@@ -18,6 +28,12 @@ except ImportError:
 else:
     YAML_ENABLED = True
 
+    #: The fastest loader of the default `yaml.load` semantics.
+    YAMLLoader = getattr(yaml, 'CLoader', yaml.Loader)
+
+#: The setting names, which can be slots of :class:`FrozenSettings`.
+SLOT_NAME = re.compile(r'[A-Za-z]\w*\Z')
+
 
 class Setting(object):
     '''
@@ -49,14 +65,134 @@ class Setting(object):
         settings[self.name] = self.type(value)
 
 
+class SettingsCache(object):
+    '''
+    Cache of the compiled settings files in `directory`.
+
+    The Python files are cached as code objects and the YAML ones as the
+    loaded data. The cache entries are keyed by the file path, size and
+    modification time and are loaded with a single read.
+
+    Files, which can not be cached, e.g. YAML files with objects that can
+    not be pickled, are compiled every time. An unwritable `directory` or
+    one, which other users can write to, disables the caching.
+    '''
+
+    #: Changes with the format and the Python version, as the code objects do.
+    MAGIC = 'plush-settings-1-%d.%d' % sys.version_info[:2]
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path_for(self, filename):
+        return os.path.join(self.directory, '%s.cache' % hashlib.sha1(
+            os.path.abspath(filename)).hexdigest())
+
+    def load(self, filename, compile):
+        '''
+        Returns the cached result of `compile(filename)`, compiling and
+        caching it if the file changed.
+        '''
+
+        stat = os.stat(filename)
+        key = (self.MAGIC, stat.st_size, stat.st_mtime)
+        path = self.path_for(filename)
+
+        if self.trusted():
+            try:
+                with open(path, 'rb') as file:
+                    cached_key, format, payload = marshal.loads(file.read())
+
+                if cached_key == key:
+                    return payload if format == 'marshal' else \
+                           pickle.loads(payload)
+            except Exception:
+                pass
+
+        result = compile(filename)
+        self.store(path, key, result)
+
+        return result
+
+    def trusted(self):
+        '''
+        Checks whether the cache directory is private to the current user, as
+        the cached code is run.
+        '''
+
+        return is_private_directory(self.directory)
+
+    def store(self, path, key, result):
+        try:
+            entry = marshal.dumps((key, 'marshal', result))
+        except ValueError:
+            try:
+                entry = marshal.dumps((key, 'pickle', pickle.dumps(
+                    result, pickle.HIGHEST_PROTOCOL)))
+            except Exception:
+                return
+
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory, 0o700)
+            if not self.trusted():
+                return
+
+            temporary = '%s.%d' % (path, os.getpid())
+            with open(temporary, 'wb') as file:
+                file.write(entry)
+
+            os.rename(temporary, path)
+        except (IOError, OSError):
+            pass
+
+
+def compile_pyfile(filename):
+    with open(filename) as file:
+        return compile(file.read(), filename, 'exec', 0, True)
+
+
+def load_yaml(filename):
+    with open(filename) as file:
+        return yaml.load(file, Loader=YAMLLoader)
+
+
 class Settings(dict):
     '''
     The settings container object.
 
     Supports `dot notation`, meaning that you can get elements like attributes
     and creation from a YAML markup.
+
+    Remembers the files it is loaded from in `sources`, as pairs of a loader
+    method name and a file name, so a :class:`SettingsWatcher` can reload
+    them.
+
+    The compiled files are cached in `file_cache`, so the workers and the
+    restarts do not parse them again. Set the `PLUSH_SETTINGS_CACHE`
+    environment variable to change the cache directory or set `file_cache`
+    to `None` to disable the caching.
     '''
 
+    #: The :class:`SettingsCache` of the compiled settings files.
+    file_cache = SettingsCache(os.environ.get(
+        'PLUSH_SETTINGS_CACHE', os.path.join(tempfile.gettempdir(),
+                                             'plush-settings-%d' %
+                                             os.getuid())))
+
+    #: The loader method names by file extension.
+    LOADERS = {
+        '.py': 'from_pyfile',
+        '.yml': 'from_yaml',
+        '.yaml': 'from_yaml',
+    }
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+
+        self.sources = []
+        self.base = {}
+
     if YAML_ENABLED:
         def from_yaml(self, markup, filename=True):
             '''
@@ -67,8 +203,13 @@ class Settings(dict):
             if not filename:
                 return tap(self, lambda self: self.update(yaml.load(markup)))
 
-            with open(markup) as file:
-                return tap(self, lambda self: self.update(yaml.load(file)))
+            values = self.compile(markup, load_yaml)
+
+            self.remember_base()
+            self.update(values)
+            self.sources.append(('from_yaml', markup))
+
+            return self
     else:
         def from_yaml(self, markup, filename=True):
             raise NotImplementedError("You need pyyaml for this.")
@@ -77,13 +218,25 @@ class Settings(dict):
         '''
         Creates a :class:`Settings` object from the environment variable
         `envar` pointing to a Python file, Python module or YAML file.
+
+        The files are loaded by their extension, see `LOADERS`. The files
+        with other extensions are tried as Python and then as YAML. Anything
+        else is imported as a module.
         '''
 
         if envar not in os.environ:
             raise ValueError("Expected %s in environment" % envar)
 
-        return try_in_order(self.from_pyfile, self.from_yaml, self.from_module,
-                            args=(os.environ[envar],))
+        source = os.environ[envar]
+        extension = os.path.splitext(source)[1].lower()
+
+        if extension in self.LOADERS and os.path.isfile(source):
+            return getattr(self, self.LOADERS[extension])(source)
+        elif os.path.isfile(source):
+            return try_in_order(self.from_pyfile, self.from_yaml,
+                                args=(source,))
+        else:
+            return self.from_module(source)
 
     def from_pyfile(self, filename):
         '''
@@ -91,9 +244,32 @@ class Settings(dict):
         '''
 
         namespace = {}
-        execfile(filename, namespace)
+        exec self.compile(filename, compile_pyfile) in namespace
+
+        self.remember_base()
+        self.update(namespace)
+        self.sources.append(('from_pyfile', filename))
+
+        return self
+
+    def remember_base(self):
+        '''
+        Remembers the settings as they were before the first file was
+        loaded, e.g. the ones given to :class:`plush.Plush`, in `base`.
+        '''
+
+        if not self.sources:
+            self.base = dict(self)
+
+    def compile(self, filename, compile):
+        '''
+        Returns `compile(filename)`, through the `file_cache` if enabled.
+        '''
 
-        return tap(self, lambda self: self.update(namespace))
+        if self.file_cache is None:
+            return compile(filename)
+
+        return self.file_cache.load(filename, compile)
 
     def from_object(self, obj):
         '''
@@ -127,6 +303,13 @@ class Settings(dict):
 
         return any(opt in self for opt in options)
 
+    def freeze(self):
+        '''
+        Returns a :class:`FrozenSettings` snapshot of the settings.
+        '''
+
+        return FrozenSettings(self)
+
     def __getattr__(self, attr):
         try:
             return self[attr]
@@ -134,6 +317,97 @@ class Settings(dict):
             raise AttributeError(exc)
 
 
+class FrozenSettings(object):
+    '''
+    Immutable snapshot of settings.
+
+    Every setting named like an identifier is a slot, so reading it costs a
+    single attribute load. The settings named like the snapshot methods,
+    e.g. `get`, are not. All of the settings can be read as items, too.
+    Settings missing from the snapshot raise `AttributeError` and `KeyError`.
+    '''
+
+    __slots__ = ('_items',)
+
+    #: The most recently generated classes, by their setting names.
+    _classes = LRUCache(32)
+
+    def __new__(cls, items):
+        names = tuple(sorted(name for name in items if is_slot_name(name)))
+
+        snapshot_class = cls._classes.get(names)
+        if snapshot_class is None:
+            snapshot_class = type(cls.__name__, (cls,), dict(__slots__=names))
+            cls._classes.set(names, snapshot_class)
+
+        snapshot = object.__new__(snapshot_class)
+        object.__setattr__(snapshot, '_items', dict(items))
+        for name in names:
+            object.__setattr__(snapshot, name, items[name])
+
+        return snapshot
+
+    def __setattr__(self, name, value):
+        raise TypeError('%s is immutable' % type(self).__name__)
+
+    __delattr__ = __setattr__
+
+    def __getitem__(self, name):
+        return self._items[name]
+
+    def __contains__(self, name):
+        return name in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, name, default=None):
+        return self._items.get(name, default)
+
+    def keys(self):
+        return self._items.keys()
+
+    def items(self):
+        return self._items.items()
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self._items)
+
+
+def is_slot_name(name):
+    '''
+    Checks whether a setting `name` can be a slot of :class:`FrozenSettings`.
+    '''
+
+    return (isinstance(name, str) and SLOT_NAME.match(name) is not None and
+            name not in RESERVED_NAMES)
+
+
+#: The names of the :class:`FrozenSettings` attributes, which the settings
+#: can not shadow.
+RESERVED_NAMES = frozenset(dir(FrozenSettings))
+
+
+def setting_names_of(cls):
+    '''
+    Returns the names of the :class:`Setting` descriptors of a class.
+    '''
+
+    names = set()
+
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).iteritems():
+            if isinstance(value, Setting):
+                names.add(name)
+            else:
+                names.discard(name)
+
+    return sorted(names)
+
+
 class SettingsView(dict):
     '''
     Settings view represents a collection of setting descriptors, linked to a
@@ -143,15 +417,137 @@ class SettingsView(dict):
     because we forward the descriptors.
     '''
 
+    #: The names of the setting descriptors, by view class.
+    _setting_names = {}
+
     def __init__(self, settings):
         dict.__init__(self)
 
         self.settings = settings
 
-        class_attrs, dict_attrs = dir(type(self)), dir(dict)
-        possibilities = set(class_attrs).difference(dict_attrs)
+        cls = type(self)
+        if cls not in self._setting_names:
+            self._setting_names[cls] = setting_names_of(cls)
 
-        for name in possibilities:
+        for name in self._setting_names[cls]:
             setting = getattr(self, name)
             if setting is not Sentinel:
                 self[name] = setting
+
+    def freeze(self):
+        '''
+        Returns a :class:`FrozenSettings` snapshot of the converted settings.
+        '''
+
+        return FrozenSettings(self)
+
+
+class SettingsWatcher(object):
+    '''
+    Reloads the settings from their file `sources` once the files change.
+
+    Call :meth:`check` periodically, e.g. with :meth:`plush.Plush.every`. It
+    compares the modification times and the sizes of the files, which is
+    cheap, and reloads them only if they differ. The reloaded settings are
+    checked with the `validate` callable, if given, which should raise on
+    invalid settings. Invalid or unreadable files are logged and the current
+    settings are kept.
+
+    Only the changed settings are applied and the subscribers of those are
+    notified. The settings removed from the files fall back to the values
+    they had before the files were loaded, if any.
+    '''
+
+    def __init__(self, settings, validate=None):
+        self.settings = settings
+        self.validate = validate
+        self.subscribers = []
+        self.stats = self.stat()
+        self.loaded = self.load()
+
+    def subscribe(self, callback, *names):
+        '''
+        Calls `callback` with the changes of the settings `names`, or of all
+        of the settings if no names are given, on every reload.
+
+        The changes are a mapping of the setting names to pairs of their old
+        and new values. The removed settings have new values of `None`,
+        unless they fall back to their values from before the files.
+        '''
+
+        self.subscribers.append((callback, frozenset(names)))
+
+        return callback
+
+    def stat(self):
+        stats = []
+
+        for _, filename in self.settings.sources:
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                stats.append(None)
+            else:
+                stats.append((stat.st_mtime, stat.st_size))
+
+        return stats
+
+    def load(self):
+        settings = Settings()
+
+        for loader, filename in self.settings.sources:
+            getattr(settings, loader)(filename)
+
+        return settings
+
+    def check(self):
+        '''
+        Reloads the settings if their files changed. Returns the changes.
+        '''
+
+        stats = self.stat()
+        if stats == self.stats:
+            return {}
+
+        self.stats = stats
+
+        try:
+            loaded = self.load()
+            if self.validate is not None:
+                self.validate(loaded)
+        except Exception:
+            logging.exception('Could not reload the settings, keeping them')
+            return {}
+
+        changes = {}
+
+        for name in set(self.loaded).union(loaded):
+            if name not in loaded:
+                if name in self.settings.base:
+                    base = self.settings.base[name]
+                    changes[name] = (self.settings.get(name), base)
+                    self.settings[name] = base
+                else:
+                    changes[name] = (self.settings.pop(name, None), None)
+            elif name not in self.loaded or self.loaded[name] != loaded[name]:
+                changes[name] = (self.settings.get(name), loaded[name])
+                self.settings[name] = loaded[name]
+
+        self.loaded = loaded
+
+        if changes:
+            self.notify(changes)
+
+        return changes
+
+    def notify(self, changes):
+        for callback, names in self.subscribers:
+            selected = dict((name, change) for (name, change)
+                            in changes.iteritems()
+                            if not names or name in names)
+
+            if selected:
+                try:
+                    callback(selected)
+                except Exception:
+                    logging.exception('Error notifying about settings changes')
@@ -1,8 +1,41 @@
+import sys
+import inspect
 import functools
+import threading
+from types import GeneratorType
 
+from tornado import gen
 from tornado.web import asynchronous, addslash, removeslash, authenticated
 
 from .response import Error
+from .cache import ResponseCapture
+from .pool import PoolSaturated
+
+
+#: The request, whose method the current pool thread runs, if any.
+offloaded = threading.local()
+
+
+class OffloadedError(Exception):
+    '''
+    Raised by :meth:`Request.error` in a pool thread to send the `error` on
+    the IO loop instead.
+    '''
+
+    def __init__(self, error, status_code):
+        Exception.__init__(self, error, status_code)
+
+        self.error = error
+        self.status_code = status_code
+
+
+def offloaded_request():
+    '''
+    Returns the request, whose method the current thread runs in a pool, if
+    any.
+    '''
+
+    return getattr(offloaded, 'request', None)
 
 def before(method):
     '''
@@ -41,3 +74,260 @@ def after(method):
             return result
         return wrapper
     return decorator
+
+
+def pipeline(handler, before=(), after=(), coroutine=False):
+    '''
+    Compiles the `before` filters, the `handler` and the `after` filters into
+    a single flat function.
+
+    The filters and the handler are called with the exact signature of the
+    compiled function. The semantics are the ones of :func:`before` and
+    :func:`after`, but without a wrapper frame per filter:
+
+      * The `before` filters are called in order. Their return values are
+        ignored, but if one of them finishes the request, the rest of the
+        pipeline is short-circuited.
+      * The `after` filters are called in order, only while the handler and
+        the previous filters return `None` and the request is not finished.
+        They are called once the handler returns, so before an asynchronous
+        handler completes.
+
+    If the handler or any of the filters is a generator function, they are
+    compiled to a coroutine instead. See :func:`coroutine_pipeline`. Pass a
+    truthful `coroutine` if the handler is a decorated generator function.
+
+    Returns the `handler` itself if there are no filters.
+    '''
+
+    before, after = tuple(before), tuple(after)
+
+    if coroutine or any(map(inspect.isgeneratorfunction,
+                            before + (handler,) + after)):
+        return coroutine_pipeline(handler, before, after)
+
+    if not before and not after:
+        return handler
+
+    @functools.wraps(handler)
+    def compiled(self, *args, **kwargs):
+        for filter in before:
+            filter(self, *args, **kwargs)
+            if self._finished:
+                return
+
+        result = handler(self, *args, **kwargs)
+
+        for filter in after:
+            if result is not None or self._finished:
+                break
+            result = filter(self, *args, **kwargs)
+
+        return result
+
+    return compiled
+
+
+def coroutine_pipeline(handler, before=(), after=()):
+    '''
+    Compiles the `before` filters, the `handler` and the `after` filters into
+    a single coroutine, driven on the IO loop by :func:`tornado.gen.engine`.
+
+    Every generator function in the pipeline is a coroutine, which can yield
+    the :mod:`tornado.gen` yield points, like `gen.Task`. The semantics of
+    the filters are the ones of :func:`pipeline`.
+
+    The request is finished once the pipeline is over, unless it is already
+    finished or a part of it is `asynchronous`, like in a regular handler.
+    '''
+
+    steps = ([('before', filter) for filter in before] +
+             [('handler', handler)] +
+             [('after', filter) for filter in after])
+
+    @functools.wraps(handler)
+    @asynchronous
+    @gen.engine
+    def compiled(self, *args, **kwargs):
+        # A step, which turns off the auto finishing, finishes on its own.
+        # The flag is kept off whenever the control goes back to tornado.
+        manual, result = False, None
+
+        for kind, step in steps:
+            if kind == 'after' and (result is not None or self._finished):
+                break
+
+            self._auto_finish = True
+            result = step(self, *args, **kwargs)
+            manual = manual or not self._auto_finish
+
+            if isinstance(result, GeneratorType):
+                # Delegate the yield points of the step to the engine.
+                coroutine, result = result, None
+                sent, thrown = None, None
+
+                while True:
+                    self._auto_finish = True
+                    try:
+                        if thrown is None:
+                            yielded = coroutine.send(sent)
+                        else:
+                            yielded = coroutine.throw(*thrown)
+                    except StopIteration:
+                        break
+                    finally:
+                        manual = manual or not self._auto_finish
+                        self._auto_finish = False
+
+                    try:
+                        sent, thrown = (yield yielded), None
+                    except Exception:
+                        sent, thrown = None, sys.exc_info()
+
+            self._auto_finish = False
+
+            if kind == 'before' and self._finished:
+                break
+
+        if not manual and not self._finished:
+            self.finish()
+
+    return compiled
+
+
+def cached(ttl, vary=(), params=(), cache=None):
+    '''
+    Decorates a request method to cache its responses for `ttl` seconds.
+
+    Only the successful `GET` responses without cookies are cached. Cache hits
+    are served without calling the method or the after filters and honor the
+    `If-None-Match` and `If-Modified-Since` request headers.
+
+    The responses are keyed by the request URI. If `params` are given, only
+    the path and the values of these arguments are in the key. The values of
+    the `vary` request headers are in the key too, as well as the ones of
+    the headers in the _Vary_ headers of the response.
+
+    The responses are stored in the `cache` or in the application
+    `response_cache`.
+    '''
+
+    vary, params = tuple(vary), tuple(params)
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.request.method != 'GET':
+                return method(self, *args, **kwargs)
+
+            store = cache or self.application.response_cache
+            key = store.key_for(self, vary, params)
+
+            response = store.lookup(self, key)
+            if response is not None:
+                # Served, so the after filters of the route are skipped.
+                response.serve(self)
+                return response
+
+            self.response_capture = ResponseCapture(store, key, ttl)
+
+            return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def send_result(request, result):
+    '''
+    Sends the `result` of an offloaded request method and finishes the
+    `request`, unless the sending is asynchronous.
+    '''
+
+    request._auto_finish = True
+
+    if result is not None:
+        request.send(result)
+
+    if request._auto_finish and not request._finished:
+        request.finish()
+
+
+def blocking(method):
+    '''
+    Decorates a request method to run in the application thread pool, so its
+    blocking calls do not stall the IO loop.
+
+    The method can not flush or finish the request, as the IO stream is not
+    thread-safe. Its return value is sent with :meth:`Request.send` on the
+    IO loop, which then finishes the request. The errors it sends, e.g. with
+    :meth:`Request.error` or :meth:`Request.param`, stop it and are sent on
+    the IO loop, as the exceptions it raises are. Responds with `503 Service
+    Unavailable`, if the pool is saturated.
+    '''
+
+    @functools.wraps(method)
+    @asynchronous
+    def wrapper(self, *args, **kwargs):
+        def call():
+            offloaded.request = self
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                offloaded.request = None
+
+        def done(result, exc_info):
+            if exc_info is not None:
+                if isinstance(exc_info[1], OffloadedError):
+                    return self.error(exc_info[1].error,
+                                      exc_info[1].status_code)
+
+                raise exc_info[0], exc_info[1], exc_info[2]
+
+            send_result(self, result)
+
+        try:
+            self.application.thread_pool.submit(call, done, self.io_loop)
+        except PoolSaturated, error:
+            self.error(error)
+    return wrapper
+
+
+def in_process(method):
+    '''
+    Decorates a request method to run in the application process pool, so
+    the CPU bound work does not stall the IO loop.
+
+    The method is called in a pool process with a picklable
+    :class:`RequestSnapshot` instead of the request and with the request
+    path arguments. It has to be an importable function, so this should be
+    its innermost decorator. Its return value is pickled back and sent with
+    :meth:`Request.send` on the IO loop, which then finishes the request.
+
+    The task is canceled if the client disconnects, terminating the pool
+    process if it is already running. Responds with `503 Service
+    Unavailable`, if the pool is saturated.
+    '''
+
+    @functools.wraps(method)
+    @asynchronous
+    def wrapper(self, *args, **kwargs):
+        def done(result, error):
+            if self._finished:
+                return
+            if error is not None:
+                raise error
+
+            send_result(self, result)
+
+        try:
+            task = self.application.process_pool.submit(
+                method, done, (self.snapshot(),) + args, kwargs, self.io_loop)
+        except PoolSaturated, error:
+            return self.error(error)
+
+        def on_close():
+            task.cancel()
+            self.on_connection_close()
+
+        if self.request.connection is not None:
+            self.request.connection.stream.set_close_callback(on_close)
+    return wrapper
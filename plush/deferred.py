@@ -1,3 +1,4 @@
+import time
 from datetime import timedelta as delta
 
 from tornado import stack_context
@@ -10,20 +11,32 @@ class Deferred(object):
 
     It executes a `callback` at a given `deadline` of milliseconds.
     Can be canceled, if not already executed, with :meth:`cancel`.
+
+    If a `wheel` is given, the callback is scheduled on that
+    :class:`TimingWheel` instead of the IO loop timeouts heap.
     '''
 
     io_loop_class = IOLoop
 
-    def __init__(self, deadline, callback, io_loop=None):
+    def __init__(self, deadline, callback, io_loop=None, wheel=None):
         self.io_loop = io_loop or self.io_loop_class.instance()
-        self.timeout = self.io_loop.add_timeout(delta(milliseconds=deadline),
-                                                stack_context.wrap(callback))
+        self.wheel = wheel
+
+        if wheel is not None:
+            self.timeout = wheel.schedule(deadline,
+                                          stack_context.wrap(callback))
+        else:
+            self.timeout = self.io_loop.add_timeout(
+                delta(milliseconds=deadline), stack_context.wrap(callback))
 
     def cancel(self):
         '''
         Cancels the current deferred object.
         '''
 
+        if self.wheel is not None:
+            return self.timeout.cancel()
+
         return self.io_loop.remove_timeout(self.timeout)
 
     def cancel_if(self, condition):
@@ -33,3 +46,138 @@ class Deferred(object):
 
         if condition:
             return self.cancel()
+
+
+class Debounced(object):
+    '''
+    Calls a `callback` with the latest arguments once the calls have stopped
+    for `wait` milliseconds.
+
+    Keeps at most one deferred per burst of calls, which is rescheduled for
+    the rest of the wait when it fires too early.
+    '''
+
+    def __init__(self, wait, callback, defer=Deferred):
+        self.wait = wait
+        self.callback = callback
+        self.defer = defer
+        self.deferred = None
+        self.arguments = None
+        self.called = None
+
+    def __call__(self, *args, **kwargs):
+        self.arguments = (args, kwargs)
+        self.called = time.time()
+
+        if self.deferred is None:
+            self.deferred = self.defer(self.wait, self.fire)
+
+    def fire(self):
+        remaining = self.wait - (time.time() - self.called) * 1000
+        if remaining > 0:
+            self.deferred = self.defer(remaining, self.fire)
+        else:
+            self.flush()
+
+    @property
+    def pending(self):
+        return self.arguments is not None
+
+    def flush(self):
+        '''
+        Calls the `callback` right away, if there is a pending call.
+        '''
+
+        self.cancel()
+
+        if self.arguments is not None:
+            (args, kwargs), self.arguments = self.arguments, None
+            self.callback(*args, **kwargs)
+
+    def cancel(self):
+        '''
+        Cancels the scheduled call, keeping the pending arguments.
+        '''
+
+        if self.deferred is not None:
+            self.deferred.cancel()
+            self.deferred = None
+
+
+class Throttled(Debounced):
+    '''
+    Calls a `callback` at most once every `wait` milliseconds.
+
+    The first call goes through right away. The calls made during the wait
+    are collapsed into a single one with the latest arguments at its end.
+    '''
+
+    def __call__(self, *args, **kwargs):
+        self.arguments = (args, kwargs)
+
+        if self.deferred is not None:
+            return
+
+        elapsed = (time.time() - (self.called or 0)) * 1000
+        if elapsed >= self.wait:
+            self.flush()
+        else:
+            self.deferred = self.defer(self.wait - elapsed, self.fire)
+
+    def fire(self):
+        self.deferred = None
+        self.flush()
+
+    def flush(self):
+        if self.arguments is not None:
+            self.called = time.time()
+
+        Debounced.flush(self)
+
+
+class Batch(object):
+    '''
+    Collects items and calls a `callback` with them as a single list.
+
+    The `callback` is called once `max_items` are collected or `max_delay`
+    milliseconds after the first item of the batch, whatever comes first.
+    '''
+
+    def __init__(self, max_items, max_delay, callback, defer=Deferred):
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.callback = callback
+        self.defer = defer
+        self.deferred = None
+        self.items = []
+
+    def __call__(self, item):
+        self.items.append(item)
+
+        if len(self.items) >= self.max_items:
+            self.flush()
+        elif self.deferred is None:
+            self.deferred = self.defer(self.max_delay, self.flush)
+
+    def __len__(self):
+        return len(self.items)
+
+    def flush(self):
+        '''
+        Calls the `callback` with the collected items right away, if any.
+        '''
+
+        self.cancel()
+
+        if self.items:
+            items, self.items = self.items, []
+            self.callback(items)
+
+    def cancel(self):
+        '''
+        Cancels the scheduled call, keeping the collected items.
+        '''
+
+        if self.deferred is not None:
+            self.deferred.cancel()
+            self.deferred = None
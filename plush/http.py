@@ -0,0 +1,403 @@
+from __future__ import absolute_import
+
+import copy
+import time
+import base64
+import socket
+import urlparse
+import functools
+import collections
+from cStringIO import StringIO
+
+from tornado import stack_context
+from tornado.util import GzipDecompressor
+from tornado.ioloop import IOLoop
+from tornado.iostream import IOStream
+from tornado.httputil import HTTPHeaders
+from tornado.httpclient import (AsyncHTTPClient, HTTPRequest, HTTPResponse,
+                                HTTPError)
+
+__all__ = "HTTPClient HostPool".split()
+
+
+#: Status codes of the responses, which never have a body.
+BODILESS_CODES = frozenset([204, 304])
+
+#: Methods of the requests, which are safe to send twice.
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+
+#: Status codes of the redirects, which are followed.
+REDIRECT_CODES = frozenset([301, 302, 303, 307])
+
+#: The `HTTPRequest` options the pooled connections do not support. The
+#: requests, which set them, go through the tornado client.
+UNPOOLED_OPTIONS = ('streaming_callback', 'header_callback',
+                    'prepare_curl_callback', 'proxy_host', 'network_interface',
+                    'client_key', 'client_cert', 'allow_ipv6')
+
+
+class Connection(object):
+    '''
+    Keep-alive connection to a host of a :class:`HostPool`.
+    '''
+
+    def __init__(self, pool, stream):
+        self.pool = pool
+        self.stream = stream
+        self.requests = 0
+
+    def fetch(self, request, callback):
+        '''
+        Sends a `request` and calls `callback` with the response, whether the
+        connection can be reused and whether the request can be retried.
+        '''
+
+        self.requests += 1
+
+        io_loop = self.pool.io_loop
+        started, state = time.time(), dict(response=False, done=False)
+
+        def finish(response, reusable=False, closed=False):
+            if state['done']:
+                return
+            state['done'] = True
+
+            io_loop.remove_timeout(timeout)
+            self.stream.set_close_callback(None)
+
+            # The idle keep-alive connections may be closed by the server
+            # before the request gets through. Those are safe to retry, but
+            # only for the idempotent methods, as the server might have got
+            # the request anyway. The timed out requests are not retried, so
+            # they do not take longer than their timeout.
+            retry = (closed and not state['response'] and
+                     self.requests > 1 and
+                     request.method in IDEMPOTENT_METHODS)
+
+            callback(response, reusable, retry)
+
+        def fail(code, message, closed=False):
+            self.stream.close()
+            finish(HTTPResponse(request, code, error=HTTPError(code, message),
+                                request_time=time.time() - started),
+                   closed=closed)
+
+        def on_timeout():
+            fail(599, 'Timeout')
+
+        def on_close():
+            fail(599, 'Connection closed', closed=True)
+
+        def on_headers(data):
+            state['response'] = True
+
+            first_line, _, header_lines = data.partition('\r\n')
+            version, code = first_line.split(' ', 2)[:2]
+            code, headers = int(code), HTTPHeaders.parse(header_lines)
+
+            reusable = (version == 'HTTP/1.1' and
+                        headers.get('Connection', '').lower() != 'close')
+
+            def respond(body):
+                if request.use_gzip and \
+                   headers.get('Content-Encoding') == 'gzip':
+                    decompressor = GzipDecompressor()
+                    body = decompressor.decompress(body) + \
+                           decompressor.flush()
+
+                finish(HTTPResponse(request, code, headers, StringIO(body),
+                                    request_time=time.time() - started),
+                       reusable)
+
+            if request.method == 'HEAD' or code in BODILESS_CODES:
+                respond('')
+            elif headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                read_chunks(respond)
+            elif 'Content-Length' in headers:
+                self.stream.read_bytes(int(headers['Content-Length']), respond)
+            else:
+                reusable = False
+                self.stream.read_until_close(respond)
+
+        def read_chunks(respond):
+            chunks = []
+
+            def on_size(line):
+                size = int(line.split(';', 1)[0].strip(), 16)
+                if size:
+                    self.stream.read_bytes(size + 2, on_chunk)
+                else:
+                    self.stream.read_until('\r\n', on_trailer)
+
+            def on_chunk(chunk):
+                chunks.append(chunk[:-2])
+                self.stream.read_until('\r\n', on_size)
+
+            def on_trailer(line):
+                if line == '\r\n':
+                    respond(''.join(chunks))
+                else:
+                    self.stream.read_until('\r\n', on_trailer)
+
+            self.stream.read_until('\r\n', on_size)
+
+        timeout = io_loop.add_timeout(started + request.request_timeout,
+                                      stack_context.wrap(on_timeout))
+        self.stream.set_close_callback(on_close)
+
+        self.stream.write(self.encode(request))
+        self.stream.read_until('\r\n\r\n', on_headers)
+
+    def encode(self, request):
+        parsed = urlparse.urlsplit(request.url)
+
+        headers = HTTPHeaders(request.headers)
+        defaults = [('Host', parsed.netloc), ('Connection', 'keep-alive'),
+                    ('User-Agent', request.user_agent or 'plush')]
+        if request.use_gzip:
+            defaults.append(('Accept-Encoding', 'gzip'))
+        if request.auth_username is not None:
+            credentials = '%s:%s' % (request.auth_username,
+                                     request.auth_password or '')
+            defaults.append(('Authorization',
+                             'Basic ' + base64.b64encode(credentials)))
+
+        # The `setdefault` of the headers skips the list they are sent from.
+        for name, value in defaults:
+            if name not in headers:
+                headers[name] = value
+
+        if request.body is not None:
+            headers['Content-Length'] = str(len(request.body))
+
+        path = (parsed.path or '/') + ('?' + parsed.query if parsed.query
+                                       else '')
+        lines = ['%s %s HTTP/1.1' % (request.method, path)]
+        lines.extend('%s: %s' % header for header in headers.get_all())
+
+        return '\r\n'.join(lines) + '\r\n\r\n' + (request.body or '')
+
+
+class HostPool(object):
+    '''
+    Pool of keep-alive connections to a single `host` and `port`.
+
+    Keeps at most `max_connections` open and queues the rest of the
+    requests until a connection is released.
+    '''
+
+    def __init__(self, host, port, max_connections=10, io_loop=None):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.io_loop = io_loop or IOLoop.instance()
+        self.idle = []
+        self.waiting = collections.deque()
+        self.opened = 0
+        self.requests = 0
+        self.connections = 0
+        self.reused = 0
+        self.failures = 0
+
+    @property
+    def stats(self):
+        return dict(open=self.opened, idle=len(self.idle),
+                    waiting=len(self.waiting), requests=self.requests,
+                    connections=self.connections, reused=self.reused,
+                    failures=self.failures)
+
+    def fetch(self, request, callback):
+        self.requests += 1
+        self.waiting.append((request, callback))
+        self.process()
+
+    def process(self):
+        while self.waiting and (self.idle or
+                                self.opened < self.max_connections):
+            request, callback = self.waiting.popleft()
+
+            if self.idle:
+                self.reused += 1
+                self.send(self.idle.pop(), request, callback)
+            else:
+                self.opened += 1
+                self.connect(request, callback)
+
+    def connect(self, request, callback):
+        try:
+            family, kind, proto, _, address = socket.getaddrinfo(
+                self.host, self.port, 0, socket.SOCK_STREAM)[0]
+        except socket.error, error:
+            self.opened -= 1
+            self.failures += 1
+            self.io_loop.add_callback(lambda: callback(HTTPResponse(
+                request, 599, error=HTTPError(599, str(error)))))
+            return
+
+        stream = IOStream(socket.socket(family, kind, proto),
+                          io_loop=self.io_loop)
+        connection = Connection(self, stream)
+        self.connections += 1
+
+        def on_timeout():
+            stream.close()
+
+        def on_close():
+            self.io_loop.remove_timeout(timeout)
+            self.release(connection, HTTPResponse(
+                request, 599, error=HTTPError(599, 'Connection failed')),
+                callback)
+
+        def on_connect():
+            self.io_loop.remove_timeout(timeout)
+            self.send(connection, request, callback)
+
+        timeout = self.io_loop.add_timeout(
+            time.time() + request.connect_timeout, on_timeout)
+        stream.set_close_callback(on_close)
+        stream.connect(address, on_connect)
+
+    def send(self, connection, request, callback):
+        def on_response(response, reusable, retry):
+            if retry and response.code == 599:
+                self.discard(connection)
+                self.waiting.appendleft((request, callback))
+                self.process()
+            else:
+                self.release(connection, response, callback, reusable)
+
+        connection.fetch(request, on_response)
+
+    def release(self, connection, response, callback, reusable=False):
+        if reusable and not connection.stream.closed():
+            self.idle.append(connection)
+            connection.stream.set_close_callback(
+                functools.partial(self.discard, connection))
+        else:
+            self.discard(connection)
+
+        if response.error:
+            self.failures += 1
+
+        self.process()
+
+        callback(response)
+
+    def discard(self, connection):
+        if connection in self.idle:
+            self.idle.remove(connection)
+
+        if not connection.stream.closed():
+            connection.stream.set_close_callback(None)
+            connection.stream.close()
+
+        self.opened -= 1
+
+    def close(self):
+        for connection in list(self.idle):
+            self.discard(connection)
+
+
+class HTTPClient(object):
+    '''
+    Asynchronous HTTP client, which shares keep-alive connections per host.
+
+    Keeps a :class:`HostPool` of at most `max_per_host` connections for every
+    host. Requests, which do not set their own timeouts, use the
+    `connect_timeout` and `request_timeout` in seconds.
+
+    Supports plain HTTP/1.1 with redirects, gzip compression and basic
+    authentication. The HTTPS requests and the ones with options the pooled
+    connections do not support, see `UNPOOLED_OPTIONS`, go through the
+    tornado client, without pooling.
+    '''
+
+    host_pool_class = HostPool
+
+    def __init__(self, max_per_host=10, connect_timeout=20,
+                 request_timeout=20, io_loop=None):
+        self.max_per_host = max_per_host
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self.io_loop = io_loop or IOLoop.instance()
+        self.pools = {}
+
+    def fetch(self, request, callback, **kwargs):
+        '''
+        Fetches a `request`, which is either an URL or a `HTTPRequest`, and
+        calls `callback` with the `HTTPResponse`.
+
+        The `kwargs` are passed to the `HTTPRequest`, if the `request` is an
+        URL.
+        '''
+
+        if not isinstance(request, HTTPRequest):
+            kwargs.setdefault('connect_timeout', self.connect_timeout)
+            kwargs.setdefault('request_timeout', self.request_timeout)
+            request = HTTPRequest(request, **kwargs)
+
+        callback = stack_context.wrap(callback)
+        parsed = urlparse.urlsplit(request.url)
+
+        if parsed.scheme != 'http' or any(getattr(request, option) is not None
+                                          for option in UNPOOLED_OPTIONS):
+            return AsyncHTTPClient(self.io_loop).fetch(request, callback)
+
+        key = (parsed.hostname, parsed.port or 80)
+        if key not in self.pools:
+            self.pools[key] = self.host_pool_class(
+                key[0], key[1], self.max_per_host, self.io_loop)
+
+        self.pools[key].fetch(request, functools.partial(
+            self.follow, request, callback))
+
+    def follow(self, request, callback, response):
+        '''
+        Follows the redirect `response` to a `request`, if it asks for it,
+        like the tornado client does. Calls `callback` with the final
+        response.
+        '''
+
+        if request.follow_redirects and request.max_redirects > 0 and \
+           response.code in REDIRECT_CODES and 'Location' in response.headers:
+            redirect = copy.copy(request)
+            redirect.url = urlparse.urljoin(request.url,
+                                            response.headers['Location'])
+            redirect.max_redirects -= 1
+            redirect.headers = HTTPHeaders(request.headers)
+            redirect.original_request = getattr(request, 'original_request',
+                                                request)
+
+            dropped = ['Host']
+            if response.code == 303:
+                redirect.method, redirect.body = 'GET', None
+                dropped.extend(['Content-Length', 'Content-Type',
+                                'Content-Encoding', 'Transfer-Encoding'])
+
+            for name in dropped:
+                if name in redirect.headers:
+                    del redirect.headers[name]
+
+            return self.fetch(redirect, callback)
+
+        response.effective_url = request.url
+        response.request = getattr(request, 'original_request', request)
+
+        callback(response)
+
+    @property
+    def stats(self):
+        '''
+        Returns the statistics of the connection pools by `host:port`.
+        '''
+
+        return dict(('%s:%d' % key, pool.stats)
+                    for (key, pool) in self.pools.iteritems())
+
+    def close(self):
+        '''
+        Closes the idle connections.
+        '''
+
+        for pool in self.pools.itervalues():
+            pool.close()
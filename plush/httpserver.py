@@ -0,0 +1,224 @@
+from __future__ import absolute_import
+
+import socket
+import logging
+import tempfile
+import collections
+
+from tornado import httpserver, httputil, stack_context
+from tornado.escape import native_str, parse_qs_bytes
+
+from .response import BadRequest, RequestEntityTooLarge
+
+__all__ = "HTTPServer HTTPConnection BodyPolicy BodyStream".split()
+
+
+#: How a request body is read. If `stream` is truthful, the body is handed
+#: to the request chunk by chunk as it arrives. Otherwise, bodies larger than
+#: `spool_size` are spooled to a temporary file. Bodies larger than
+#: `max_size` are rejected.
+BodyPolicy = collections.namedtuple('BodyPolicy', 'stream max_size spool_size')
+
+#: The tornado behaviour, used for the callbacks without body policies.
+DEFAULT_BODY_POLICY = BodyPolicy(False, None, None)
+
+#: The methods of the requests, whose spooled bodies are parsed as forms.
+FORM_METHODS = frozenset(['POST', 'PATCH', 'PUT'])
+
+#: The content type of the spooled bodies parsed as forms. The multipart
+#: ones are left in the file, as parsing them would load the uploads back
+#: into memory.
+FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+
+#: The bytes of a spooled form body parsed at once.
+FORM_CHUNK_SIZE = 64 * 1024
+
+
+def parse_form_file(file, arguments, chunk_size=FORM_CHUNK_SIZE):
+    '''
+    Parses the form `arguments` out of an urlencoded body `file`, chunk by
+    chunk, like tornado does out of the bodies in memory.
+    '''
+
+    pieces = []
+
+    while True:
+        chunk = file.read(chunk_size)
+
+        if chunk:
+            if '&' not in chunk:
+                pieces.append(chunk)
+                continue
+
+            head, _, tail = chunk.rpartition('&')
+            pieces.append(head)
+        else:
+            tail = ''
+
+        for name, values in parse_qs_bytes(''.join(pieces)).iteritems():
+            values = [value for value in values if value]
+            if values:
+                arguments.setdefault(name, []).extend(values)
+
+        if not chunk:
+            return
+
+        pieces = [tail]
+
+
+class BodyStream(object):
+    '''
+    The chunks of a request body, as they arrive.
+
+    Read them one by one with :meth:`read`, e.g. in a coroutine with
+    `gen.Task(request.body_stream.read)`. The end of the body is read as
+    `None`.
+    '''
+
+    def __init__(self):
+        self.chunks = collections.deque()
+        self.reader = None
+        self.finished = False
+        self.received = 0
+
+    def read(self, callback):
+        '''
+        Calls `callback` with the next chunk of the body or with `None` at
+        its end.
+        '''
+
+        if self.chunks or self.finished:
+            callback(self.chunks.popleft() if self.chunks else None)
+        else:
+            self.reader = stack_context.wrap(callback)
+
+    def feed(self, chunk):
+        self.received += len(chunk)
+        self.chunks.append(chunk)
+        self.wake()
+
+    def finish(self):
+        self.finished = True
+        self.wake()
+
+    def wake(self):
+        if self.reader is not None:
+            reader, self.reader = self.reader, None
+            self.read(reader)
+
+
+class HTTPConnection(httpserver.HTTPConnection):
+    '''
+    HTTP connection reading the request bodies by the policy of their routes.
+
+    The request callback may have a `body_policy` method returning the
+    :class:`BodyPolicy` of a request.
+    '''
+
+    def _on_headers(self, data):
+        try:
+            data = native_str(data.decode('latin1'))
+            eol = data.find('\r\n')
+
+            try:
+                method, uri, version = data[:eol].split(' ')
+            except ValueError:
+                raise BadRequest('Malformed HTTP request line')
+            if not version.startswith('HTTP/'):
+                raise BadRequest('Malformed HTTP version in HTTP Request-Line')
+
+            headers = httputil.HTTPHeaders.parse(data[eol:])
+
+            if getattr(self.stream.socket, 'family', socket.AF_INET) in (
+                    socket.AF_INET, socket.AF_INET6):
+                remote_ip = self.address[0]
+            else:
+                remote_ip = '0.0.0.0'
+
+            self._request = httpserver.HTTPRequest(
+                connection=self, method=method, uri=uri, version=version,
+                headers=headers, remote_ip=remote_ip)
+
+            try:
+                content_length = int(headers.get('Content-Length') or 0)
+            except ValueError:
+                raise BadRequest('Malformed Content-Length')
+
+            if not content_length:
+                return self.request_callback(self._request)
+
+            body_policy = getattr(self.request_callback, 'body_policy', None)
+            self.read_body(content_length, body_policy(self._request)
+                           if body_policy else DEFAULT_BODY_POLICY)
+        except BadRequest, error:
+            logging.info('Malformed HTTP request from %s: %s',
+                         self.address[0], error)
+            self.close()
+
+    def read_body(self, content_length, policy):
+        request = self._request
+
+        if policy.max_size is not None and content_length > policy.max_size:
+            # Reject without reading the body, so the connection can not be
+            # reused.
+            self.no_keep_alive = True
+            request.body_error = RequestEntityTooLarge(
+                'The request body is larger than %d bytes' % policy.max_size)
+            return self.request_callback(request)
+
+        spooled = policy.spool_size and content_length > policy.spool_size
+
+        # Only the bodies read into memory are limited by the buffer size.
+        if content_length > self.stream.max_buffer_size and \
+           not (policy.stream or spooled):
+            raise BadRequest('Content-Length too long')
+
+        if request.headers.get('Expect') == '100-continue':
+            self.stream.write('HTTP/1.1 100 (Continue)\r\n\r\n')
+
+        if policy.stream:
+            request.body_stream = BodyStream()
+            self.request_callback(request)
+
+            self.stream.read_bytes(content_length,
+                                   lambda _: request.body_stream.finish(),
+                                   streaming_callback=request.body_stream.feed)
+        elif spooled:
+            request.body_file = tempfile.SpooledTemporaryFile(
+                policy.spool_size)
+
+            def on_body(_):
+                request.body_file.seek(0)
+
+                content_type = request.headers.get('Content-Type', '')
+                if request.method in FORM_METHODS and \
+                   content_type.startswith(FORM_CONTENT_TYPE):
+                    parse_form_file(request.body_file, request.arguments)
+                    request.body_file.seek(0)
+
+                self.request_callback(request)
+
+            self.stream.read_bytes(content_length, on_body,
+                                   streaming_callback=request.body_file.write)
+        else:
+            self.stream.read_bytes(content_length, self._on_request_body)
+
+    def _finish_request(self):
+        # Do not read the rest of a streamed body as the next request.
+        body_stream = getattr(self._request, 'body_stream', None)
+        if body_stream is not None and not body_stream.finished:
+            self.no_keep_alive = True
+
+        httpserver.HTTPConnection._finish_request(self)
+
+
+class HTTPServer(httpserver.HTTPServer):
+    '''
+    HTTP server reading the request bodies with :class:`HTTPConnection`.
+    '''
+
+    connection_class = HTTPConnection
+
+    def handle_stream(self, stream, address):
+        self.connection_class(stream, address, self.request_callback,
+                              self.no_keep_alive, self.xheaders)
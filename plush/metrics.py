@@ -0,0 +1,211 @@
+from __future__ import absolute_import
+
+import os
+import json
+import glob
+import bisect
+import tempfile
+
+from .routing import DispatchIndex
+
+__all__ = "Metrics RouteMetrics metrics_endpoint".split()
+
+
+#: The default latency histogram buckets, in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+#: The route label of the requests, which did not match any route.
+UNMATCHED = '<unmatched>'
+
+
+class RouteMetrics(object):
+    '''
+    Request counters and latency histogram of a single route.
+
+    The `statuses` are counted by class, e.g. `2xx`, and the `buckets` hold
+    the non-cumulative counts of the latencies up to every bound, plus the
+    ones over the last bound.
+    '''
+
+    __slots__ = 'statuses bytes sum buckets'.split()
+
+    def __init__(self, size):
+        self.statuses = [0] * 5
+        self.bytes = 0
+        self.sum = 0.0
+        self.buckets = [0] * (size + 1)
+
+    @property
+    def count(self):
+        return sum(self.buckets)
+
+    def merge(self, other):
+        for index, value in enumerate(other['statuses']):
+            self.statuses[index] += value
+        for index, value in enumerate(other['buckets']):
+            self.buckets[index] += value
+
+        self.bytes += other['bytes']
+        self.sum += other['sum']
+
+    def dump(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+
+class Metrics(object):
+    '''
+    Per route request metrics, rendered in the Prometheus text format.
+
+    If a `directory` is given, every process dumps its metrics there and the
+    rendered metrics are aggregated over all of them.
+    '''
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, directory=None):
+        self.bounds = tuple(sorted(buckets))
+        self.directory = directory
+        self.routes = {}
+
+    def observe(self, route, status, elapsed, size):
+        '''
+        Records a request to a `route` with a response `status`, which took
+        `elapsed` seconds and wrote `size` bytes.
+        '''
+
+        metrics = self.routes.get(route)
+        if metrics is None:
+            metrics = self.routes[route] = RouteMetrics(len(self.bounds))
+
+        metrics.statuses[min(max(status // 100, 1), 5) - 1] += 1
+        metrics.bytes += size
+        metrics.sum += elapsed
+        metrics.buckets[bisect.bisect_left(self.bounds, elapsed)] += 1
+
+    def share(self):
+        '''
+        Shares the metrics between processes through the `directory`,
+        creating a temporary one if it is not given.
+        '''
+
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='plush-metrics-')
+        elif not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, '%d.json' % os.getpid())
+
+    def dump(self):
+        '''
+        Dumps the metrics of the current process to the `directory`.
+        '''
+
+        temporary = self.path + '.tmp'
+
+        with open(temporary, 'w') as file:
+            json.dump(dict((route, metrics.dump()) for (route, metrics)
+                           in self.routes.iteritems()), file)
+
+        os.rename(temporary, self.path)
+
+    def aggregate(self):
+        '''
+        Returns the metrics of the current process merged with the ones
+        dumped by the other processes.
+        '''
+
+        routes = {}
+
+        dumps = [dict((route, metrics.dump()) for (route, metrics)
+                      in self.routes.iteritems())]
+
+        if self.directory is not None:
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                if path == self.path:
+                    continue
+                try:
+                    with open(path) as file:
+                        dumps.append(json.load(file))
+                except (IOError, ValueError):
+                    continue
+
+        for dump in dumps:
+            for route, metrics in dump.iteritems():
+                if route not in routes:
+                    routes[route] = RouteMetrics(len(self.bounds))
+                routes[route].merge(metrics)
+
+        return routes
+
+    def render(self):
+        '''
+        Renders the aggregated metrics in the Prometheus text format.
+        '''
+
+        routes = sorted(self.aggregate().iteritems())
+        lines = []
+
+        lines.append('# HELP plush_requests_total Requests by route and '
+                     'status class.')
+        lines.append('# TYPE plush_requests_total counter')
+        for route, metrics in routes:
+            for index, count in enumerate(metrics.statuses):
+                if count:
+                    lines.append('plush_requests_total{route="%s",'
+                                 'status="%dxx"} %d' % (escape(route),
+                                                        index + 1, count))
+
+        lines.append('# HELP plush_response_bytes_total Response body bytes '
+                     'by route.')
+        lines.append('# TYPE plush_response_bytes_total counter')
+        for route, metrics in routes:
+            lines.append('plush_response_bytes_total{route="%s"} %d' % (
+                escape(route), metrics.bytes))
+
+        lines.append('# HELP plush_request_duration_seconds Request latency '
+                     'by route.')
+        lines.append('# TYPE plush_request_duration_seconds histogram')
+        for route, metrics in routes:
+            label, total = escape(route), 0
+
+            for bound, count in zip(self.bounds + ('+Inf',), metrics.buckets):
+                total += count
+                lines.append('plush_request_duration_seconds_bucket'
+                             '{route="%s",le="%s"} %d' % (label, bound, total))
+
+            lines.append('plush_request_duration_seconds_sum{route="%s"} %r' %
+                         (label, metrics.sum))
+            lines.append('plush_request_duration_seconds_count{route="%s"} %d'
+                         % (label, total))
+
+        return '\n'.join(lines) + '\n'
+
+
+def route_label(spec):
+    '''
+    Returns the metrics label of a route `spec`: its pattern.
+    '''
+
+    if spec is None or spec is DispatchIndex.NOT_FOUND:
+        return UNMATCHED
+
+    pattern = spec.regex.pattern
+
+    return pattern[:-1] if pattern.endswith('$') else pattern
+
+
+def escape(label):
+    '''
+    Escapes a Prometheus label value.
+    '''
+
+    return label.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def metrics_endpoint(request):
+    '''
+    Sends the application metrics in the Prometheus text format.
+    '''
+
+    request.set_header('Content-Type', 'text/plain; version=0.0.4')
+    request.write(request.application.metrics.render())
@@ -0,0 +1,183 @@
+from __future__ import absolute_import
+
+import re
+
+from .response import BadRequest
+from .util.lang import identity, Sentinel
+
+__all__ = "Param Schema ParamsError".split()
+
+
+#: Control characters scrubbed from the arguments, like tornado does.
+CONTROL_CHARACTERS = re.compile(r'[\x00-\x08\x0e-\x1f]')
+
+#: The parameter names, which are attribute names as they are.
+ATTRIBUTE_NAME = re.compile(r'(?!__)[A-Za-z_]\w*\Z')
+
+
+def attribute_name(name, taken=()):
+    '''
+    Returns the attribute name of a parameter `name`, not in `taken`. The
+    characters invalid in identifiers are replaced with underscores, so
+    `filter-by` is `filter_by` and `ids[]` is `ids`.
+    '''
+
+    if not ATTRIBUTE_NAME.match(name):
+        name = re.sub(r'\W', '_', name).strip('_')
+        if not ATTRIBUTE_NAME.match(name):
+            name = 'param_' + name
+
+    while name in taken:
+        name += '_'
+
+    return name
+
+
+class ParamsError(BadRequest):
+    '''
+    Bad request carrying all of the request parameters validation `errors`,
+    a mapping of parameter names to messages.
+    '''
+
+    def __init__(self, errors):
+        self.errors = errors
+
+        BadRequest.__init__(self, '; '.join('%s: %s' % item
+                                            for item in sorted(errors.items())))
+
+
+class Param(object):
+    '''
+    Declaration of a request parameter.
+
+    The `type` and `ensure` callables have the same contracts as the ones of
+    :meth:`Request.param`. If `default` is not given the parameter is
+    required. If `multiple` is truthful, the parameter value is the list of
+    all of the given values.
+    '''
+
+    def __init__(self, type=identity, default=Sentinel, ensure=identity,
+                 strip=True, multiple=False):
+        self.type = type
+        self.default = default
+        self.ensure = ensure
+        self.strip = strip
+        self.multiple = multiple
+
+    def convert(self, value):
+        return self.ensure(self.type(value))
+
+
+class Params(object):
+    '''
+    Base class for the parsed parameters objects.
+    '''
+
+    __slots__ = ()
+
+    #: The attribute names by parameter name.
+    _attributes = {}
+
+    def __getitem__(self, name):
+        '''
+        Returns the value of a parameter by its `name`, even if it is not a
+        valid attribute name.
+        '''
+
+        try:
+            return getattr(self, self._attributes[name])
+        except (KeyError, AttributeError):
+            raise KeyError(name)
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join(
+            '%s=%r' % (name, getattr(self, name)) for name in self.__slots__))
+
+
+class Schema(object):
+    '''
+    Compiled request parameters parser.
+
+    Created out of a mapping of parameter names to :class:`Param` instances
+    or to plain `type` callables. Parses the request arguments in one pass to
+    a slotted object with an attribute per parameter. The names, which are
+    not valid attribute names, are mapped with :func:`attribute_name` and
+    the values can be read by the parameter names with `params[name]`.
+    '''
+
+    def __init__(self, params, name='Params'):
+        self.fields = []
+        attributes = {}
+
+        for field, param in sorted(params.items()):
+            if not isinstance(param, Param):
+                param = Param(param)
+
+            attribute = attribute_name(field, ['_attributes'] +
+                                                  attributes.values())
+            attributes[field] = attribute
+
+            self.fields.append((field, attribute, param))
+
+        self.params_class = type(name, (Params,), {
+            '__slots__': tuple(attribute for (_, attribute, _) in self.fields),
+            '_attributes': attributes,
+        })
+
+    def parse(self, request):
+        '''
+        Parses the arguments of a `request` handler.
+
+        Raises :class:`ParamsError` with the errors of all of the invalid
+        parameters.
+        '''
+
+        arguments, decode = request.request.arguments, request.decode_argument
+        params, errors = self.params_class(), {}
+
+        for field, attribute, param in self.fields:
+            values = []
+
+            for value in arguments.get(field, ()):
+                value = decode(value, name=field)
+                if isinstance(value, unicode):
+                    value = CONTROL_CHARACTERS.sub(' ', value)
+                if param.strip:
+                    value = value.strip()
+
+                values.append(value)
+
+            if not values:
+                if param.default is Sentinel:
+                    errors[field] = 'Missing argument'
+                else:
+                    setattr(params, attribute, param.default)
+                continue
+
+            try:
+                if param.multiple:
+                    value = [param.convert(item) for item in values]
+                else:
+                    value = param.convert(values[-1])
+            except (ValueError, TypeError), message:
+                errors[field] = str(message) or 'Invalid argument'
+            else:
+                setattr(params, attribute, value)
+
+        if errors:
+            raise ParamsError(errors)
+
+        return params
+
+    def __call__(self, request, *args, **kwargs):
+        '''
+        Parses the `request` arguments to `request.params`. Sends a bad
+        request on errors.
+
+        Suited to be the first filter of a request pipeline.
+        '''
+
+        try:
+            request.params = self.parse(request)
+        except ParamsError, error:
+            return request.error(error)
@@ -0,0 +1,367 @@
+from __future__ import absolute_import
+
+import sys
+import Queue
+import signal
+import threading
+import functools
+import traceback
+import collections
+import multiprocessing
+
+from tornado import stack_context
+from tornado.ioloop import IOLoop
+from tornado.process import cpu_count
+
+from .response import ServiceUnavailable
+
+__all__ = "ThreadPool ProcessPool PoolSaturated".split()
+
+
+class PoolSaturated(ServiceUnavailable):
+    '''
+    Raised when a pool can not take any more tasks.
+    '''
+
+
+class ThreadPool(object):
+    '''
+    Bounded pool of `size` threads for blocking calls.
+
+    At most `max_queue` tasks wait for a free thread. Submitting more raises
+    :class:`PoolSaturated`, so the callers can shed the load instead of piling
+    it up.
+
+    The threads are started on first use, so a pool can be created before
+    forking workers. The results are handed back on the IO loop.
+    '''
+
+    def __init__(self, size=10, max_queue=100):
+        self.size = size
+        self.max_queue = max_queue
+        self.tasks = Queue.Queue()
+        self.threads = []
+        self.pending = 0
+        self.exiting = 0
+        self.lock = threading.Lock()
+
+    @property
+    def saturated(self):
+        return self.pending >= self.size + self.max_queue
+
+    def submit(self, function, callback, io_loop=None):
+        '''
+        Calls `function` in a pool thread.
+
+        The `callback` is called on the `io_loop` with the result and the
+        exception info, if the `function` raised, as `callback(result,
+        exc_info)`. Must be called from the IO loop thread.
+        '''
+
+        if self.saturated:
+            raise PoolSaturated('%d tasks are already pending' % self.pending)
+
+        if not self.threads:
+            self.start()
+
+        self.pending += 1
+        self.tasks.put((function, stack_context.wrap(callback),
+                        io_loop or IOLoop.instance()))
+
+    def start(self, count=None):
+        for _ in xrange(self.size if count is None else count):
+            thread = threading.Thread(target=self.work)
+            thread.daemon = True
+            thread.start()
+
+            with self.lock:
+                self.threads.append(thread)
+
+    def resize(self, size):
+        '''
+        Changes the number of threads to `size`. The extra threads stop once
+        they are done with their current tasks, and leave :attr:`threads` as
+        they exit.
+        '''
+
+        if self.threads:
+            if size > self.size:
+                self.start(size - self.size)
+            else:
+                with self.lock:
+                    self.exiting += self.size - size
+
+                for _ in xrange(self.size - size):
+                    self.tasks.put(None)
+
+        self.size = size
+
+    def stop(self, timeout=5):
+        '''
+        Stops the threads once they are done with the submitted tasks. Waits
+        at most `timeout` seconds for every thread.
+        '''
+
+        with self.lock:
+            threads, self.threads = self.threads, []
+            count = len(threads) - self.exiting
+
+        # The threads leaving a shrunk pool already have their sentinels.
+        for _ in xrange(count):
+            self.tasks.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def work(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                self.exit(threading.current_thread())
+                return
+
+            function, callback, io_loop = task
+            result, exc_info = None, None
+
+            try:
+                result = function()
+            except Exception:
+                exc_info = sys.exc_info()
+
+            io_loop.add_callback(functools.partial(self.done, callback,
+                                                   result, exc_info))
+
+    def exit(self, thread):
+        with self.lock:
+            self.exiting = max(self.exiting - 1, 0)
+
+            if thread in self.threads:
+                self.threads.remove(thread)
+
+    def done(self, callback, result, exc_info):
+        self.pending -= 1
+
+        callback(result, exc_info)
+
+
+def serve_tasks(connection):
+    '''
+    Runs the tasks received on a `connection` in a pool process.
+    '''
+
+    # The signals are for the parent process to handle.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+
+    while True:
+        task = connection.recv()
+        if task is None:
+            return
+
+        function, args, kwargs = task
+
+        try:
+            outcome = (True, function(*args, **kwargs))
+        except Exception, error:
+            outcome = (False, error)
+
+        try:
+            connection.send(outcome)
+        except Exception:
+            connection.send((False, RuntimeError(traceback.format_exc())))
+
+
+class ProcessTask(object):
+    '''
+    Task submitted to a :class:`ProcessPool`, which can be canceled.
+    '''
+
+    __slots__ = 'function args kwargs callback canceled pool worker'.split()
+
+    def __init__(self, function, args, kwargs, callback, pool=None):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.callback = callback
+        self.canceled = False
+        self.pool = pool
+        self.worker = None
+
+    def cancel(self):
+        '''
+        Cancels the task. A queued task is not run at all and the process
+        running a started one is terminated and replaced, so it does not
+        burn the CPU for nothing. Must be called from the IO loop thread.
+        '''
+
+        self.canceled = True
+
+        if self.worker is not None:
+            self.pool.terminate(self.worker)
+
+
+class ProcessWorker(object):
+    '''
+    Pool process along with the parent end of its connection.
+    '''
+
+    def __init__(self):
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve_tasks,
+                                               args=(child,))
+        self.process.daemon = True
+        self.process.start()
+        self.task = None
+
+        child.close()
+
+    def fileno(self):
+        return self.connection.fileno()
+
+
+class ProcessPool(object):
+    '''
+    Pool of `size` processes for CPU bound calls, defaulting to one per CPU
+    core.
+
+    The functions, their arguments and their results are pickled, so the
+    functions have to be importable. The tasks are handed to the processes
+    one at a time, so at most `max_queue` of them wait in the parent
+    process, where they can be canceled. Submitting more raises
+    :class:`PoolSaturated`.
+
+    The processes are started on first use. Their results are read on the IO
+    loop, as soon as they are ready.
+    '''
+
+    def __init__(self, size=None, max_queue=100):
+        self.size = size or cpu_count()
+        self.max_queue = max_queue
+        self.queue = collections.deque()
+        self.workers = []
+        self.idle = []
+        self.io_loop = None
+
+    @property
+    def pending(self):
+        return len(self.queue) + len(self.workers) - len(self.idle)
+
+    @property
+    def saturated(self):
+        return len(self.queue) >= self.max_queue and not self.idle
+
+    def submit(self, function, callback, args=(), kwargs=None, io_loop=None):
+        '''
+        Calls `function` with `args` and `kwargs` in a pool process. Returns
+        a :class:`ProcessTask`.
+
+        The `callback` is called on the IO loop as `callback(result, error)`,
+        where `error` is the exception raised by the `function`, if any. Must
+        be called from the IO loop thread.
+        '''
+
+        if not self.workers:
+            self.start(io_loop)
+
+        if self.saturated:
+            raise PoolSaturated('%d tasks are already queued' % len(self.queue))
+
+        task = ProcessTask(function, args, kwargs or {},
+                           stack_context.wrap(callback), self)
+
+        self.queue.append(task)
+        self.dispatch()
+
+        return task
+
+    def start(self, io_loop=None):
+        self.io_loop = io_loop or IOLoop.instance()
+
+        for _ in xrange(self.size):
+            self.spawn()
+
+    def spawn(self):
+        worker = ProcessWorker()
+
+        self.workers.append(worker)
+        self.idle.append(worker)
+        self.io_loop.add_handler(worker.fileno(),
+                                 functools.partial(self.receive, worker),
+                                 IOLoop.READ | IOLoop.ERROR)
+
+    def dispatch(self):
+        while self.queue and self.idle:
+            task = self.queue.popleft()
+            if task.canceled:
+                continue
+
+            worker = self.idle.pop()
+
+            try:
+                worker.connection.send((task.function, task.args, task.kwargs))
+            except Exception, error:
+                self.idle.append(worker)
+                task.callback(None, error)
+            else:
+                worker.task, task.worker = task, worker
+
+    def receive(self, worker, fd, events):
+        task, worker.task = worker.task, None
+        if task is not None:
+            task.worker = None
+
+        try:
+            succeeded, value = worker.connection.recv()
+        except (EOFError, IOError):
+            self.retire(worker)
+            self.spawn()
+            succeeded, value = False, RuntimeError('The pool process died')
+        else:
+            self.idle.append(worker)
+
+        self.dispatch()
+
+        if task is not None and not task.canceled:
+            if succeeded:
+                task.callback(value, None)
+            else:
+                task.callback(None, value)
+
+    def terminate(self, worker):
+        '''
+        Terminates the process of a busy `worker` and spawns another one in
+        its place.
+        '''
+
+        worker.task.worker, worker.task = None, None
+
+        self.retire(worker)
+        worker.process.terminate()
+        worker.process.join(1)
+
+        self.spawn()
+        self.dispatch()
+
+    def retire(self, worker):
+        self.io_loop.remove_handler(worker.fileno())
+        self.workers.remove(worker)
+        if worker in self.idle:
+            self.idle.remove(worker)
+
+        worker.connection.close()
+
+    def stop(self):
+        '''
+        Stops the processes. The queued tasks are dropped.
+        '''
+
+        self.queue.clear()
+
+        for worker in list(self.workers):
+            try:
+                worker.connection.send(None)
+            except IOError:
+                pass
+
+            self.retire(worker)
+            worker.process.join(1)
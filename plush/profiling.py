@@ -0,0 +1,179 @@
+from __future__ import absolute_import
+
+import os
+import re
+import time
+import signal
+import logging
+import cProfile
+import collections
+from contextlib import contextmanager
+
+from tornado.web import create_signed_value, decode_signed_value
+
+from .metrics import route_label
+from .util.fs import ensure_private_directory
+
+__all__ = "Profiler Sampler profile_token".split()
+
+
+#: The name the profile tokens are signed with.
+TOKEN_NAME = 'plush-profile'
+
+
+def profile_token(secret):
+    '''
+    Creates a token asking for a profile of a request. Valid for a day.
+
+    Send it in the `X-Plush-Profile` header or the `__profile` query
+    argument.
+    '''
+
+    return create_signed_value(secret, TOKEN_NAME, 'profile')
+
+
+class Profiler(object):
+    '''
+    Profiles the requests, which ask for it with a token signed with the
+    `secret`. See :func:`profile_token`.
+
+    The stats of every profiled request are dumped to a file in `directory`,
+    named after its route and readable with :mod:`pstats`. The file name is
+    sent back in the `X-Plush-Profile` header. The directory is created
+    private to the current user and nothing is profiled if another user can
+    write to it.
+
+    Only the code run until the handler returns control to the IO loop is
+    profiled, so a coroutine is profiled up to its first `yield`.
+    '''
+
+    #: The header and the query argument carrying the token.
+    HEADER = 'X-Plush-Profile'
+    ARGUMENT = '__profile'
+
+    def __init__(self, secret, directory):
+        self.secret = secret
+        self.directory = directory
+
+    def requested(self, request):
+        '''
+        Checks whether a tornado `request` asks for a profile.
+        '''
+
+        token = request.headers.get(self.HEADER)
+        if token is None:
+            token = (request.arguments.get(self.ARGUMENT) or [None])[0]
+            if token is None:
+                return False
+
+        return decode_signed_value(self.secret, TOKEN_NAME, token,
+                                   max_age_days=1) is not None
+
+    def path_for(self, request):
+        '''
+        Returns the path of the stats dump of a tornado `request`.
+        '''
+
+        route = route_label(getattr(request, 'spec', None))
+        name = re.sub(r'\W+', '_', route).strip('_') or 'root'
+
+        return os.path.join(self.directory, '%s.%d.%d.prof' % (
+            name, os.getpid(), int(time.time() * 1000)))
+
+    @contextmanager
+    def profiling(self, handler):
+        '''
+        Profiles the body of the `with` block, if the request of a `handler`
+        asks for it.
+        '''
+
+        if not self.requested(handler.request):
+            yield
+            return
+
+        if not ensure_private_directory(self.directory):
+            logging.warning('Not profiling to %s, which is not private',
+                            self.directory)
+            yield
+            return
+
+        path = self.path_for(handler.request)
+        handler.set_header(self.HEADER, os.path.basename(path))
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(path)
+
+
+class Sampler(object):
+    '''
+    Statistical profiler, sampling the stack of the main thread every
+    `interval` milliseconds of CPU time.
+
+    The samples are aggregated by stack, so the hot ones stand out across
+    many requests. They are dumped in the collapsed stacks format, which the
+    flame graph tools read.
+    '''
+
+    def __init__(self, interval, directory):
+        self.interval = interval
+        self.directory = directory
+        self.stacks = collections.Counter()
+        self.started = False
+
+    def start(self):
+        '''
+        Starts sampling. Must be called from the main thread of the process,
+        as it handles `SIGPROF`.
+        '''
+
+        signal.signal(signal.SIGPROF, self.sample)
+        signal.siginterrupt(signal.SIGPROF, False)
+        signal.setitimer(signal.ITIMER_PROF, self.interval / 1000.0,
+                         self.interval / 1000.0)
+
+        self.started = True
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+        self.started = False
+
+    def sample(self, signum, frame):
+        stack = []
+
+        while frame is not None:
+            code = frame.f_code
+            stack.append('%s (%s:%d)' % (code.co_name, code.co_filename,
+                                         code.co_firstlineno))
+            frame = frame.f_back
+
+        self.stacks[';'.join(reversed(stack))] += 1
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, 'stacks.%d.txt' % os.getpid())
+
+    def dump(self):
+        '''
+        Dumps the aggregated stacks of the current process to the
+        `directory`, hottest first, if it is private to the current user.
+        '''
+
+        if not ensure_private_directory(self.directory):
+            logging.warning('Not dumping the stacks to %s, which is not '
+                            'private', self.directory)
+            return
+
+        temporary = self.path + '.tmp'
+
+        with open(temporary, 'w') as file:
+            for stack, count in self.stacks.most_common():
+                file.write('%s %d\n' % (stack, count))
+
+        os.rename(temporary, self.path)
@@ -1,15 +1,112 @@
 from __future__ import absolute_import
 
+import threading
 from abc import ABCMeta
-from collections import defaultdict
 
 from .util.lang import classonlymethod
 
 __all__ = "Registrable Registry register registry".split()
 
 
-# Will I have any benefit of making this thread local?
-REGISTRABLE_INFO = defaultdict(list)
+#: Marks the data missing a criterion key.
+MISSING = object()
+
+
+def index_key(value):
+    '''
+    Returns the index key of a data `value`. Keyed by type too, so `1` and
+    `True` are told apart, although they are equal.
+    '''
+
+    return (type(value), value)
+
+
+class RegistryEntries(object):
+    '''
+    Immutable entries of a registry, along with indexes over their data.
+
+    A registration creates new entries instead of changing them, so they can
+    be read from many threads without locking.
+    '''
+
+    __slots__ = 'entries classes indexes'.split()
+
+    def __init__(self, entries=()):
+        self.entries = tuple(entries)
+        self.classes = tuple(cls for (cls, _) in self.entries)
+
+        indexes = {}
+        for cls, data in self.entries:
+            for key, value in data.iteritems():
+                try:
+                    indexes.setdefault(key, {}) \
+                           .setdefault(index_key(value), []).append(cls)
+                except TypeError:
+                    # Unhashable values are not indexed.
+                    continue
+
+        self.indexes = dict(
+            (key, dict((value, tuple(classes))
+                       for (value, classes) in index.iteritems()))
+            for (key, index) in indexes.iteritems())
+
+    def add(self, cls, data):
+        return RegistryEntries(self.entries + ((cls, data),))
+
+    def lookup(self, criteria):
+        if not criteria:
+            return self.classes
+
+        matches = sorted((self.matching(key, value)
+                          for (key, value) in criteria.iteritems()), key=len)
+        others = [frozenset(classes) for classes in matches[1:]]
+
+        return tuple(cls for cls in matches[0]
+                     if all(cls in classes for classes in others))
+
+    def matching(self, key, value):
+        '''
+        Returns the classes, whose data have a `value` for `key`. The
+        unhashable values are not indexed, so they are looked for one entry
+        at a time.
+        '''
+
+        try:
+            return self.indexes.get(key, {}).get(index_key(value), ())
+        except TypeError:
+            return tuple(cls for (cls, data) in self.entries
+                         if type(data.get(key, MISSING)) is type(value) and
+                            data[key] == value)
+
+
+#: The entries of every registry. Replaced, not changed, under the lock.
+REGISTRIES = {}
+REGISTRIES_LOCK = threading.RLock()
+
+EMPTY_ENTRIES = RegistryEntries()
+
+
+def entries_of(cls):
+    '''
+    Returns the :class:`RegistryEntries` of a registry.
+
+    Raises an ``TypeError`` when the specified class is not a registry.
+    '''
+
+    try:
+        return REGISTRIES[cls]
+    except (KeyError, TypeError):
+        raise TypeError('Not a registry!')
+
+
+def invalidate_subclass_checks():
+    '''
+    Forgets the cached ``issubclass(cls, Registry)`` results, as the
+    registries change.
+    '''
+
+    Registry._abc_cache.clear()
+    Registry._abc_negative_cache.clear()
 
 
 class Registrable(object):
@@ -30,11 +127,11 @@ class Registrable(object):
         The returned value of ``on_registration`` must be ``None`` or a mapping.
         '''
 
-        if isinstance(cls, Registry):
+        if cls in REGISTRIES:
             raise TypeError('Can not register a registry.')
 
         for base in cls.__bases__:
-            if issubclass(base, Registry):
+            if base in REGISTRIES:
                 if hasattr(cls, 'on_registration'):
                     data = cls.on_registration()
 
@@ -43,7 +140,8 @@ class Registrable(object):
                 else:
                     data = {}
 
-                REGISTRABLE_INFO[base].append((cls, data))
+                with REGISTRIES_LOCK:
+                    REGISTRIES[base] = entries_of(base).add(cls, data)
 
                 break
         else:
@@ -60,7 +158,10 @@ class Registrable(object):
         #        raise TypeError(
         #            'Can not make multiple registries in one chain.')
 
-        REGISTRABLE_INFO[cls] # It's a side effect of the default dict.
+        with REGISTRIES_LOCK:
+            REGISTRIES.setdefault(cls, EMPTY_ENTRIES)
+
+        invalidate_subclass_checks()
 
 
 class Registry(object):
@@ -76,7 +177,7 @@ class Registry(object):
     @classmethod
     def __subclasshook__(cls, other_class):
         if cls is Registry:
-            return other_class in REGISTRABLE_INFO
+            return other_class in REGISTRIES
 
         return NotImplemented
 
@@ -85,26 +186,40 @@ class Registry(object):
         '''
         Returns the entries with their bounded data for the specified registry.
 
+        The entries are a tuple, cached until the registry changes.
+
         Raises an ``TypeError`` when the specified class is not a registry.
         '''
 
-        if not issubclass(cls, Registry):
-            raise TypeError('Not a registry!')
-
-        return REGISTRABLE_INFO[cls]
+        return entries_of(cls).entries
 
     @staticmethod
     def entries_for(cls):
         '''
         Returns the entries for the specified registry.
 
+        The entries are a tuple, cached until the registry changes.
+
         Raises an ``TypeError`` when the specified class is not a registry.
         '''
 
-        if not issubclass(cls, Registry):
-            raise TypeError('Not a registry!')
+        return entries_of(cls).classes
+
+    @staticmethod
+    def lookup(cls, **criteria):
+        '''
+        Returns the entries for the specified registry, whose data have all
+        of the `criteria` values, in order of registration.
+
+        The data are indexed on registration, so a single criterion is looked
+        up in constant time. Only hashable data values are indexed, the
+        unhashable criteria are looked up one entry at a time. The values
+        are matched by type too, so `kind=1` does not match `kind=True`.
+
+        Raises an ``TypeError`` when the specified class is not a registry.
+        '''
 
-        return [r for (r, _) in Registry.entries_with_data_for(cls)]
+        return entries_of(cls).lookup(criteria)
 
     @staticmethod
     def clear(cls=None):
@@ -113,18 +228,20 @@ class Registry(object):
         the registries with their entries of no class is specified.
         '''
 
-        if cls is not None:
-            if issubclass(cls, Registry):
-                REGISTRABLE_INFO[cls] = []
+        with REGISTRIES_LOCK:
+            if cls is not None:
+                entries_of(cls)
+                REGISTRIES[cls] = EMPTY_ENTRIES
             else:
-                raise TypeError('Not a registry!')
-        else:
-            REGISTRABLE_INFO.clear()
+                REGISTRIES.clear()
+
+        invalidate_subclass_checks()
 
 
 #: More pythonic, non classy interface.
 entries_for = Registry.entries_for
 entries_with_data_for = Registry.entries_with_data_for
+lookup = Registry.lookup
 
 
 def registry(cls):
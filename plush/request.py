@@ -1,17 +1,21 @@
 from __future__ import absolute_import
 
-import json
+import inspect
+import weakref
+from collections import Iterator, OrderedDict
 from contextlib import contextmanager
 
+from tornado.ioloop import IOLoop
 from tornado.web import RequestHandler
-from tornado.escape import json_encode as to_json
 
 from .response import BadRequest
+from .decorators import pipeline, offloaded_request, OffloadedError
+from .params import Schema
 from .util.lang import identity, cachedproperty
-from .util.http import parse_content_type, encode_content_type
+from .util.http import parse_content_type, encode_content_type, negotiate
 from .util.iter import apply_defaults_from
 
-__all__ = "Request".split()
+__all__ = "Request RequestSnapshot".split()
 
 
 class Request(RequestHandler):
@@ -19,8 +23,35 @@ class Request(RequestHandler):
     Custom tornado `RequestHandler` providing nicer API.
     '''
 
+    #: Bytes buffered before flushing a streamed response.
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    #: The media types :meth:`send` can represent structured objects with,
+    #: mapped to the names of the methods sending them, in order of
+    #: preference.
+    REPRESENTATIONS = OrderedDict([
+        ('application/json', 'json'),
+        ('application/x-ndjson', 'ndjson'),
+    ])
+
+    #: The :class:`ResponseCapture` storing the response in a cache, if any.
+    response_capture = None
+
+    #: The response body bytes flushed so far.
+    bytes_written = 0
+
+    #: The request body reading options of the routed methods, by HTTP verb.
+    #: See :class:`plush.httpserver.BodyPolicy`.
+    BODY_POLICIES = {}
+
+    #: Caches of the generated classes and compiled handlers. They are weak,
+    #: so the entries go away with the applications routing to them.
+    _generated_classes = weakref.WeakValueDictionary()
+    _compiled_handlers = weakref.WeakValueDictionary()
+
     @classmethod
-    def from_function(cls, func, methods, decorators=None, mixins=None):
+    def from_function(cls, func, methods, decorators=None, mixins=None,
+                      before=None, after=None):
         '''
         Creates a new `Request` from a function to serve as a specific HTTP
         verb dispatcher.
@@ -34,22 +65,131 @@ class Request(RequestHandler):
 
         If `mixins` is given it should be a list of mixins to be inherited by
         the newly created class. They will be inherited in that order.
+
+        If `before` or `after` are given they should be lists of filters. They
+        are compiled with the decorated `func` into a single flat pipeline.
+        See :func:`plush.decorators.pipeline` for the semantics.
+
+        Classes generated for the same function, decorators, filters and
+        mixins are cached.
+        '''
+
+        handler = cls.compile(func, decorators, before, after)
+
+        return cls.from_methods(dict((method, handler) for method in methods),
+                                mixins, name=func.__name__)
+
+    @classmethod
+    def from_methods(cls, table, mixins=None, name=None, body=None):
         '''
+        Creates a new `Request` from a method dispatch `table`, mapping HTTP
+        verbs to compiled handlers. Use it to serve many verbs with one class.
 
-        if any(method not in cls.SUPPORTED_METHODS for method in methods):
+        If `mixins` is given it should be a list of mixins to be inherited by
+        the newly created class. They will be inherited in that order.
+
+        If `body` is given it should map HTTP verbs to request body options:
+        `stream` to receive the body in chunks and `max_size` to reject the
+        larger bodies.
+
+        The class is named `name` or after the first handler in the table.
+        Classes generated for the same table and mixins are cached.
+        '''
+
+        if any(method not in cls.SUPPORTED_METHODS for method in table):
             raise ValueError('methods %r must be one of %r' %
-                             (list(methods.keys()), cls.SUPPORTED_METHODS))
+                             (list(table), cls.SUPPORTED_METHODS))
+
+        mixins = tuple(mixins or [])
+        name = name or next(table.itervalues()).__name__
+        body = dict((method, options) for (method, options)
+                    in (body or {}).iteritems() if options)
+        key = (cls, name, frozenset(table.iteritems()), mixins,
+               frozenset((method, frozenset(options.iteritems()))
+                         for (method, options) in body.iteritems()))
+
+        request = cls._generated_classes.get(key)
+
+        if request is None:
+            namespace = dict((method.lower(), handler)
+                             for (method, handler) in table.iteritems())
+            namespace['METHODS'] = frozenset(table)
+            namespace['BODY_POLICIES'] = body
+
+            request = cls._generated_classes[key] = type(
+                name, (cls,) + mixins, namespace)
+
+        return request
+
+    @classmethod
+    def compile(cls, func, decorators=None, before=None, after=None,
+                params=None):
+        '''
+        Applies the `decorators` to a `func` and compiles it with the `before`
+        and `after` filters into a single flat pipeline.
+
+        If `params` is given it should be a mapping of parameter names to
+        :class:`Param` instances or `type` callables. They are compiled to a
+        :class:`Schema`, which parses the request arguments to
+        `request.params` before anything else in the pipeline.
+
+        If the `func` or any of the filters is a generator function, the
+        pipeline is a coroutine driven on the IO loop, which can yield the
+        :mod:`tornado.gen` yield points.
+
+        Compiled handlers are cached for the same function, decorators,
+        filters and params.
+        '''
+
+        decorators = tuple(decorators or [])
+        before, after = tuple(before or []), tuple(after or [])
+        params = tuple(sorted((params or {}).items()))
+        key = (func, decorators, before, after, params)
+
+        compiled = cls._compiled_handlers.get(key)
+
+        if compiled is None:
+            handler = func
+            for decorator in decorators:
+                handler = decorator(handler)
+
+            if params:
+                schema = Schema(dict(params), name='%sParams' % func.__name__)
+                before = (schema,) + before
 
-        for decorator in decorators or []:
-            func = decorator(func)
+            compiled = pipeline(handler, before, after,
+                                coroutine=inspect.isgeneratorfunction(func))
 
-        parents = tuple([cls] + [mixin for mixin in mixins or []])
+            # The bare functions are keys of their own entries, which would
+            # never go away. Neither would the callables, which decorators
+            # return and which cannot be weakly referenced. Those are not
+            # worth caching.
+            if compiled is not func:
+                try:
+                    cls._compiled_handlers[key] = compiled
+                except TypeError:
+                    pass
 
-        subclass = type(func.__name__, parents, {})
-        for method in methods:
-            setattr(subclass, method.lower(), func)
+        return compiled
 
-        return subclass
+    @property
+    def io_loop(self):
+        '''
+        Returns the IO loop serving the request.
+        '''
+
+        connection = self.request.connection
+
+        return connection.stream.io_loop if connection else IOLoop.instance()
+
+    @property
+    def config(self):
+        '''
+        Returns the frozen configuration snapshot of the application. See
+        :class:`plush.conf.FrozenSettings`.
+        '''
+
+        return self.application.config
 
     @property
     def method(self):
@@ -67,13 +207,59 @@ class Request(RequestHandler):
 
         return self.request.headers
 
-    @property
+    @cachedproperty
     def data(self):
         '''
         Returns the raw request data.
+
+        Reads the spooled bodies from their :attr:`body_file`. Streamed
+        bodies are read from the :attr:`body_stream` instead.
         '''
 
-        return self.request.data
+        body_file = self.body_file
+        if body_file is not None:
+            return body_file.read()
+
+        return self.request.body
+
+    @property
+    def body_file(self):
+        '''
+        Returns the temporary file of a spooled request body or `None`.
+
+        The urlencoded form arguments are parsed out of it, but the multipart
+        ones are not, so the uploads are not loaded back into memory.
+        '''
+
+        return getattr(self.request, 'body_file', None)
+
+    @property
+    def body_stream(self):
+        '''
+        Returns the :class:`BodyStream` of a streamed request body or `None`.
+        '''
+
+        return getattr(self.request, 'body_stream', None)
+
+    def prepare(self):
+        '''
+        Rejects the requests, whose bodies were not accepted by their route.
+        '''
+
+        body_error = getattr(self.request, 'body_error', None)
+        if body_error is not None:
+            raise body_error
+
+        super(Request, self).prepare()
+
+    def _execute(self, transforms, *args, **kwargs):
+        profiler = getattr(self.application, 'profiler', None)
+
+        if profiler is None:
+            return RequestHandler._execute(self, transforms, *args, **kwargs)
+
+        with profiler.profiling(self):
+            return RequestHandler._execute(self, transforms, *args, **kwargs)
 
     @cachedproperty
     def mimetype(self):
@@ -146,6 +332,50 @@ class Request(RequestHandler):
             if not self._finished:
                 self.finish()
 
+    def on_connection_close(self):
+        '''
+        Forgets the request as in-flight, as it is never finished once the
+        client disconnects. Call it when overriding.
+        '''
+
+        in_flight = getattr(self.application, 'in_flight', None)
+        if in_flight is not None:
+            in_flight.discard(self.request)
+
+    def finish(self, chunk=None):
+        '''
+        Finishes the request, storing the response in a cache if the request
+        is captured by :func:`plush.decorators.cached`.
+        '''
+
+        if offloaded_request() is self:
+            raise RuntimeError('Can not finish a request from a pool thread')
+
+        if self.response_capture is not None:
+            if chunk is not None:
+                self.write(chunk)
+                chunk = None
+
+            self.response_capture.store(self)
+
+        return RequestHandler.finish(self, chunk)
+
+    def flush(self, include_footers=False, callback=None):
+        if offloaded_request() is self:
+            raise RuntimeError('Can not flush a request from a pool thread')
+
+        for chunk in self._write_buffer:
+            self.bytes_written += len(chunk)
+
+        return RequestHandler.flush(self, include_footers, callback)
+
+    def snapshot(self):
+        '''
+        Returns a picklable :class:`RequestSnapshot` of the request.
+        '''
+
+        return RequestSnapshot(self)
+
     def param(self, name, default=RequestHandler._ARG_DEFAULT,
                     strip=True, type=identity, ensure=identity):
         '''
@@ -189,6 +419,9 @@ class Request(RequestHandler):
         Returns the error message as a string.
         '''
 
+        if offloaded_request() is self:
+            raise OffloadedError(error, status_code)
+
         content = str(error or '')
 
         self.status_code = getattr(error, 'status_code', status_code)
@@ -204,22 +437,45 @@ class Request(RequestHandler):
         should just use keywords. The `obj`ect has higher presedense and the
         keywords will be ignored.
 
+        If the `object` is an iterator, e.g. a generator, it is streamed as a
+        JSON array with :meth:`stream_json`.
+
         Returns the created JSON.
         '''
 
-        content = to_json(object or json)
+        if isinstance(object, Iterator):
+            return self.stream_json(object)
+
+        content = self.application.json_codec.encode(object or json)
 
         self.content_type = 'application/json'
         self.write(content)
 
         return content
 
+    def ndjson(self, object):
+        '''
+        Streams an `object` as newline delimited JSON.
+
+        Lists, tuples and iterators are streamed item by item, other objects
+        as a single line.
+        '''
+
+        if not isinstance(object, (list, tuple, Iterator)):
+            object = [object]
+
+        return self.stream_json(object, ndjson=True)
+
     def send(self, object):
         '''
         Sends an `object` to the output buffer.
 
         If the object is `list`, `tuple` or `dict` it will be send it as a JSON
-        and we will set the content type to _application/json_.
+        and we will set the content type to _application/json_. If it is an
+        iterator, e.g. a generator, it will be streamed as a JSON array. The
+        representation is negotiated with the _Accept_ header out of the
+        :attr:`REPRESENTATIONS`, so clients can ask for newline delimited
+        JSON too.
 
         If the object is an exception it will finalize the request, set the
         status code to 500 if the `object` does not have a `status_code`
@@ -228,8 +484,12 @@ class Request(RequestHandler):
         Otherwise will write a unicode representation of the object.
         '''
 
-        if isinstance(object, (dict, list, tuple)):
-            return self.json(object)
+        if isinstance(object, (dict, list, tuple, Iterator)):
+            representations = self.REPRESENTATIONS
+            media_type = self.negotiate(representations, vary=True)
+            method = representations.get(media_type, 'json')
+
+            return getattr(self, method)(object)
         elif isinstance(object, Exception):
             return self.error(object)
 
@@ -239,6 +499,114 @@ class Request(RequestHandler):
 
         return content
 
+    def negotiate(self, available, default=None, vary=False):
+        '''
+        Picks the best of the `available` media types for the request
+        _Accept_ header or returns `default` if none is acceptable.
+
+        The header parsing and the decision are cached by the raw header. If
+        `vary` is truthful, the response will vary on the _Accept_ header.
+        '''
+
+        if vary:
+            self.add_header('Vary', 'Accept')
+
+        return negotiate(self.headers.get('Accept'),
+                         tuple(available)) or default
+
+    def stream_json(self, iterable, ndjson=False):
+        '''
+        Streams the items of an `iterable` as a JSON array or as newline
+        delimited JSON, if `ndjson` is truthful.
+
+        The items are encoded one by one and flushed in chunks of
+        :attr:`STREAM_CHUNK_SIZE` bytes. The next chunk is encoded only after
+        the previous one is written to the client, so the memory used does
+        not depend on the number of items.
+
+        This method finishes the request once the items are exhausted, so the
+        handler does not have to be asynchronous.
+        '''
+
+        encode = self.application.json_codec.encode
+
+        if ndjson:
+            self.content_type = 'application/x-ndjson'
+            pieces = encode_ndjson(iterable, encode)
+        else:
+            self.content_type = 'application/json'
+            pieces = encode_json_array(iterable, encode)
+
+        self._auto_finish = False
+
+        def send_chunk():
+            size = 0
+
+            for piece in pieces:
+                self.write(piece)
+                size += len(piece)
+
+                if size >= self.STREAM_CHUNK_SIZE:
+                    return self.flush(callback=send_chunk)
+
+            self.finish()
+
+        send_chunk()
+
+
+def encode_json_array(iterable, encode):
+    '''
+    Encodes the items of an `iterable` as a JSON array with `encode`, piece by
+    piece.
+    '''
+
+    yield '['
+
+    for index, item in enumerate(iterable):
+        yield (',' + encode(item)) if index else encode(item)
+
+    yield ']'
+
+
+def encode_ndjson(iterable, encode):
+    '''
+    Encodes the items of an `iterable` as newline delimited JSON with
+    `encode`, line by line.
+    '''
+
+    for item in iterable:
+        yield encode(item) + '\n'
+
+
+class RequestSnapshot(object):
+    '''
+    Picklable copy of the request data, which can be sent to other processes.
+
+    Has the request `method`, `uri`, `path`, `arguments`, `headers` and
+    `data`, and the parsed `params` as a dictionary, if any.
+    '''
+
+    __slots__ = 'method uri path arguments headers data params'.split()
+
+    def __init__(self, request):
+        self.method = request.request.method
+        self.uri = request.request.uri
+        self.path = request.request.path
+        self.arguments = dict(request.request.arguments)
+        self.headers = dict(request.headers)
+        self.data = request.data
+
+        params = getattr(request, 'params', None)
+        self.params = params and dict((name, getattr(params, name))
+                                      for name in params.__slots__)
+
+    def __getstate__(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
 
 class RequestComposition(object):
     def __init__(self, request):
@@ -261,7 +629,7 @@ class Converters(RequestComposition):
         '''
 
         if self.request.content_type == 'application/json':
-            return json.loads(self.request.data)
+            return self.request.application.json_codec.decode(self.request.data)
 
 
 class Cookie(RequestComposition):
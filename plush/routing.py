@@ -0,0 +1,286 @@
+from __future__ import absolute_import
+
+import re
+
+from tornado.web import URLSpec, ErrorHandler
+
+__all__ = "DispatchIndex".split()
+
+
+#: Characters with a special meaning in a regular expression.
+METACHARACTERS = frozenset('.^$*+?{}[]|()')
+
+#: Matches backreferences and inline flags, which can not live in a combined
+#: alternation.
+UNINDEXABLE = re.compile(r'\\[1-9]|\(\?P=|\(\?[iLmsux]')
+
+
+def split_literal_prefix(pattern):
+    '''
+    Splits a route `pattern` to its literal prefix and its dynamic tail.
+
+    Returns a tuple of the unescaped literal prefix and the rest of the
+    pattern. The tail is `None` if the whole pattern is a literal.
+    '''
+
+    if pattern.startswith('^'):
+        pattern = pattern[1:]
+    if pattern.endswith('$') and not pattern.endswith('\\$'):
+        pattern = pattern[:-1]
+
+    literal, position = [], 0
+
+    while position < len(pattern):
+        char = pattern[position]
+
+        if char == '\\':
+            escaped = pattern[position + 1:position + 2]
+            if not escaped or escaped.isalnum():
+                break
+            literal.append(escaped)
+            position += 2
+        elif char in METACHARACTERS:
+            break
+        else:
+            literal.append(char)
+            position += 1
+
+    if position == len(pattern):
+        return ''.join(literal), None
+
+    # Quantifiers bind to the preceding character, so give it back.
+    if pattern[position] in '*+?{' and literal:
+        literal.pop()
+        position -= 2 if pattern[position - 2:position - 1] == '\\' else 1
+
+    return ''.join(literal), pattern[position:]
+
+
+def indexable(pattern):
+    '''
+    Checks whether a route `pattern` can be placed in the dispatch index.
+
+    Patterns with backreferences, inline flags or a top level alternation are
+    matched on their own.
+    '''
+
+    if UNINDEXABLE.search(pattern):
+        return False
+
+    depth, position, in_class = 0, 0, False
+
+    while position < len(pattern):
+        char = pattern[position]
+
+        if char == '\\':
+            position += 1
+        elif in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+            if pattern.startswith('[]', position):
+                position += 1
+            elif pattern.startswith('[^]', position):
+                position += 2
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return False
+
+        position += 1
+
+    return True
+
+
+def uncapture(pattern):
+    '''
+    Rewrites the capturing groups of a `pattern` to non-capturing ones.
+
+    Used to place many route patterns into a single alternation, where only
+    the alternative that matched is interesting.
+    '''
+
+    result, position, in_class = [], 0, False
+
+    while position < len(pattern):
+        char = pattern[position]
+
+        if char == '\\':
+            result.append(pattern[position:position + 2])
+            position += 2
+            continue
+
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+            # A leading `]` or `^]` is a literal inside the class.
+            for prefix in ('[]', '[^]'):
+                if pattern.startswith(prefix, position):
+                    result.append(prefix)
+                    position += len(prefix)
+                    break
+            else:
+                result.append(char)
+                position += 1
+            continue
+        elif pattern.startswith('(?P<', position):
+            position = pattern.index('>', position) + 1
+            result.append('(?:')
+            continue
+        elif char == '(' and not pattern.startswith('(?', position):
+            result.append('(?:')
+            position += 1
+            continue
+
+        result.append(char)
+        position += 1
+
+    return ''.join(result)
+
+
+class DispatchNode(object):
+    '''
+    A node in the literal segments prefix trie.
+
+    Keeps the dynamic routes, whose literal prefix ends at this node, in a
+    single compiled alternation.
+    '''
+
+    __slots__ = 'children routes alternations fallback'.split()
+
+    #: Python limits the number of groups in a single regular expression.
+    MAX_ALTERNATIVES = 99
+
+    def __init__(self):
+        self.children = {}
+        self.routes = []
+        self.alternations = []
+        self.fallback = []
+
+    def add(self, order, tail, spec):
+        self.routes.append((order, tail, spec))
+
+    def add_fallback(self, order, regex, spec):
+        self.fallback.append((order, regex, spec))
+
+    def compile(self):
+        '''
+        Compiles the alternations of the node dynamic routes and the ones of
+        its children.
+        '''
+
+        for start in xrange(0, len(self.routes), self.MAX_ALTERNATIVES):
+            chunk = self.routes[start:start + self.MAX_ALTERNATIVES]
+            regex = re.compile('|'.join('((?:%s)$)' % uncapture(tail)
+                                        for (_, tail, _) in chunk))
+
+            # Every alternative is a single group, so the matched group index
+            # is the alternative position.
+            self.alternations.append(
+                (regex, [None] + [(order, spec) for (order, _, spec) in chunk]))
+
+        self.routes = None
+
+        for child in self.children.itervalues():
+            child.compile()
+
+    def match(self, remainder):
+        '''
+        Returns the first `(order, spec)` pair whose tail matches the
+        `remainder` of the path or `None`.
+        '''
+
+        found = None
+
+        for regex, routes in self.alternations:
+            match = regex.match(remainder)
+            if match:
+                found = routes[match.lastindex]
+                break
+
+        for order, regex, spec in self.fallback:
+            if found is not None and found[0] < order:
+                break
+            if regex.match(remainder):
+                found = order, spec
+                break
+
+        return found
+
+
+class DispatchIndex(object):
+    '''
+    Route lookup index for a list of :class:`URLSpec`\ s.
+
+    Fully literal patterns are looked up in a dictionary. Patterns with a
+    dynamic tail are placed in a prefix trie of their literal path segments,
+    where every node matches all of its tails with one combined regex. A
+    lookup costs one dictionary hit and one regex match per path segment, no
+    matter how many routes there are.
+
+    The lookup keeps the tornado semantics of the first registered matching
+    pattern winning.
+    '''
+
+    #: The spec used for paths no route matches.
+    NOT_FOUND = URLSpec(r'.*', ErrorHandler, dict(status_code=404))
+
+    def __init__(self, specs):
+        self.specs = list(specs)
+        self.literals = {}
+        self.root = DispatchNode()
+
+        for order, spec in enumerate(self.specs):
+            if not indexable(spec.regex.pattern):
+                self.root.add_fallback(order, spec.regex, spec)
+                continue
+
+            literal, tail = split_literal_prefix(spec.regex.pattern)
+
+            if tail is None:
+                self.literals.setdefault(literal, (order, spec))
+                continue
+
+            separator = literal.rfind('/') + 1
+            node = self.root
+
+            for segment in literal[:separator].split('/')[:-1]:
+                node = node.children.setdefault(segment, DispatchNode())
+
+            node.add(order, re.escape(literal[separator:]) + tail, spec)
+
+        self.root.compile()
+
+    def match(self, path):
+        '''
+        Returns the first :class:`URLSpec` matching `path` or `None`.
+        '''
+
+        found = self.literals.get(path)
+        node, position = self.root, 0
+
+        while node is not None:
+            candidate = node.match(path[position:])
+            if candidate is not None and (found is None or
+                                          candidate[0] < found[0]):
+                found = candidate
+
+            separator = path.find('/', position)
+            if separator < 0:
+                break
+
+            node = node.children.get(path[position:separator])
+            position = separator + 1
+
+        return found and found[1]
+
+    def lookup(self, path):
+        '''
+        Returns a list with the :class:`URLSpec` to handle `path`. When no
+        route matches, the list contains a spec responding with 404.
+        '''
+
+        return [self.match(path) or self.NOT_FOUND]
@@ -0,0 +1,163 @@
+from __future__ import absolute_import
+
+import time
+import random
+
+from tornado import stack_context
+from tornado.ioloop import IOLoop
+
+__all__ = "Job JobStats".split()
+
+
+class JobStats(object):
+    '''
+    Run time statistics of a :class:`Job`, in seconds.
+    '''
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.queued = 0
+        self.total = 0.0
+        self.last = None
+        self.min = None
+        self.max = None
+
+    @property
+    def mean(self):
+        return self.total / self.runs if self.runs else None
+
+    def record(self, elapsed, failed=False):
+        self.runs += 1
+        self.failures += bool(failed)
+        self.total += elapsed
+        self.last = elapsed
+        self.min = elapsed if self.min is None else min(self.min, elapsed)
+        self.max = elapsed if self.max is None else max(self.max, elapsed)
+
+    def __repr__(self):
+        return ('JobStats(runs=%d, failures=%d, skipped=%d, queued=%d, '
+                'mean=%r, max=%r)' % (self.runs, self.failures, self.skipped,
+                                      self.queued, self.mean, self.max))
+
+
+class Job(object):
+    '''
+    Recurring job calling a `callback` every `interval` milliseconds.
+
+    The runs are aligned to the time the job started, so they do not drift,
+    no matter how long each of them takes. Every run is delayed with a random
+    `jitter` of up to that much milliseconds, to spread the load of the same
+    job in many workers.
+
+    If the job is `asynchronous`, the `callback` is called with a `done`
+    function, which has to be called once the run is over. At most
+    `max_concurrent` runs are in progress at once. On overrun, a run is
+    skipped or, if `overrun` is `'queue'`, started as soon as the previous one
+    is done. The runs missed while the IO loop was blocked are skipped.
+
+    Keeps the run times statistics in `stats`.
+    '''
+
+    io_loop_class = IOLoop
+
+    OVERRUN_POLICIES = frozenset(['skip', 'queue'])
+
+    def __init__(self, interval, callback, jitter=0, max_concurrent=1,
+                 overrun='skip', asynchronous=False, io_loop=None):
+        if overrun not in self.OVERRUN_POLICIES:
+            raise ValueError('overrun %r must be one of %r' %
+                             (overrun, sorted(self.OVERRUN_POLICIES)))
+
+        self.interval = interval / 1000.0
+        self.callback = stack_context.wrap(callback)
+        self.jitter = jitter / 1000.0
+        self.max_concurrent = max_concurrent
+        self.overrun = overrun
+        self.asynchronous = asynchronous
+        self.io_loop = io_loop
+        self.stats = JobStats()
+        self.running = 0
+        self.queued = False
+        self.next_run = None
+        self.timeout = None
+
+    @property
+    def started(self):
+        return self.timeout is not None
+
+    def start(self, io_loop=None):
+        '''
+        Starts the job on the `io_loop`. The first run is one `interval`
+        later.
+        '''
+
+        self.io_loop = io_loop or self.io_loop or self.io_loop_class.instance()
+        self.next_run = time.time() + self.interval
+        self.schedule()
+
+    def stop(self):
+        '''
+        Stops scheduling runs. The ones in progress are not affected.
+        '''
+
+        if self.timeout is not None:
+            self.io_loop.remove_timeout(self.timeout)
+            self.timeout = None
+
+        self.queued = False
+
+    def schedule(self):
+        deadline = self.next_run + random.uniform(0, self.jitter)
+        self.timeout = self.io_loop.add_timeout(deadline, self.tick)
+
+    def tick(self):
+        now = time.time()
+
+        self.next_run += self.interval
+        if self.next_run <= now:
+            missed = int((now - self.next_run) // self.interval) + 1
+            self.next_run += missed * self.interval
+            self.stats.skipped += missed
+
+        self.schedule()
+
+        if self.running < self.max_concurrent:
+            self.run()
+        elif self.overrun == 'queue' and not self.queued:
+            self.queued = True
+            self.stats.queued += 1
+        else:
+            self.stats.skipped += 1
+
+    def run(self):
+        self.running += 1
+        started, finished = time.time(), []
+
+        def done(failed=False):
+            if not finished:
+                finished.append(True)
+                self.finish(started, failed)
+
+        if not self.asynchronous:
+            done(failed=not self.call())
+        elif not self.call(done):
+            done(failed=True)
+
+    def call(self, *args):
+        try:
+            self.callback(*args)
+        except Exception:
+            self.io_loop.handle_callback_exception(self.callback)
+            return False
+
+        return True
+
+    def finish(self, started, failed=False):
+        self.running -= 1
+        self.stats.record(time.time() - started, failed)
+
+        if self.queued and self.running < self.max_concurrent:
+            self.queued = False
+            self.run()
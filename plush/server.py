@@ -1,30 +1,204 @@
-from tornado.httpserver import HTTPServer
-from tornado.ioloop import IOLoop
+import os
+import sys
+import time
+import signal
+import logging
+import subprocess
+
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+from .workers import Workers
+from .httpserver import HTTPServer
+from .util.lang import cachedproperty
+from .util.net import REUSE_PORT_SUPPORTED, bind_sockets, clone_sockets, \
+                      encode_sockets, decode_sockets, set_close_exec
 
 
 class Server(object):
     '''
     Wrapper around the tornado server.
+
+    On `SIGTERM` the server drains: it stops accepting connections, lets the
+    in-flight requests finish within a deadline and exits.
+
+    On `SIGHUP` the server executes a new generation of its process, handing
+    it the listening sockets. Once the new generation serves, it asks the old
+    one to drain.
     '''
 
     DEFAULT_HTTP_PORT = 8088
+    DEFAULT_MAX_RESTARTS = 100
+    DEFAULT_DRAIN_TIMEOUT = 30
+
+    #: The environment variables used to talk to a new generation.
+    LISTEN_SOCKETS_ENVAR = 'PLUSH_LISTEN_SOCKETS'
+    PARENT_PID_ENVAR = 'PLUSH_PARENT_PID'
 
     http_server_class = HTTPServer
     io_loop_class = IOLoop
+    workers_class = Workers
 
-    def __init__(self, backend, io_loop):
+    def __init__(self, backend, io_loop=None):
         self.backend = backend
-        self.io_loop = io_loop or self.io_loop_class.instance()
+        self.http_server = None
+        self.workers = None
+        self.sockets = []
+        self.drain_timeout = self.DEFAULT_DRAIN_TIMEOUT
+
+        if io_loop is not None:
+            self.io_loop = io_loop
+
+    @cachedproperty
+    def io_loop(self):
+        '''
+        Returns the IO loop to serve on.
+
+        Resolved on first use, so worker processes create their own loop.
+        '''
+
+        return self.io_loop_class.instance()
 
     def serve(self, **options):
-        server = self.http_server_class(self.backend)
-        server.listen(options.get('port', 8088))
+        '''
+        Serves the backend application.
+
+        The supported `options` are:
+          * `port` - the port to listen on, defaults to 8088.
+          * `address` - the address to listen on, defaults to all interfaces.
+          * `workers` - the number of processes to serve with. Zero or less
+                        means one per CPU core. Defaults to 1.
+          * `max_restarts` - how many times to restart crashed workers.
+          * `reuse_port` - let every worker listen on its own `SO_REUSEPORT`
+                           socket, so the kernel spreads the connections.
+                           Defaults to true where supported.
+          * `drain_timeout` - seconds to wait for the in-flight requests on
+                              `SIGTERM`, defaults to 30.
+          * `show_heading` - print the plush heading, defaults to true.
+          * `on_ready` - a callback called on the IO loop of every worker,
+                         once it serves.
+
+        With many workers, the sockets are bound once in the master process
+        and then the workers are forked. The IO loop must not be created
+        before that.
+        '''
+
+        workers = options.get('workers', 1)
+        reuse_port = options.get('reuse_port', REUSE_PORT_SUPPORTED)
+        reuse_port = reuse_port and workers != 1
+
+        self.drain_timeout = options.get('drain_timeout',
+                                         self.DEFAULT_DRAIN_TIMEOUT)
+        self.sockets = sockets = self.inherit_sockets() or bind_sockets(
+            options.get('port', self.DEFAULT_HTTP_PORT),
+            options.get('address'), reuse_port=reuse_port,
+            listen=not reuse_port)
 
         if options.get('show_heading', True):
             self.show_heading()
 
+        if workers != 1:
+            max_restarts = options.get('max_restarts',
+                                       self.DEFAULT_MAX_RESTARTS)
+            self.workers = self.workers_class(workers, max_restarts)
+
+            signal.signal(signal.SIGTERM, lambda *_: self.workers.stop())
+            signal.signal(signal.SIGHUP, lambda *_: self.reexec())
+
+            self.workers.fork(on_ready=self.notify_parent)
+
+            # In a worker from now on. The generations are handled by the
+            # master process.
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+            if reuse_port:
+                sockets = clone_sockets(sockets)
+                for sock in self.sockets:
+                    sock.close()
+        else:
+            signal.signal(signal.SIGHUP, self.on_signal(self.reexec))
+
+        signal.signal(signal.SIGTERM, self.on_signal(self.drain))
+
+        self.http_server = self.http_server_class(self.backend,
+                                                  io_loop=self.io_loop)
+        self.http_server.add_sockets(sockets)
+
+        if self.workers is None:
+            self.notify_parent()
+
+        if options.get('on_ready'):
+            self.io_loop.add_callback(options['on_ready'])
+
         self.io_loop.start()
 
+    def on_signal(self, callback):
+        '''
+        Creates a signal handler running `callback` on the IO loop.
+        '''
+
+        return lambda *_: self.io_loop.add_callback(callback)
+
+    def drain(self):
+        '''
+        Stops accepting connections and stops the IO loop once the in-flight
+        requests are finished or the drain timeout expires.
+        '''
+
+        if self.http_server is not None:
+            self.http_server.stop()
+
+        self.backend.drain()
+
+        deadline = time.time() + self.drain_timeout
+
+        def stop_when_drained():
+            if not self.backend.in_flight or time.time() >= deadline:
+                if self.backend.in_flight:
+                    logging.warning('Dropping %d in-flight requests',
+                                    len(self.backend.in_flight))
+                poller.stop()
+                self.io_loop.stop()
+
+        poller = PeriodicCallback(stop_when_drained, 100, self.io_loop)
+        poller.start()
+
+        stop_when_drained()
+
+    def reexec(self):
+        '''
+        Executes a new generation of the current process, handing it the
+        listening sockets.
+        '''
+
+        env = dict(os.environ)
+        env[self.LISTEN_SOCKETS_ENVAR] = encode_sockets(self.sockets)
+        env[self.PARENT_PID_ENVAR] = str(os.getpid())
+
+        try:
+            subprocess.Popen([sys.executable] + sys.argv, env=env)
+        finally:
+            for sock in self.sockets:
+                set_close_exec(sock.fileno())
+
+    def inherit_sockets(self):
+        '''
+        Returns the sockets handed by a previous generation, if any.
+        '''
+
+        encoded = os.environ.pop(self.LISTEN_SOCKETS_ENVAR, None)
+
+        return encoded and decode_sockets(encoded)
+
+    def notify_parent(self):
+        '''
+        Asks the previous generation, if any, to drain.
+        '''
+
+        parent_pid = os.environ.pop(self.PARENT_PID_ENVAR, None)
+
+        if parent_pid is not None:
+            os.kill(int(parent_pid), signal.SIGTERM)
+
     def show_heading(self):
         print '''\
  ______ _____   _______ _______ _______
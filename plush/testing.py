@@ -2,6 +2,8 @@ from tornado.escape import url_escape
 from tornado.httpclient import HTTPRequest
 from tornado.testing import AsyncHTTPTestCase
 
+from .httpserver import HTTPServer
+
 __all__ = 'TestCase test_case_for'.split()
 
 
@@ -21,8 +23,20 @@ class PostRequest(HTTPRequest):
 class TestCase(AsyncHTTPTestCase):
     '''
     Basic asynchronous test case supporting easier post client requests.
+
+    Serves the application with the plush HTTP server, like in production.
     '''
 
+    http_server_class = HTTPServer
+
+    def setUp(self):
+        AsyncHTTPTestCase.setUp(self)
+
+        self.http_server.stop()
+        self.http_server = self.http_server_class(
+            self._app, io_loop=self.io_loop, **self.get_httpserver_options())
+        self.http_server.listen(self.get_http_port(), address='127.0.0.1')
+
     def post(self, path, body, **kwargs):
         self.http_client.fetch(PostRequest(self.get_url(path), body, **kwargs),
                                self.stop)
@@ -0,0 +1,34 @@
+import os
+
+__all__ = 'is_private_directory ensure_private_directory'.split()
+
+
+def is_private_directory(path):
+    '''
+    Checks whether the directory at `path` is owned by the current user and
+    nobody else can write to it.
+    '''
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+def ensure_private_directory(path):
+    '''
+    Creates a directory at `path` only the current user can access, if it is
+    missing. Returns whether the directory is private, as an existing one
+    may not be.
+    '''
+
+    if not os.path.isdir(path):
+        try:
+            os.makedirs(path, 0o700)
+        except OSError:
+            # Created in the meantime, if at all. Checked below.
+            pass
+
+    return is_private_directory(path)
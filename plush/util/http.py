@@ -1,12 +1,19 @@
-def parse_content_type(raw_content_type):
+from .lru import memoize
+
+#: How many distinct header values to keep parsed.
+HEADER_CACHE_SIZE = 256
+
+
+def split_media_type(raw_media_type):
     '''
-    Parses HTTP _Content-Type_ header.
+    Splits a media type with parameters, as found in HTTP _Content-Type_ and
+    _Accept_ headers.
 
-    Returns a tuple of the parsed type as a string, and a dictionary of the
-    parsed parameters.
+    Returns a tuple of the type as a string, and a dictionary of the
+    parameters.
     '''
 
-    type, _, params = (raw_content_type or '').partition(';')
+    type, _, params = (raw_media_type or '').partition(';')
     type = type.strip()
 
     params = filter(bool, params.split(';'))
@@ -16,6 +23,94 @@ def parse_content_type(raw_content_type):
 
     return (type, params)
 
+
+@memoize(HEADER_CACHE_SIZE)
+def parse_content_type(raw_content_type):
+    '''
+    Parses HTTP _Content-Type_ header.
+
+    Returns a tuple of the parsed type as a string, and a dictionary of the
+    parsed parameters.
+
+    The results are cached by the raw header, so do not modify them.
+    '''
+
+    return split_media_type(raw_content_type)
+
+
+@memoize(HEADER_CACHE_SIZE)
+def parse_accept(raw_accept):
+    '''
+    Parses HTTP _Accept_ header.
+
+    Returns a tuple of `(media_range, quality)` pairs in the order of the
+    header. Media ranges with invalid qualities are skipped.
+
+    The results are cached by the raw header.
+    '''
+
+    ranges = []
+
+    for item in (raw_accept or '').split(','):
+        media_range, params = split_media_type(item)
+        if not media_range:
+            continue
+
+        try:
+            quality = float(params.get('q', 1))
+        except ValueError:
+            continue
+
+        ranges.append((media_range.lower(), quality))
+
+    return tuple(ranges)
+
+
+def quality_of(media_type, ranges):
+    '''
+    Returns the quality of the most specific of the media `ranges` matching
+    `media_type` or zero if none matches.
+    '''
+
+    major = media_type.split('/')[0] + '/*'
+    best, specificity = 0, 0
+
+    for media_range, quality in ranges:
+        if media_range == media_type:
+            return quality
+        elif media_range == major and specificity < 2:
+            best, specificity = quality, 2
+        elif media_range == '*/*' and specificity < 1:
+            best, specificity = quality, 1
+
+    return best
+
+
+@memoize(HEADER_CACHE_SIZE)
+def negotiate(raw_accept, available):
+    '''
+    Picks the best of the `available` media types for the HTTP _Accept_
+    header, preferring the earlier ones on equal qualities.
+
+    Returns the first available media type if the header is missing and
+    `None` if none of them is acceptable. The `available` media types must be
+    a tuple.
+    '''
+
+    if not raw_accept:
+        return available[0] if available else None
+
+    ranges = parse_accept(raw_accept)
+    best, best_quality = None, 0
+
+    for media_type in available:
+        quality = quality_of(media_type.lower(), ranges)
+        if quality > best_quality:
+            best, best_quality = media_type, quality
+
+    return best
+
+
 def encode_content_type(type, params=None):
     '''
     Encodes `type` string and dictionary of parameters to HTTP _Content-Type_
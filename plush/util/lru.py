@@ -0,0 +1,145 @@
+import functools
+
+from .lang import Sentinel
+
+__all__ = 'LRUCache memoize'.split()
+
+# The links of the recency list are lists of
+# [previous, next, key, value, weight].
+PREVIOUS, NEXT, KEY, VALUE, WEIGHT = range(5)
+
+
+class LRUCache(object):
+    '''
+    Mapping of at most `maxsize` items, which evicts the least recently used
+    ones first.
+
+    If `weigh` is given, it should be a function returning the weight of a
+    value, e.g. its size in bytes. The `maxsize` then limits the total weight
+    of the values instead of their count.
+
+    Both lookups and updates take constant time.
+    '''
+
+    def __init__(self, maxsize=128, weigh=None):
+        self.maxsize = maxsize
+        self.weigh = weigh or (lambda value: 1)
+        self.weight = 0
+        self.links = {}
+        self.root = []
+        self.root[:] = [self.root, self.root, None, None, 0]
+
+    def get(self, key, default=None):
+        '''
+        Returns the value for `key`, marking it as the most recently used, or
+        `default` if there is no such key.
+        '''
+
+        link = self.links.get(key)
+        if link is None:
+            return default
+
+        self.unlink(link)
+        self.append(link)
+
+        return link[VALUE]
+
+    def set(self, key, value):
+        '''
+        Sets the `value` for `key`, evicting the least recently used item if
+        the cache is full.
+        '''
+
+        weight = self.weigh(value)
+
+        link = self.links.get(key)
+        if link is not None:
+            self.unlink(link)
+            self.weight -= link[WEIGHT]
+            link[VALUE], link[WEIGHT] = value, weight
+        else:
+            link = self.links[key] = [None, None, key, value, weight]
+
+        self.weight += weight
+        self.append(link)
+
+        while self.weight > self.maxsize:
+            self.evict()
+
+    def pop(self, key, default=None):
+        '''
+        Removes the `key` and returns its value or `default` if there is no
+        such key.
+        '''
+
+        link = self.links.pop(key, None)
+        if link is None:
+            return default
+
+        self.unlink(link)
+        self.weight -= link[WEIGHT]
+
+        return link[VALUE]
+
+    def evict(self):
+        '''
+        Removes the least recently used item and returns its key and value.
+        '''
+
+        link = self.root[NEXT]
+        if link is self.root:
+            raise KeyError('Evicting from an empty cache')
+
+        self.unlink(link)
+        self.weight -= link[WEIGHT]
+        del self.links[link[KEY]]
+
+        return link[KEY], link[VALUE]
+
+    def clear(self):
+        self.links.clear()
+        self.weight = 0
+        self.root[:] = [self.root, self.root, None, None, 0]
+
+    def unlink(self, link):
+        previous, next = link[PREVIOUS], link[NEXT]
+        previous[NEXT], next[PREVIOUS] = next, previous
+
+    def append(self, link):
+        last = self.root[PREVIOUS]
+        last[NEXT] = self.root[PREVIOUS] = link
+        link[PREVIOUS], link[NEXT] = last, self.root
+
+    def __contains__(self, key):
+        return key in self.links
+
+    def __len__(self):
+        return len(self.links)
+
+
+def memoize(maxsize=128):
+    '''
+    Decorates a function to memoize its results in a :class:`LRUCache` of
+    `maxsize` items, keyed by its positional arguments.
+
+    The arguments must be hashable. The cache is available as the `cache`
+    attribute of the decorated function.
+    '''
+
+    def decorator(function):
+        cache = LRUCache(maxsize)
+
+        @functools.wraps(function)
+        def memoized(*args):
+            result = cache.get(args, Sentinel)
+            if result is Sentinel:
+                result = function(*args)
+                cache.set(args, result)
+
+            return result
+
+        memoized.cache = cache
+
+        return memoized
+
+    return decorator
@@ -0,0 +1,120 @@
+import os
+import fcntl
+import socket
+
+from tornado.platform.auto import set_close_exec
+
+__all__ = '''
+          REUSE_PORT_SUPPORTED
+          bind_sockets clone_sockets encode_sockets decode_sockets
+          set_close_exec
+          '''.split()
+
+#: Whether the kernel lets many sockets listen on the same port.
+REUSE_PORT_SUPPORTED = hasattr(socket, 'SO_REUSEPORT')
+
+
+def configure_socket(sock, reuse_port=False):
+    '''
+    Sets the listening options of a `sock`et.
+
+    If `reuse_port` is truthful, other sockets can bind to the same port and
+    the kernel will spread the incoming connections between them.
+    '''
+
+    set_close_exec(sock.fileno())
+
+    if os.name != 'nt':
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    if sock.family == socket.AF_INET6 and hasattr(socket, 'IPPROTO_IPV6'):
+        sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+
+    sock.setblocking(0)
+
+    return sock
+
+
+def bind_sockets(port, address=None, reuse_port=False, listen=True,
+                 backlog=128):
+    '''
+    Creates sockets bound to the given `port` and `address`.
+
+    Behaves like :func:`tornado.netutil.bind_sockets`, but can bind the
+    sockets with `SO_REUSEPORT` and leave them not listening, which only
+    reserves the address.
+    '''
+
+    flags = socket.AI_PASSIVE | getattr(socket, 'AI_ADDRCONFIG', 0)
+    infos = socket.getaddrinfo(address or None, port, socket.AF_UNSPEC,
+                               socket.SOCK_STREAM, 0, flags)
+
+    sockets = []
+
+    for family, type, proto, _, sockaddr in set(infos):
+        sock = configure_socket(socket.socket(family, type, proto),
+                                reuse_port)
+        sock.bind(sockaddr)
+        if listen:
+            sock.listen(backlog)
+
+        sockets.append(sock)
+
+    return sockets
+
+
+def clone_sockets(sockets, backlog=128):
+    '''
+    Creates listening `SO_REUSEPORT` sockets bound to the addresses of the
+    given `sockets`.
+
+    The given sockets must be bound with `SO_REUSEPORT` as well.
+    '''
+
+    clones = []
+
+    for sock in sockets:
+        clone = configure_socket(socket.socket(sock.family, socket.SOCK_STREAM),
+                                 reuse_port=True)
+        clone.bind(sock.getsockname())
+        clone.listen(backlog)
+
+        clones.append(clone)
+
+    return clones
+
+
+def encode_sockets(sockets):
+    '''
+    Encodes `sockets` to a string, which a new process can decode with
+    :func:`decode_sockets`.
+
+    The sockets are made inheritable by the processes executed from the
+    current one. Use :func:`set_close_exec` to revert that.
+    '''
+
+    for sock in sockets:
+        flags = fcntl.fcntl(sock.fileno(), fcntl.F_GETFD)
+        fcntl.fcntl(sock.fileno(), fcntl.F_SETFD, flags & ~fcntl.FD_CLOEXEC)
+
+    return ','.join('%d:%d' % (sock.fileno(), sock.family) for sock in sockets)
+
+
+def decode_sockets(encoded):
+    '''
+    Returns the sockets of a string created with :func:`encode_sockets`.
+    '''
+
+    sockets = []
+
+    for fd, family in (item.split(':') for item in encoded.split(',')):
+        sock = socket.fromfd(int(fd), int(family), socket.SOCK_STREAM)
+        os.close(int(fd))
+
+        set_close_exec(sock.fileno())
+        sock.setblocking(0)
+
+        sockets.append(sock)
+
+    return sockets
@@ -0,0 +1,159 @@
+from __future__ import absolute_import
+
+import time
+
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+__all__ = "TimingWheel Timer".split()
+
+
+class Timer(object):
+    '''
+    Callback scheduled on a :class:`TimingWheel`.
+    '''
+
+    __slots__ = 'wheel deadline callback bucket'.split()
+
+    def __init__(self, wheel, deadline, callback):
+        self.wheel = wheel
+        self.deadline = deadline
+        self.callback = callback
+        self.bucket = None
+
+    @property
+    def active(self):
+        return self.bucket is not None
+
+    def cancel(self):
+        '''
+        Cancels the timer, if not already executed. Takes constant time.
+        '''
+
+        if self.bucket is not None:
+            self.bucket.discard(self)
+            self.bucket = None
+            self.wheel.pending -= 1
+
+
+class TimingWheel(object):
+    '''
+    Hierarchical timing wheel.
+
+    Schedules and cancels timers in constant time, unlike the IO loop timeouts
+    heap, which keeps the canceled timeouts until they expire. Suited for lots
+    of timeouts, which are canceled most of the time, like the idle ones.
+
+    The time is measured in ticks of `resolution` milliseconds and timers fire
+    at the first tick after their deadline. Every of the `levels` wheels has
+    `2 ** bits` slots, each spanning all of the slots of the previous level.
+    Timers past the span of all of the levels are rescheduled on the way.
+
+    The wheel ticks on the `io_loop` only while there are pending timers.
+    '''
+
+    def __init__(self, resolution=10, bits=8, levels=4, io_loop=None):
+        self.resolution = resolution
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.span = 1 << (bits * levels)
+        self.wheels = [[set() for _ in xrange(1 << bits)]
+                       for _ in xrange(levels)]
+        self.io_loop = io_loop or IOLoop.instance()
+        self.current = 0
+        self.pending = 0
+        self.started = None
+        self.ticker = None
+
+    def schedule(self, milliseconds, callback):
+        '''
+        Schedules a `callback` to be called after `milliseconds`. Returns a
+        :class:`Timer`, which can be canceled.
+        '''
+
+        ticks = max(1, -(-int(milliseconds) // self.resolution))
+        timer = Timer(self, self.current + ticks, callback)
+
+        self.place(timer)
+        self.pending += 1
+
+        if self.ticker is None:
+            self.start()
+
+        return timer
+
+    def place(self, timer):
+        remaining = min(timer.deadline - self.current, self.span - 1)
+        deadline = self.current + remaining
+
+        level = 0
+        while remaining >> (self.bits * (level + 1)):
+            level += 1
+
+        timer.bucket = self.wheels[level][
+            (deadline >> (self.bits * level)) & self.mask]
+        timer.bucket.add(timer)
+
+    def advance(self):
+        '''
+        Advances the wheel with one tick, calling the expired timers.
+        '''
+
+        self.current += 1
+
+        level = 0
+        while level + 1 < len(self.wheels) and \
+                not (self.current >> (self.bits * level)) & self.mask:
+            level += 1
+            self.cascade(level)
+
+        bucket = self.wheels[0][self.current & self.mask]
+        if not bucket:
+            return
+
+        for timer in list(bucket):
+            # The callbacks may cancel the timers expiring along with them.
+            if timer.bucket is not bucket:
+                continue
+
+            bucket.discard(timer)
+            timer.bucket = None
+            self.pending -= 1
+
+            try:
+                timer.callback()
+            except Exception:
+                self.io_loop.handle_callback_exception(timer.callback)
+
+    def cascade(self, level):
+        index = (self.current >> (self.bits * level)) & self.mask
+        bucket = self.wheels[level][index]
+
+        timers = list(bucket)
+        bucket.clear()
+
+        for timer in timers:
+            self.place(timer)
+
+    def tick(self):
+        '''
+        Catches up the wheel with the wall clock.
+        '''
+
+        target = int((time.time() - self.started) * 1000 // self.resolution)
+
+        while self.current < target and self.pending:
+            self.advance()
+
+        if not self.pending:
+            self.stop()
+
+    def start(self):
+        self.started = time.time() - self.current * self.resolution / 1000.0
+        self.ticker = PeriodicCallback(self.tick, self.resolution,
+                                       self.io_loop)
+        self.ticker.start()
+
+    def stop(self):
+        if self.ticker is not None:
+            self.ticker.stop()
+            self.ticker = None
@@ -0,0 +1,123 @@
+from __future__ import absolute_import
+
+import os
+import sys
+import errno
+import signal
+import logging
+
+from tornado.process import cpu_count, _reseed_random
+
+__all__ = "Workers".split()
+
+
+class Workers(object):
+    '''
+    Pre-forked worker processes supervisor.
+
+    Forks `count` workers and restarts the ones exiting abnormally, up to
+    `max_restarts` times. Unlike :func:`tornado.process.fork_processes`, it
+    keeps track of its children, so it can relay signals to them.
+    '''
+
+    def __init__(self, count, max_restarts=100):
+        self.count = count if count > 0 else cpu_count()
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self.children = {}
+        self.stopping = False
+
+    def fork(self, on_ready=None):
+        '''
+        Forks the workers.
+
+        Returns the worker id, a number between 0 and `count`, in the workers.
+        In the master process it calls `on_ready` once every worker is forked,
+        supervises them and exits when all of them exit.
+        '''
+
+        for id in xrange(self.count):
+            if self.start(id):
+                return id
+
+        if on_ready is not None:
+            on_ready()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except OSError, exc:
+                if exc.errno == errno.EINTR:
+                    continue
+                raise
+
+            if pid not in self.children:
+                continue
+
+            id = self.children.pop(pid)
+
+            if not self.crashed(id, pid, status) or self.stopping:
+                continue
+
+            self.restarts += 1
+            if self.restarts > self.max_restarts:
+                raise RuntimeError('Too many worker restarts, giving up')
+
+            if self.start(id):
+                return id
+
+        sys.exit(0)
+
+    def start(self, id):
+        '''
+        Forks a worker with `id`.
+
+        Returns true in the worker and false in the master process.
+        '''
+
+        pid = os.fork()
+
+        if pid == 0:
+            _reseed_random()
+            self.children.clear()
+            return True
+
+        self.children[pid] = id
+        return False
+
+    def crashed(self, id, pid, status):
+        '''
+        Checks whether a worker with `id` exited abnormally with `status`.
+        '''
+
+        if os.WIFSIGNALED(status):
+            logging.warning('Worker %d (pid %d) killed by signal %d',
+                            id, pid, os.WTERMSIG(status))
+        elif os.WEXITSTATUS(status) != 0:
+            logging.warning('Worker %d (pid %d) exited with status %d',
+                            id, pid, os.WEXITSTATUS(status))
+        else:
+            logging.info('Worker %d (pid %d) exited normally', id, pid)
+            return False
+
+        return True
+
+    def kill(self, signum=signal.SIGTERM):
+        '''
+        Sends `signum` to every worker.
+        '''
+
+        for pid in self.children.keys():
+            try:
+                os.kill(pid, signum)
+            except OSError, exc:
+                if exc.errno != errno.ESRCH:
+                    raise
+
+    def stop(self):
+        '''
+        Asks the workers to drain and exit, without restarting them.
+        '''
+
+        self.stopping = True
+        self.kill(signal.SIGTERM)
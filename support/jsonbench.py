@@ -0,0 +1,40 @@
+from os.path import abspath, dirname, join
+import sys
+import timeit
+
+sys.path.insert(0, join(abspath(dirname(__file__)), '..'))
+
+from plush.codec import CODECS, codec_for
+
+ROUNDS = 200
+
+
+def user(n):
+    return {
+        'id': n,
+        'name': u'User %d' % n,
+        'email': 'user%d@example.com' % n,
+        'active': n % 2 == 0,
+        'score': n * 1.5,
+        'tags': ['python', 'tornado', 'plush'],
+        'address': {'street': '%d Main St.' % n, 'city': 'Sofia', 'zip': None},
+    }
+
+PAYLOADS = {
+    'small object': user(1),
+    'listing of 500': [user(n) for n in xrange(500)],
+}
+
+
+for payload_name, payload in sorted(PAYLOADS.iteritems()):
+    print '%s:' % payload_name
+
+    for name in sorted(CODECS):
+        codec = codec_for(name)
+        content = codec.encode(payload)
+
+        encode = timeit.timeit(lambda: codec.encode(payload), number=ROUNDS)
+        decode = timeit.timeit(lambda: codec.decode(content), number=ROUNDS)
+
+        print '  %-10s encode %8.1fus, decode %8.1fus' % (
+            name, encode / ROUNDS * 1e6, decode / ROUNDS * 1e6)
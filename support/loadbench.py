@@ -0,0 +1,176 @@
+from os.path import abspath, dirname, join
+import sys
+import json
+import time
+import socket
+import platform
+import functools
+import subprocess
+
+sys.path.insert(0, join(abspath(dirname(__file__)), '..'))
+
+import tornado
+import tornado.options
+from tornado.options import define, options
+from tornado.ioloop import IOLoop
+
+from plush.http import HTTPClient
+
+SUPPORT = abspath(dirname(__file__))
+
+APPS = {
+    'plush': (join(SUPPORT, 'plushapp.py'), 8089),
+    'tornado': (join(SUPPORT, 'tornadoapp.py'), 8090),
+}
+
+SCENARIOS = {
+    'text': '/',
+    'json': '/json',
+    'routes': '/routes/99',
+    'filtered': '/filtered',
+    'cookies': '/cookies',
+}
+
+define('requests', default=5000, help='Requests per scenario')
+define('concurrency', default=50, help='Requests in flight')
+define('warmup', default=500, help='Requests before measuring')
+define('apps', default='plush,tornado', help='Apps to benchmark')
+define('scenarios', default=','.join(sorted(SCENARIOS)),
+       help='Scenarios to run')
+define('output', default=join(SUPPORT, 'loadbench.json'),
+       help='File to write the results to')
+
+
+def percentile(latencies, fraction):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+def wait_for(port, timeout=10):
+    deadline = time.time() + timeout
+
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.1).close()
+            return
+        except socket.error:
+            time.sleep(0.05)
+
+    raise RuntimeError('Nothing listens on port %d' % port)
+
+
+def load(url, total, concurrency, headers=None):
+    '''
+    Fetches `url` `total` times, keeping `concurrency` requests in flight.
+
+    Returns the elapsed time, the sorted latencies, the number of errors and
+    the last response.
+    '''
+
+    io_loop = IOLoop()
+    client = HTTPClient(max_per_host=concurrency, io_loop=io_loop)
+    state = dict(issued=0, done=0, errors=0, response=None)
+    latencies = []
+
+    def issue():
+        state['issued'] += 1
+        client.fetch(url, functools.partial(on_response, time.time()),
+                     headers=dict(headers or {}), request_timeout=30)
+
+    def on_response(started, response):
+        latencies.append(time.time() - started)
+        state['done'] += 1
+        state['errors'] += bool(response.error)
+        state['response'] = response
+
+        if state['issued'] < total:
+            issue()
+        elif state['done'] == total:
+            io_loop.stop()
+
+    started = time.time()
+
+    for _ in xrange(min(total, concurrency)):
+        issue()
+    io_loop.start()
+
+    elapsed = time.time() - started
+
+    client.close()
+    io_loop.close(all_fds=True)
+
+    return elapsed, sorted(latencies), state['errors'], state['response']
+
+
+def run(path, port, scenarios):
+    server = subprocess.Popen([sys.executable, path, str(port)])
+
+    try:
+        wait_for(port)
+
+        results = {}
+
+        for scenario in scenarios:
+            url = 'http://127.0.0.1:%d%s' % (port, SCENARIOS[scenario])
+
+            _, _, _, response = load(url, options.warmup, options.concurrency)
+
+            headers = {}
+            if 'Set-Cookie' in response.headers:
+                headers['Cookie'] = response.headers['Set-Cookie'].split(';')[0]
+
+            elapsed, latencies, errors, _ = load(url, options.requests,
+                                                 options.concurrency, headers)
+
+            results[scenario] = dict(
+                requests_per_second=round(len(latencies) / elapsed, 1),
+                p50_ms=round(percentile(latencies, 0.50) * 1000, 3),
+                p99_ms=round(percentile(latencies, 0.99) * 1000, 3),
+                mean_ms=round(sum(latencies) / len(latencies) * 1000, 3),
+                errors=errors)
+
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    tornado.options.parse_command_line()
+
+    apps = options.apps.split(',')
+    scenarios = options.scenarios.split(',')
+
+    results = dict((app, run(APPS[app][0], APPS[app][1], scenarios))
+                   for app in apps)
+
+    overhead = {}
+    if 'plush' in results and 'tornado' in results:
+        overhead = dict(
+            (scenario, round(1 - results['plush'][scenario]
+                             ['requests_per_second'] /
+                             results['tornado'][scenario]
+                             ['requests_per_second'], 3))
+            for scenario in scenarios)
+
+    report = dict(
+        meta=dict(time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                  python=platform.python_version(),
+                  tornado=tornado.version, requests=options.requests,
+                  concurrency=options.concurrency),
+        results=results, overhead=overhead)
+
+    with open(options.output, 'w') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+
+    for app in apps:
+        for scenario in scenarios:
+            result = results[app][scenario]
+            print '%-8s %-9s %8.1f req/s  p50 %7.3fms  p99 %7.3fms' % (
+                app, scenario, result['requests_per_second'],
+                result['p50_ms'], result['p99_ms'])
+
+    print 'Results written to %s' % options.output
+
+
+if __name__ == '__main__':
+    main()
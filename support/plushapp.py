@@ -5,10 +5,56 @@ sys.path.insert(0, join(abspath(dirname(__file__)), '..'))
 
 from plush import Plush
 
-app = Plush(__name__)
+ROUTES = 100
+
+app = Plush(__name__, COOKIE_SECRET='benchmark')
 
 @app.get('/')
 def index(request):
     request.send('Hello World!')
 
-app.run()
+@app.get('/json')
+def json(request):
+    request.send({'message': 'Hello World!'})
+
+def route(n):
+    @app.get('/routes/%d' % n)
+    def routed(request):
+        request.send('Route %d' % n)
+
+for n in xrange(ROUTES):
+    route(n)
+
+class Greeting(object):
+    def greeting(self):
+        return 'Hello World!'
+
+class Signature(object):
+    def sign(self, content):
+        return content + '.'
+
+@app.get('/filtered', mixins=[Greeting, Signature])
+def filtered(request):
+    request.send(request.sign(request.greeting()))
+
+@app.before(filtered)
+def authenticate(request):
+    request.user = 'benchmark'
+
+@app.before(filtered)
+def trace(request):
+    request.set_header('X-Trace', '1')
+
+@app.after(filtered)
+def audit(request):
+    request.set_header('X-User', request.user)
+
+@app.get('/cookies')
+def cookies(request):
+    visits = int(request.get_secure_cookie('visits') or 0) + 1
+    request.set_secure_cookie('visits', str(visits))
+    request.send('Visit %d' % visits)
+
+if __name__ == '__main__':
+    app.run(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8088,
+            show_heading=False)
@@ -0,0 +1,39 @@
+from os.path import abspath, dirname, join
+import sys
+import timeit
+
+sys.path.insert(0, join(abspath(dirname(__file__)), '..'))
+
+from tornado.web import URLSpec
+
+from plush.routing import DispatchIndex
+
+ROUNDS = 20000
+
+
+def specs_for(count):
+    specs = []
+
+    for n in xrange(count):
+        specs.append(URLSpec(r'/resource%d' % n, None))
+        specs.append(URLSpec(r'/resource%d/(\d+)' % n, None))
+
+    return specs
+
+
+def linear_scan(specs, path):
+    for spec in specs:
+        if spec.regex.match(path):
+            return spec
+
+
+for count in (10, 100, 500):
+    specs = specs_for(count)
+    index = DispatchIndex(specs)
+    path = '/resource%d/42' % (count - 1)
+
+    scan = timeit.timeit(lambda: linear_scan(specs, path), number=ROUNDS)
+    lookup = timeit.timeit(lambda: index.match(path), number=ROUNDS)
+
+    print '%4d routes: scan %6.2fus, index %6.2fus' % (
+        len(specs), scan / ROUNDS * 1e6, lookup / ROUNDS * 1e6)
@@ -0,0 +1,83 @@
+from os.path import abspath, dirname, join
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, join(abspath(dirname(__file__)), '..'))
+
+import yaml
+
+from plush.conf import Settings, SettingsCache
+from plush.util.lang import try_in_order
+
+KEYS = 5000
+LOADS = 20
+
+
+def write_settings(directory):
+    settings = dict(('SETTING_%d' % index, dict(
+        enabled=bool(index % 2), timeout=index * 0.5, name='name %d' % index,
+        hosts=['host%d.example.com' % host for host in xrange(3)]))
+        for index in xrange(KEYS))
+
+    pyfile = join(directory, 'settings.py')
+    with open(pyfile, 'w') as file:
+        for name, value in sorted(settings.iteritems()):
+            file.write('%s = %r\n' % (name, value))
+
+    yamlfile = join(directory, 'settings.yml')
+    with open(yamlfile, 'w') as file:
+        yaml.dump(settings, file)
+
+    return pyfile, yamlfile
+
+
+def trial_and_error(source):
+    # The loading of `from_env`, before it dispatched by extension.
+    settings = Settings()
+
+    return try_in_order(settings.from_pyfile, settings.from_yaml,
+                        settings.from_module, args=(source,))
+
+
+def dispatched(source):
+    os.environ['PLUSH_BENCH_SETTINGS'] = source
+
+    return Settings().from_env('PLUSH_BENCH_SETTINGS')
+
+
+def measure(load, source, cache):
+    Settings.file_cache = cache
+
+    # Warm the cache up, as the first worker would.
+    load(source)
+
+    start = time.time()
+    for _ in xrange(LOADS):
+        load(source)
+
+    return (time.time() - start) / LOADS * 1000
+
+
+def main():
+    directory = tempfile.mkdtemp()
+
+    try:
+        pyfile, yamlfile = write_settings(directory)
+        cache = SettingsCache(join(directory, 'cache'))
+
+        for kind, source in [('pyfile', pyfile), ('yaml', yamlfile)]:
+            for name, load in [('trial', trial_and_error),
+                               ('dispatch', dispatched)]:
+                for cached in [None, cache]:
+                    print '%6s %8s %8s: %8.2fms per load of %d keys' % (
+                        kind, name, 'cached' if cached else 'uncached',
+                        measure(load, source, cached), KEYS)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
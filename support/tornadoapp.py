@@ -1,11 +1,57 @@
+import sys
+
 import tornado.web
 from tornado.ioloop import IOLoop
 
+ROUTES = 100
+
 class Index(tornado.web.RequestHandler):
     def get(self):
         self.write('Hello World!')
 
-app = tornado.web.Application([('/', Index)])
-app.listen(8088)
+class JSON(tornado.web.RequestHandler):
+    def get(self):
+        self.write({'message': 'Hello World!'})
+
+class Routed(tornado.web.RequestHandler):
+    def initialize(self, n):
+        self.n = n
+
+    def get(self):
+        self.write('Route %d' % self.n)
+
+class Greeting(object):
+    def greeting(self):
+        return 'Hello World!'
+
+class Signature(object):
+    def sign(self, content):
+        return content + '.'
+
+class Filtered(tornado.web.RequestHandler, Greeting, Signature):
+    def prepare(self):
+        self.user = 'benchmark'
+        self.set_header('X-Trace', '1')
+
+    def get(self):
+        self.write(self.sign(self.greeting()))
+        self.set_header('X-User', self.user)
+
+class Cookies(tornado.web.RequestHandler):
+    def get(self):
+        visits = int(self.get_secure_cookie('visits') or 0) + 1
+        self.set_secure_cookie('visits', str(visits))
+        self.write('Visit %d' % visits)
+
+app = tornado.web.Application([
+    ('/', Index),
+    ('/json', JSON),
+    ('/filtered', Filtered),
+    ('/cookies', Cookies),
+] + [('/routes/%d' % n, Routed, dict(n=n)) for n in xrange(ROUTES)],
+    cookie_secret='benchmark')
+
+if __name__ == '__main__':
+    app.listen(int(sys.argv[1]) if len(sys.argv) > 1 else 8088)
 
-IOLoop.instance().start()
+    IOLoop.instance().start()
@@ -0,0 +1,48 @@
+from datetime import timedelta as delta
+from os.path import abspath, dirname, join
+import sys
+import time
+
+sys.path.insert(0, join(abspath(dirname(__file__)), '..'))
+
+from tornado.ioloop import IOLoop
+
+from plush.wheel import TimingWheel
+
+PAIRS = 1000000
+TIMEOUT = 30000
+
+
+def noop():
+    pass
+
+
+def heap(io_loop):
+    timeout = delta(milliseconds=TIMEOUT)
+
+    for _ in xrange(PAIRS):
+        io_loop.remove_timeout(io_loop.add_timeout(timeout, noop))
+
+    return len(io_loop._timeouts)
+
+
+def wheel(io_loop):
+    wheel = TimingWheel(io_loop=io_loop)
+
+    for _ in xrange(PAIRS):
+        wheel.schedule(TIMEOUT, noop).cancel()
+
+    return wheel.pending
+
+
+for name, bench in [('heap', heap), ('wheel', wheel)]:
+    io_loop = IOLoop()
+
+    start = time.time()
+    left = bench(io_loop)
+    elapsed = time.time() - start
+
+    print '%5s: %d schedule/cancel pairs in %.2fs, %.2fus each, %d left' % (
+        name, PAIRS, elapsed, elapsed / PAIRS * 1e6, left)
+
+    io_loop.close()
@@ -0,0 +1,113 @@
+import unittest
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from plush import Plush
+from plush.decorators import asynchronous
+from plush.testing import case_for
+
+
+app = Plush(__name__)
+
+@app.get('/filtered')
+def filtered(request):
+    request.write('handler;')
+
+@app.before(filtered)
+def authenticate(request):
+    if request.param('deny', default=False):
+        request.error('Denied', 403)
+
+@app.after(filtered)
+def footer(request):
+    request.write('footer')
+
+@app.get('/verbs')
+def read(request):
+    request.write('read')
+
+@app.post('/verbs')
+def write(request):
+    request.write('write')
+
+def later(value, callback):
+    IOLoop.instance().add_callback(lambda: callback(value))
+
+@app.get('/coroutine')
+def coroutine(request):
+    value = yield gen.Task(later, 'handler;')
+    request.write(value)
+
+@app.before(coroutine)
+def load(request):
+    request.write((yield gen.Task(later, 'before;')))
+
+@app.after(coroutine)
+def trailer(request):
+    request.write('after')
+
+@app.get('/coroutine/failing')
+def failing_coroutine(request):
+    yield gen.Task(later, None)
+    raise RuntimeError
+
+@app.get('/coroutine/manual')
+def manual_coroutine(request):
+    yield gen.Task(later, None)
+    finish_later(request)
+
+@asynchronous
+def finish_later(request):
+    later('manual', request.finish)
+
+
+class TestFilters(case_for(app)):
+    def test_that_it_runs_the_filters_around_the_handler(self):
+        self.assertEqual(self.get('/filtered').body, 'handler;footer')
+
+    def test_that_a_before_filter_can_finish_the_request(self):
+        response = self.get('/filtered?deny=1')
+
+        self.assertEqual(response.code, 403)
+        self.assertEqual(response.body, 'Denied')
+
+
+class TestRouting(case_for(app)):
+    def test_that_it_serves_many_verbs_for_one_pattern(self):
+        self.assertEqual(self.get('/verbs').body, 'read')
+        self.assertEqual(self.post('/verbs', {}).body, 'write')
+
+    def test_that_it_serves_a_pattern_with_a_single_handler(self):
+        specs = [spec for spec in app.prepare().handlers[0][1]
+                 if spec.regex.pattern == '/verbs$']
+
+        self.assertEqual(len(specs), 1)
+
+
+class TestMixins(unittest.TestCase):
+    def test_that_it_rejects_different_mixins_for_one_pattern(self):
+        mixed = Plush(__name__)
+
+        class Prepared(object):
+            def prepare(self):
+                pass
+
+        mixed.get('/items')(lambda request: None)
+        mixed.post('/items', mixins=[Prepared])(lambda request: None)
+
+        self.assertRaises(ValueError, mixed.prepare)
+
+
+class TestCoroutines(case_for(app)):
+    def get_new_ioloop(self):
+        return IOLoop.instance()
+
+    def test_that_it_drives_coroutine_handlers_and_filters(self):
+        self.assertEqual(self.get('/coroutine').body, 'before;handler;after')
+
+    def test_that_it_reports_the_coroutine_errors(self):
+        self.assertEqual(self.get('/coroutine/failing').code, 500)
+
+    def test_that_it_lets_asynchronous_steps_finish_on_their_own(self):
+        self.assertEqual(self.get('/coroutine/manual').body, 'manual')
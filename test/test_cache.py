@@ -0,0 +1,97 @@
+import time
+
+from plush import Plush
+from plush.cache import ResponseCache, CachedResponse
+from plush.testing import case_for
+
+
+app = Plush(__name__)
+calls = []
+
+@app.get('/cached', cache=60)
+def cached(request):
+    calls.append(request.request.uri)
+    request.write('cached %d' % len(calls))
+
+@app.get('/expired', cache=dict(ttl=-1))
+def expired(request):
+    calls.append(request.request.uri)
+    request.write('expired %d' % len(calls))
+
+@app.get('/keyed', cache=dict(ttl=60, params=['page'], vary=['Accept']))
+def keyed(request):
+    calls.append(request.request.uri)
+    request.write('keyed %d' % len(calls))
+
+@app.get('/items', cache=60)
+def items(request):
+    calls.append(request.request.uri)
+    request.send([{'id': 1}, {'id': 2}])
+
+@app.get('/filtered', cache=60)
+def filtered(request):
+    calls.append(request.request.uri)
+    request.write('filtered')
+
+@app.after(filtered)
+def footer(request):
+    calls.append('footer')
+    request.write(' footer')
+
+
+class TestResponseCache(case_for(app)):
+    def setUp(self):
+        super(TestResponseCache, self).setUp()
+
+        del calls[:]
+        self._app.response_cache.clear()
+
+    def test_that_it_serves_hits_without_calling_the_handler(self):
+        self.assertEqual(self.get('/cached').body, 'cached 1')
+        self.assertEqual(self.get('/cached').body, 'cached 1')
+        self.assertEqual(len(calls), 1)
+
+    def test_that_it_drops_the_expired_responses(self):
+        self.assertEqual(self.get('/expired').body, 'expired 1')
+        self.assertEqual(self.get('/expired').body, 'expired 2')
+
+    def test_that_it_answers_conditional_requests(self):
+        etag = self.get('/cached').headers['Etag']
+        response = self.get('/cached', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.code, 304)
+        self.assertEqual(len(calls), 1)
+
+    def test_that_it_keys_by_the_params_and_the_vary_headers(self):
+        self.assertEqual(self.get('/keyed?page=1&x=1').body, 'keyed 1')
+        self.assertEqual(self.get('/keyed?page=1&x=2').body, 'keyed 1')
+        self.assertEqual(self.get('/keyed?page=2').body, 'keyed 2')
+        self.assertEqual(self.get('/keyed?page=1', headers={
+            'Accept': 'text/plain'}).body, 'keyed 3')
+
+    def test_that_it_keys_by_the_negotiated_representation(self):
+        ndjson = self.get('/items', headers={'Accept': 'application/x-ndjson'})
+        json = self.get('/items', headers={'Accept': 'application/json'})
+
+        self.assertEqual(ndjson.headers['Content-Type'].split(';')[0],
+                         'application/x-ndjson')
+        self.assertEqual(json.headers['Content-Type'].split(';')[0],
+                         'application/json')
+        self.assertEqual(self.get('/items', headers={
+            'Accept': 'application/json'}).body, json.body)
+        self.assertEqual(len(calls), 2)
+
+    def test_that_it_does_not_run_the_after_filters_on_hits(self):
+        self.assertEqual(self.get('/filtered').body, 'filtered footer')
+        self.assertEqual(self.get('/filtered').body, 'filtered footer')
+        self.assertEqual(calls, ['/filtered', 'footer'])
+
+
+class TestResponseCacheEviction(object):
+    def test_that_it_limits_the_size_of_the_responses(self):
+        cache, expires = ResponseCache(10), time.time() + 60
+        cache.set('a', CachedResponse([], [], 'x' * 6, '"a"', 0, expires))
+        cache.set('b', CachedResponse([], [], 'x' * 6, '"b"', 0, expires))
+
+        assert cache.get('a') is None
+        assert cache.get('b') is not None
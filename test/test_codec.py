@@ -0,0 +1,62 @@
+import datetime
+import unittest
+
+from plush.backend import Backend
+from plush.codec import CODECS, Codec, codec_for, register_codec
+
+
+class CodecForTest(unittest.TestCase):
+    def test_that_it_creates_registered_codecs(self):
+        self.assertEqual(codec_for('json').name, 'json')
+        self.assertEqual(codec_for('tornado').name, 'tornado')
+
+    def test_that_it_raises_on_unknown_codecs(self):
+        with self.assertRaises(ValueError):
+            codec_for('nope')
+
+    def test_that_codecs_can_be_registered(self):
+        @register_codec
+        class ReprCodec(Codec):
+            name = 'repr'
+            encode = lambda self, value: repr(value)
+
+        try:
+            self.assertEqual(codec_for('repr').encode([1]), '[1]')
+        finally:
+            del CODECS['repr']
+
+
+class StandardCodecTest(unittest.TestCase):
+    def test_that_it_encodes_compactly_by_default(self):
+        self.assertEqual(codec_for('json').encode({'a': [1, 2]}),
+                         '{"a":[1,2]}')
+
+    def test_that_it_respects_the_separators(self):
+        codec = codec_for('json', separators=(', ', ': '))
+
+        self.assertEqual(codec.encode({'a': [1, 2]}), '{"a": [1, 2]}')
+
+    def test_that_it_can_reject_nan(self):
+        with self.assertRaises(ValueError):
+            codec_for('json', allow_nan=False).encode(float('nan'))
+
+    def test_that_it_encodes_common_types(self):
+        value = [datetime.date(2012, 1, 2), set([1])]
+
+        self.assertEqual(codec_for('json').encode(value), '["2012-01-02",[1]]')
+
+    def test_that_it_escapes_only_for_html(self):
+        codec = codec_for('json')
+
+        self.assertEqual(codec.encode('</script>'), '"</script>"')
+        self.assertEqual(codec.encode_for_html('</script>'), '"<\\/script>"')
+
+    def test_that_it_decodes(self):
+        self.assertEqual(codec_for('json').decode('{"a":1}'), {'a': 1})
+
+
+class BackendCodecTest(unittest.TestCase):
+    def test_that_it_uses_the_json_codec_setting(self):
+        backend = Backend([], settings={'JSON_CODEC': 'tornado'})
+
+        self.assertEqual(backend.json_codec.name, 'tornado')
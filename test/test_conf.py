@@ -1,6 +1,11 @@
+import os
+import shutil
+import tempfile
 import unittest
 
-from plush.conf import Settings, Setting, SettingsView
+from plush.conf import Settings, Setting, SettingsView, FrozenSettings, \
+                       SettingsWatcher, SettingsCache, compile_pyfile
+from plush.backend import Backend
 
 
 class SettingBase(unittest.TestCase):
@@ -58,6 +63,44 @@ class TestSettings(unittest.TestCase):
         self.assertTrue('bacon' in settings)
         self.assertEqual(settings.bacon, 'Fresh')
 
+    def test_that_it_freezes_to_a_slotted_snapshot(self):
+        frozen = Settings({'DEBUG': True, 'not-a-name': 1}).freeze()
+
+        self.assertEqual(frozen.DEBUG, True)
+        self.assertEqual(frozen['not-a-name'], 1)
+        self.assertFalse(hasattr(frozen, '__dict__'))
+
+    def test_that_the_settings_do_not_shadow_the_snapshot_methods(self):
+        frozen = Settings({'get': 1, 'keys': 2, 'DEBUG': True}).freeze()
+
+        self.assertEqual(frozen.get('DEBUG'), True)
+        self.assertEqual(frozen['get'], 1)
+        self.assertEqual(sorted(frozen.keys()), ['DEBUG', 'get', 'keys'])
+
+    def test_that_the_snapshot_classes_are_bounded(self):
+        for index in xrange(100):
+            Settings({'SETTING_%d' % index: index}).freeze()
+
+        self.assertTrue(len(FrozenSettings._classes) <= 32)
+
+    def test_that_the_snapshot_is_immutable(self):
+        frozen = Settings({'DEBUG': True}).freeze()
+
+        with self.assertRaises(TypeError):
+            frozen.DEBUG = False
+
+    def test_that_the_snapshot_misses_the_missing_settings(self):
+        frozen = Settings({'DEBUG': True}).freeze()
+
+        self.assertRaises(AttributeError, getattr, frozen, 'GZIP')
+        self.assertEqual(frozen.get('GZIP', 'default'), 'default')
+        self.assertFalse('GZIP' in frozen)
+
+    def test_that_snapshots_of_the_same_names_share_a_class(self):
+        self.assertIs(type(Settings({'A': 1}).freeze()),
+                      type(Settings({'A': 2}).freeze()))
+        self.assertTrue(isinstance(Settings().freeze(), FrozenSettings))
+
 
 class TestSettingsView(unittest.TestCase):
     def setUp(self):
@@ -99,3 +142,196 @@ class TestSettingsView(unittest.TestCase):
 
         self.assertTrue('static_path' in conf)
         self.assertFalse('log_function' in conf)
+
+    def test_that_it_freezes_the_converted_settings(self):
+        class Configuration(self.Configuration):
+            port = Setting('PORT', type=int)
+
+        frozen = Configuration(dict(PORT='80')).freeze()
+
+        self.assertEqual(frozen.port, 80)
+        self.assertEqual(frozen.static_path, '/static/')
+        self.assertFalse('log_function' in frozen)
+
+
+class TestBackendConfig(unittest.TestCase):
+    def test_that_reload_swaps_the_snapshot(self):
+        backend = Backend(settings=Settings(MAX_BODY_SIZE=10))
+        config = backend.config
+
+        backend.reload(Settings(BODY_SPOOL_SIZE=20))
+
+        self.assertEqual(config.max_body_size, 10)
+        self.assertEqual(backend.config.body_spool_size, 20)
+        self.assertFalse('max_body_size' in backend.config)
+        self.assertFalse('max_body_size' in backend.settings)
+
+    def test_that_reload_swaps_the_tornado_settings(self):
+        backend = Backend(settings=Settings(MAX_BODY_SIZE=10))
+        settings = backend.settings
+
+        backend.reload(Settings(MAX_BODY_SIZE=20))
+
+        self.assertEqual(settings['max_body_size'], 10)
+        self.assertEqual(backend.settings['max_body_size'], 20)
+
+
+class TestSettingsWatcher(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'settings.py')
+
+        self.write('DEBUG = True\nTIMEOUT = 10\n')
+        self.settings = Settings(PORT=80).from_pyfile(self.filename)
+        self.watcher = SettingsWatcher(self.settings)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, source):
+        with open(self.filename, 'w') as file:
+            file.write(source)
+
+    def test_that_it_applies_only_the_changed_settings(self):
+        self.write('DEBUG = True\nTIMEOUT = 200\n')
+
+        self.assertEqual(self.watcher.check(), {'TIMEOUT': (10, 200)})
+        self.assertEqual(self.settings.TIMEOUT, 200)
+        self.assertEqual(self.settings.PORT, 80)
+
+    def test_that_it_notifies_the_subscribers_of_the_changed_settings(self):
+        debug, timeout = [], []
+        self.watcher.subscribe(debug.append, 'DEBUG')
+        self.watcher.subscribe(timeout.append, 'TIMEOUT')
+
+        self.write('TIMEOUT = 200\n')
+        self.watcher.check()
+
+        self.assertEqual(debug, [{'DEBUG': (True, None)}])
+        self.assertEqual(timeout, [{'TIMEOUT': (10, 200)}])
+        self.assertFalse('DEBUG' in self.settings)
+
+    def test_that_it_restores_the_settings_removed_from_the_files(self):
+        settings = Settings(PORT=80, TIMEOUT=5).from_pyfile(self.filename)
+        watcher = SettingsWatcher(settings)
+
+        self.write('DEBUG = True\n')
+
+        self.assertEqual(watcher.check(), {'TIMEOUT': (10, 5)})
+        self.assertEqual(settings.TIMEOUT, 5)
+        self.assertEqual(settings.PORT, 80)
+
+    def test_that_it_keeps_the_settings_on_invalid_files(self):
+        def validate(settings):
+            if settings.TIMEOUT < 0:
+                raise ValueError('TIMEOUT must be positive')
+
+        self.watcher.validate = validate
+
+        self.write('DEBUG = True\nTIMEOUT = -10\n')
+        self.assertEqual(self.watcher.check(), {})
+
+        self.write('DEBUG = True\nTIMEOUT = \n')
+        self.assertEqual(self.watcher.check(), {})
+
+        self.assertEqual(self.settings.TIMEOUT, 10)
+
+    def test_that_it_does_not_reload_the_unchanged_files(self):
+        self.watcher.load = None
+
+        self.assertEqual(self.watcher.check(), {})
+
+
+class TestSettingsCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SettingsCache(os.path.join(self.directory, 'cache'))
+        self.filename = os.path.join(self.directory, 'settings.py')
+        self.compiled = []
+
+        with open(self.filename, 'w') as file:
+            file.write('DEBUG = True\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def compile(self, filename):
+        self.compiled.append(filename)
+        return compile_pyfile(filename)
+
+    def test_that_it_compiles_the_files_once(self):
+        first = self.cache.load(self.filename, self.compile)
+        second = self.cache.load(self.filename, self.compile)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.compiled, [self.filename])
+
+    def test_that_it_recompiles_the_changed_files(self):
+        self.cache.load(self.filename, self.compile)
+
+        with open(self.filename, 'w') as file:
+            file.write('DEBUG = False\n')
+
+        namespace = {}
+        exec self.cache.load(self.filename, self.compile) in namespace
+
+        self.assertEqual(len(self.compiled), 2)
+        self.assertFalse(namespace['DEBUG'])
+
+    def test_that_it_pickles_what_marshal_can_not_dump(self):
+        load = lambda filename: {'set': frozenset([1]), 'type': SettingsCache}
+
+        self.cache.load(self.filename, load)
+
+        self.assertEqual(self.cache.load(self.filename, None),
+                         {'set': frozenset([1]), 'type': SettingsCache})
+
+    def test_that_it_ignores_the_directories_writable_by_others(self):
+        self.cache.load(self.filename, self.compile)
+        os.chmod(self.cache.directory, 0o777)
+
+        self.cache.load(self.filename, self.compile)
+
+        self.assertEqual(len(self.compiled), 2)
+
+
+class TestSettingsFromEnv(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        os.environ.pop('PLUSH_TEST_SETTINGS', None)
+
+    def load(self, name, source):
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'w') as file:
+            file.write(source)
+
+        os.environ['PLUSH_TEST_SETTINGS'] = filename
+
+        return Settings().from_env('PLUSH_TEST_SETTINGS')
+
+    def test_that_it_loads_by_the_file_extension(self):
+        settings = self.load('settings.py', 'DEBUG = True\n')
+
+        self.assertTrue(settings.DEBUG)
+        self.assertEqual(settings.sources[0][0], 'from_pyfile')
+
+    def test_that_it_loads_yaml_by_the_file_extension(self):
+        settings = self.load('settings.yml', 'DEBUG: true\n')
+
+        self.assertTrue(settings.DEBUG)
+        self.assertEqual(settings.sources[0][0], 'from_yaml')
+
+    def test_that_it_tries_the_unknown_extensions(self):
+        settings = self.load('settings.conf', 'DEBUG = True\n')
+
+        self.assertTrue(settings.DEBUG)
+
+    def test_that_it_imports_the_modules(self):
+        os.environ['PLUSH_TEST_SETTINGS'] = 'plush.response'
+
+        settings = Settings().from_env('PLUSH_TEST_SETTINGS')
+
+        self.assertTrue('BadRequest' in settings)
@@ -0,0 +1,82 @@
+import unittest
+
+from plush.decorators import pipeline
+
+
+class Recorder(object):
+    _finished = False
+
+    def __init__(self):
+        self.calls = []
+
+
+def recording(name, result=None, finish=False):
+    def step(request, *args):
+        request.calls.append((name,) + args)
+        if finish:
+            request._finished = True
+        return result
+
+    return step
+
+
+class PipelineTest(unittest.TestCase):
+    def test_that_it_returns_the_handler_without_filters(self):
+        handler = recording('handler')
+
+        self.assertTrue(pipeline(handler) is handler)
+
+    def test_that_it_runs_the_filters_around_the_handler_in_order(self):
+        request = Recorder()
+
+        pipeline(recording('handler'),
+                 before=[recording('before1'), recording('before2')],
+                 after=[recording('after1'), recording('after2')])(request, 1)
+
+        self.assertEqual(request.calls, [('before1', 1), ('before2', 1),
+                                         ('handler', 1),
+                                         ('after1', 1), ('after2', 1)])
+
+    def test_that_after_runs_only_if_the_handler_returned_none(self):
+        request = Recorder()
+
+        result = pipeline(recording('handler', result='done'),
+                          after=[recording('after')])(request)
+
+        self.assertEqual(result, 'done')
+        self.assertEqual(request.calls, [('handler',)])
+
+    def test_that_after_stops_on_a_filter_returning_a_value(self):
+        request = Recorder()
+
+        pipeline(recording('handler'),
+                 after=[recording('after1', result=True),
+                        recording('after2')])(request)
+
+        self.assertEqual(request.calls, [('handler',), ('after1',)])
+
+    def test_that_after_stops_on_a_finished_request(self):
+        request = Recorder()
+
+        pipeline(recording('handler', finish=True),
+                 after=[recording('after')])(request)
+
+        self.assertEqual(request.calls, [('handler',)])
+
+    def test_that_before_ignores_the_returned_values(self):
+        request = Recorder()
+
+        pipeline(recording('handler'),
+                 before=[recording('before', result='user')],
+                 after=[recording('after')])(request)
+
+        self.assertEqual(request.calls, [('before',), ('handler',),
+                                         ('after',)])
+
+    def test_that_before_short_circuits_on_a_finished_request(self):
+        request = Recorder()
+
+        pipeline(recording('handler'),
+                 before=[recording('before', finish=True)])(request)
+
+        self.assertEqual(request.calls, [('before',)])
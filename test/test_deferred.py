@@ -0,0 +1,49 @@
+from tornado.testing import AsyncTestCase
+
+from plush import Plush
+
+
+class TestCoalescing(AsyncTestCase):
+    def setUp(self):
+        super(TestCoalescing, self).setUp()
+
+        self.app = Plush(__name__, io_loop=self.io_loop)
+        self.calls = []
+
+    def record(self, *args):
+        self.calls.append(args)
+
+    def later(self, milliseconds, callback):
+        self.app.defer(milliseconds, callback)
+
+    def test_that_debounce_calls_once_with_the_latest_arguments(self):
+        debounced = self.app.debounce(20, self.record)
+
+        debounced(1)
+        self.later(10, lambda: debounced(2))
+        self.later(60, self.stop)
+        self.wait()
+
+        self.assertEqual(self.calls, [(2,)])
+
+    def test_that_throttle_collapses_the_calls_during_the_wait(self):
+        throttled = self.app.throttle(30, self.record)
+
+        throttled(1)
+        throttled(2)
+        throttled(3)
+        self.later(60, self.stop)
+        self.wait()
+
+        self.assertEqual(self.calls, [(1,), (3,)])
+
+    def test_that_batch_delivers_the_items_as_a_list(self):
+        batch = self.app.batch(3, 20)(self.record)
+
+        for item in range(4):
+            batch(item)
+        self.later(50, self.stop)
+        self.wait()
+
+        self.assertEqual(self.calls, [([0, 1, 2],), ([3],)])
+        self.assertEqual(len(batch), 0)
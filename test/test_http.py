@@ -0,0 +1,183 @@
+import gzip
+from cStringIO import StringIO
+
+from tornado.web import Application, RequestHandler, asynchronous
+
+from plush import Plush
+from plush.testing import TestCase
+
+
+class Echo(RequestHandler):
+    def get(self):
+        self.write('%s %s' % (self.request.uri, id(self.request.connection)))
+
+    def post(self):
+        self.write(self.request.body)
+
+
+class Headers(RequestHandler):
+    def get(self):
+        self.write('%(Authorization)s %(User-Agent)s' % self.request.headers)
+
+
+class Redirect(RequestHandler):
+    def post(self):
+        self.redirect('/echo?redirected', status=303)
+
+
+class Gzipped(RequestHandler):
+    def get(self):
+        buffer = StringIO()
+        with gzip.GzipFile(fileobj=buffer, mode='w') as file:
+            file.write('compressed')
+
+        self.set_header('Content-Encoding', 'gzip')
+        self.write(buffer.getvalue())
+
+
+class Chunked(RequestHandler):
+    @asynchronous
+    def get(self):
+        self.request.write('HTTP/1.1 200 OK\r\n'
+                           'Transfer-Encoding: chunked\r\n\r\n'
+                           '6\r\nfirst;\r\n6\r\nsecond\r\n0\r\n\r\n')
+        self.request.finish()
+
+
+class Closing(RequestHandler):
+    def get(self):
+        self.set_header('Connection', 'close')
+        self.write('closing')
+
+
+class Dropping(RequestHandler):
+    hits = 0
+
+    @asynchronous
+    def post(self):
+        Dropping.hits += 1
+        self.request.connection.stream.close()
+
+
+class Slow(RequestHandler):
+    hits = 0
+
+    @asynchronous
+    def get(self):
+        Slow.hits += 1
+
+
+class TestHTTPClient(TestCase):
+    def get_app(self):
+        return Application([('/echo', Echo), ('/chunked', Chunked),
+                            ('/closing', Closing), ('/dropping', Dropping),
+                            ('/slow', Slow), ('/headers', Headers),
+                            ('/redirect', Redirect), ('/gzipped', Gzipped)])
+
+    def setUp(self):
+        super(TestHTTPClient, self).setUp()
+
+        self.app = Plush(__name__, io_loop=self.io_loop, HTTP_MAX_PER_HOST=1,
+                         HTTP_REQUEST_TIMEOUT=0.1)
+
+    def tearDown(self):
+        self.app.http.close()
+
+        super(TestHTTPClient, self).tearDown()
+
+    def fetch(self, path, **kwargs):
+        self.app.http.fetch(self.get_url(path), self.stop, **kwargs)
+        return self.wait()
+
+    @property
+    def stats(self):
+        return self.app.http.stats['localhost:%d' % self.get_http_port()]
+
+    def test_that_it_reuses_the_keep_alive_connections(self):
+        first = self.fetch('/echo?1').body.split()
+        second = self.fetch('/echo?2').body.split()
+
+        self.assertEqual([first[0], second[0]], ['/echo?1', '/echo?2'])
+        self.assertEqual(first[1], second[1])
+        self.assertEqual(self.stats['connections'], 1)
+        self.assertEqual(self.stats['reused'], 1)
+
+    def test_that_it_sends_the_request_body(self):
+        self.assertEqual(self.fetch('/echo', method='POST', body='x=1').body,
+                         'x=1')
+
+    def test_that_it_follows_the_redirects(self):
+        response = self.fetch('/redirect', method='POST', body='x=1')
+
+        self.assertEqual(response.body.split()[0], '/echo?redirected')
+        self.assertEqual(response.effective_url, self.get_url(
+            '/echo?redirected'))
+        self.assertEqual(self.fetch('/redirect', method='POST', body='x=1',
+                                    follow_redirects=False).code, 303)
+
+    def test_that_it_decompresses_the_gzipped_responses(self):
+        self.assertEqual(self.fetch('/gzipped').body, 'compressed')
+
+    def test_that_it_sends_the_authorization_and_the_user_agent(self):
+        response = self.fetch('/headers', auth_username='user',
+                              auth_password='secret', user_agent='agent')
+
+        self.assertEqual(response.body, 'Basic dXNlcjpzZWNyZXQ= agent')
+
+    def test_that_it_passes_the_unsupported_options_to_tornado(self):
+        chunks = []
+
+        self.fetch('/echo', streaming_callback=chunks.append)
+
+        self.assertEqual(chunks[0].split()[0], '/echo')
+        self.assertNotIn('localhost:%d' % self.get_http_port(),
+                         self.app.http.stats)
+
+    def test_that_it_reads_chunked_responses(self):
+        self.assertEqual(self.fetch('/chunked').body, 'first;second')
+        self.assertEqual(self.stats['idle'], 1)
+
+    def test_that_it_drops_the_closed_connections(self):
+        self.assertEqual(self.fetch('/closing').body, 'closing')
+        self.assertEqual(self.fetch('/echo').code, 200)
+        self.assertEqual(self.stats['connections'], 2)
+
+    def test_that_it_does_not_retry_the_non_idempotent_requests(self):
+        Dropping.hits = 0
+
+        self.assertEqual(self.fetch('/echo').code, 200)
+        self.assertEqual(self.fetch('/dropping', method='POST',
+                                    body='x=1').code, 599)
+        self.assertEqual(Dropping.hits, 1)
+
+    def test_that_it_limits_the_connections_per_host(self):
+        responses = []
+
+        def collect(response):
+            responses.append(response)
+            if len(responses) == 3:
+                self.stop()
+
+        for index in range(3):
+            self.app.http.fetch(self.get_url('/echo?%d' % index), collect)
+
+        self.assertEqual(self.stats['waiting'], 2)
+        self.wait()
+
+        self.assertEqual([response.body.split()[0] for response in responses],
+                         ['/echo?0', '/echo?1', '/echo?2'])
+        self.assertEqual(self.stats['connections'], 1)
+
+    def test_that_it_times_out_with_the_default_timeout(self):
+        response = self.fetch('/slow')
+
+        self.assertEqual(response.code, 599)
+        self.assertEqual(self.stats['failures'], 1)
+        self.assertEqual(self.stats['open'], 0)
+
+    def test_that_it_does_not_retry_the_timed_out_requests(self):
+        Slow.hits = 0
+
+        self.assertEqual(self.fetch('/echo').code, 200)
+        self.assertEqual(self.fetch('/slow').code, 599)
+        self.assertEqual(Slow.hits, 1)
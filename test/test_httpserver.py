@@ -0,0 +1,107 @@
+import socket
+import unittest
+from StringIO import StringIO
+
+from tornado import gen
+from tornado.iostream import IOStream
+
+from plush import Plush
+from plush.httpserver import HTTPServer, parse_form_file
+from plush.testing import case_for
+
+
+app = Plush(__name__, BODY_SPOOL_SIZE=16)
+
+@app.post('/echo')
+def echo(request):
+    request.write('%s:%s' % (request.body_file is not None, request.data))
+
+@app.post('/form')
+def form(request):
+    request.write('%s:%s' % (request.body_file is not None,
+                             len(request.param('a'))))
+
+@app.post('/limited', max_body_size=8)
+def limited(request):
+    request.write(request.data)
+
+@app.post('/ingest', stream_body=True)
+def ingest(request):
+    size = 0
+
+    while True:
+        chunk = yield gen.Task(request.body_stream.read)
+        if chunk is None:
+            break
+        size += len(chunk)
+
+    request.write(str(size))
+
+
+class TestRequestBodies(case_for(app)):
+    def test_that_it_buffers_the_small_bodies(self):
+        self.assertEqual(self.post('/echo', {'a': '1'}).body, 'False:a=1')
+
+    def test_that_it_spools_the_large_bodies(self):
+        body = self.post('/echo', {'a': 'x' * 32}).body
+
+        self.assertEqual(body, 'True:a=' + 'x' * 32)
+
+    def test_that_it_parses_the_spooled_form_bodies(self):
+        self.assertEqual(self.post('/form', {'a': 'x' * 1024}).body,
+                         'True:1024')
+
+    def test_that_it_leaves_the_spooled_multipart_bodies_in_the_file(self):
+        response = self.fetch('/echo', method='POST', headers={
+            'Content-Type': 'multipart/form-data; boundary=x'},
+            body='--x\r\nContent-Disposition: form-data; name="a"\r\n\r\n'
+                 '1\r\n--x--\r\n')
+
+        self.assertTrue(response.body.startswith('True:--x'))
+
+    def test_that_it_rejects_the_bodies_over_the_route_limit(self):
+        self.assertEqual(self.post('/limited', {'a': '1'}).body, 'a=1')
+        self.assertEqual(self.post('/limited', {'a': 'x' * 8}).code, 413)
+
+    def test_that_it_streams_the_bodies_in_chunks(self):
+        self.assertEqual(self.post('/ingest', {'a': 'x' * 100000}).body,
+                         '100002')
+
+
+class SmallBufferHTTPServer(HTTPServer):
+    def handle_stream(self, stream, address):
+        # Keep the socket from handing more than the buffer size at once.
+        stream.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
+        stream.max_buffer_size = 1024 * 1024
+        HTTPServer.handle_stream(self, stream, address)
+
+
+class TestRequestBodiesOverTheBufferSize(case_for(app)):
+    http_server_class = SmallBufferHTTPServer
+
+    def test_that_it_spools_the_bodies_over_the_buffer_size(self):
+        chunks = ['a='] + ['x' * 65536] * 32
+        stream = IOStream(socket.socket(), io_loop=self.io_loop)
+
+        def write_next():
+            if chunks:
+                stream.write(chunks.pop(0), write_next)
+            else:
+                stream.read_until_close(self.stop)
+
+        stream.connect(('localhost', self.get_http_port()), lambda: (
+            stream.write('POST /form HTTP/1.0\r\nContent-Length: %d\r\n'
+                         'Content-Type: application/x-www-form-urlencoded'
+                         '\r\n\r\n' % (2 + 65536 * 32), write_next)))
+
+        self.assertTrue(self.wait().endswith('True:%d' % (65536 * 32)))
+
+
+class TestParseFormFile(unittest.TestCase):
+    def test_that_it_parses_the_arguments_across_the_chunks(self):
+        arguments = {}
+        parse_form_file(StringIO('a=1&bb=22&a=333&c=&d=4444'), arguments,
+                        chunk_size=3)
+
+        self.assertEqual(arguments, {'a': ['1', '333'], 'bb': ['22'],
+                                     'd': ['4444']})
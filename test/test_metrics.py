@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from plush import Plush
+from plush.metrics import Metrics
+from plush.testing import case_for
+
+
+app = Plush(__name__, METRICS_PATH='/metrics')
+
+@app.get('/users/([0-9]+)')
+def user(request, id):
+    request.write('user %s' % id)
+
+@app.get('/fail')
+def fail(request):
+    request.error(status_code=503)
+
+
+class TestMetricsEndpoint(case_for(app)):
+    def test_that_it_records_the_routes_by_pattern(self):
+        self.get('/users/1')
+        self.get('/users/2')
+        self.get('/fail')
+        self.get('/missing')
+
+        body = self.get('/metrics').body
+
+        self.assertIn('plush_requests_total{route="/users/([0-9]+)",'
+                      'status="2xx"} 2', body)
+        self.assertIn('plush_requests_total{route="/fail",status="5xx"} 1',
+                      body)
+        self.assertIn('plush_requests_total{route="<unmatched>",'
+                      'status="4xx"} 1', body)
+        self.assertIn('plush_response_bytes_total'
+                      '{route="/users/([0-9]+)"} 12', body)
+        self.assertIn('plush_request_duration_seconds_count'
+                      '{route="/users/([0-9]+)"} 2', body)
+
+    def test_that_it_serves_the_prometheus_text_format(self):
+        response = self.get('/metrics')
+
+        self.assertTrue(response.headers['Content-Type'].startswith(
+            'text/plain; version=0.0.4'))
+        self.assertIn('# TYPE plush_request_duration_seconds histogram',
+                      response.body)
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_that_the_buckets_are_cumulative(self):
+        metrics = Metrics(buckets=(0.1, 1))
+        metrics.observe('/', 200, 0.05, 10)
+        metrics.observe('/', 200, 0.5, 10)
+        metrics.observe('/', 500, 5, 0)
+
+        body = metrics.render()
+
+        self.assertIn('plush_request_duration_seconds_bucket{route="/",'
+                      'le="0.1"} 1', body)
+        self.assertIn('plush_request_duration_seconds_bucket{route="/",'
+                      'le="1"} 2', body)
+        self.assertIn('plush_request_duration_seconds_bucket{route="/",'
+                      'le="+Inf"} 3', body)
+        self.assertIn('plush_response_bytes_total{route="/"} 20', body)
+
+    def test_that_it_aggregates_the_dumps_of_the_other_processes(self):
+        other = Metrics(directory=self.directory)
+        other.observe('/', 200, 0.01, 5)
+        other.dump()
+
+        # Pretend the dump is of another process.
+        os.rename(other.path, os.path.join(self.directory, '0.json'))
+
+        metrics = Metrics(directory=self.directory)
+        metrics.observe('/', 404, 0.01, 5)
+        metrics.dump()
+
+        routes = metrics.aggregate()
+
+        self.assertEqual(routes['/'].count, 2)
+        self.assertEqual(routes['/'].statuses, [0, 1, 0, 1, 0])
+        self.assertEqual(routes['/'].bytes, 10)
+
+    def test_that_it_creates_a_shared_directory(self):
+        metrics = Metrics()
+        metrics.share()
+
+        try:
+            self.assertTrue(os.path.isdir(metrics.directory))
+        finally:
+            os.rmdir(metrics.directory)
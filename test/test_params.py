@@ -0,0 +1,74 @@
+import unittest
+
+from plush import Plush, Param
+from plush.params import Schema, ParamsError
+from plush.testing import case_for
+
+
+class FakeHandler(object):
+    def __init__(self, **arguments):
+        self.request = type('HTTPRequest', (object,), {
+            'arguments': arguments
+        })
+
+    def decode_argument(self, value, name=None):
+        return value.decode('utf-8')
+
+
+class SchemaTest(unittest.TestCase):
+    def setUp(self):
+        self.schema = Schema({
+            'q': unicode,
+            'page': Param(int, default=1),
+            'tags': Param(default=[], multiple=True),
+        })
+
+    def test_that_it_parses_to_a_slotted_object(self):
+        params = self.schema.parse(FakeHandler(q=[' plush '], page=['2']))
+
+        self.assertEqual((params.q, params.page, params.tags),
+                         (u'plush', 2, []))
+        self.assertFalse(hasattr(params, '__dict__'))
+
+    def test_that_it_collects_multiple_values(self):
+        params = self.schema.parse(FakeHandler(q=['a'], tags=['b', 'c']))
+
+        self.assertEqual(params.tags, [u'b', u'c'])
+
+    def test_that_it_maps_the_names_to_attribute_names(self):
+        schema = Schema({'filter-by': unicode, 'ids[]': Param(multiple=True),
+                         'filter_by': Param(default=None), '2x': unicode,
+                         '_attributes': Param(default=0)})
+        params = schema.parse(FakeHandler(**{'filter-by': ['a'], '2x': ['b'],
+                                             'ids[]': ['1', '2']}))
+
+        self.assertEqual((params.filter_by, params.ids, params.param_2x),
+                         (u'a', [u'1', u'2'], u'b'))
+        self.assertEqual(params['filter-by'], u'a')
+        self.assertEqual(params['filter_by'], None)
+        self.assertEqual(params['_attributes'], 0)
+
+    def test_that_it_reports_all_of_the_errors(self):
+        with self.assertRaises(ParamsError) as context:
+            self.schema.parse(FakeHandler(page=['two']))
+
+        self.assertEqual(sorted(context.exception.errors), ['page', 'q'])
+        self.assertEqual(context.exception.status_code, 400)
+
+
+app = Plush(__name__)
+
+@app.get('/search', params={'q': unicode, 'page': Param(int, default=1)})
+def search(request):
+    request.send('%s %d' % (request.params.q, request.params.page))
+
+
+class TestRouteParams(case_for(app)):
+    def test_that_it_parses_the_params(self):
+        self.assertEqual(self.get('/search?q=plush&page=3').body, 'plush 3')
+
+    def test_that_it_responds_with_bad_request_on_errors(self):
+        response = self.get('/search?page=three')
+
+        self.assertEqual(response.code, 400)
+        self.assertTrue('page:' in response.body and 'q:' in response.body)
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import threading
+
+from tornado.ioloop import IOLoop
+from tornado.testing import AsyncTestCase
+
+from plush import Plush
+from plush.pool import ThreadPool, ProcessPool, PoolSaturated
+from plush.testing import case_for
+
+
+app = Plush(__name__, THREAD_POOL_SIZE=1, THREAD_POOL_QUEUE=0)
+
+@app.get('/blocking', blocking=True)
+def blocking_handler(request):
+    return {'thread': threading.current_thread().name}
+
+@app.get('/blocking/param', blocking=True)
+def param_handler(request):
+    return {'number': request.param('number', type=int)}
+
+@app.get('/blocking/failing', blocking=True)
+def failing_handler(request):
+    raise RuntimeError
+
+
+class TestBlocking(case_for(app)):
+    def test_that_it_sends_the_result_from_a_pool_thread(self):
+        response = self.get('/blocking')
+
+        self.assertEqual(response.code, 200)
+        self.assertNotEqual(response.body, '{"thread":"MainThread"}')
+
+    def test_that_it_reports_the_errors(self):
+        self.assertEqual(self.get('/blocking/failing').code, 500)
+
+    def test_that_it_sends_the_errors_of_the_pool_thread_on_the_io_loop(self):
+        self.assertEqual(self.get('/blocking/param?number=1').body,
+                         '{"number":1}')
+        self.assertEqual(self.get('/blocking/param?number=x').code, 400)
+
+    def test_that_it_is_unavailable_when_the_pool_is_saturated(self):
+        self._app.thread_pool.pending = 1
+
+        self.assertEqual(self.get('/blocking').code, 503)
+
+
+class TestThreadPool(AsyncTestCase):
+    def test_that_it_calls_back_on_the_io_loop(self):
+        pool = ThreadPool(2, 0)
+        pool.submit(lambda: threading.current_thread(),
+                    lambda result, exc_info: self.stop((result, exc_info)),
+                    self.io_loop)
+
+        thread, exc_info = self.wait()
+
+        self.assertIsNot(thread, threading.current_thread())
+        self.assertIsNone(exc_info)
+        self.assertEqual(pool.pending, 0)
+
+        pool.stop()
+
+    def test_that_it_refuses_tasks_when_saturated(self):
+        pool = ThreadPool(0, 0)
+
+        self.assertRaises(PoolSaturated, pool.submit, lambda: None,
+                          lambda *_: None)
+
+    def test_that_it_resizes_the_started_pools(self):
+        pool = ThreadPool(2, 0)
+        pool.start()
+
+        pool.resize(4)
+        self.assertEqual(len(pool.threads), 4)
+
+        threads = list(pool.threads)
+        pool.resize(1)
+        self.assertEqual(pool.size, 1)
+
+        deadline = time.time() + 5
+        while len(pool.threads) > 1 and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(len(pool.threads), 1)
+        self.assertTrue(pool.threads[0].is_alive())
+
+        for thread in threads:
+            if thread not in pool.threads:
+                thread.join(5)
+                self.assertFalse(thread.is_alive())
+
+        pool.stop()
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        self.assertTrue(pool.tasks.empty())
+
+
+process_app = Plush(__name__, PROCESS_POOL_SIZE=1, BODY_SPOOL_SIZE=16)
+
+@process_app.get('/process/(\d+)', process=True)
+def in_process_handler(request, number):
+    return {'square': int(number) ** 2, 'pid': os.getpid(),
+            'path': request.path}
+
+@process_app.post('/process/size', process=True)
+def size_in_process_handler(request):
+    return {'size': len(request.data)}
+
+@process_app.get('/process/failing', process=True)
+def failing_in_process_handler(request):
+    raise ValueError('in process')
+
+
+class TestInProcess(case_for(process_app)):
+    def tearDown(self):
+        self._app.process_pool.stop()
+
+        super(TestInProcess, self).tearDown()
+
+    def get_new_ioloop(self):
+        return IOLoop.instance()
+
+    def test_that_it_sends_the_result_from_a_pool_process(self):
+        result = json.loads(self.get('/process/12').body)
+
+        self.assertEqual(result['square'], 144)
+        self.assertEqual(result['path'], '/process/12')
+        self.assertNotEqual(result['pid'], os.getpid())
+
+    def test_that_it_reports_the_errors(self):
+        self.assertEqual(self.get('/process/failing').code, 500)
+
+    def test_that_it_sends_the_spooled_bodies(self):
+        response = self.post('/process/size', {'a': 'x' * 1024})
+
+        self.assertEqual(json.loads(response.body), {'size': 1026})
+
+
+class TestProcessPool(AsyncTestCase):
+    def test_that_it_drops_the_canceled_tasks(self):
+        pool = ProcessPool(1, 10)
+        results = []
+
+        pool.submit(os.getpid, lambda *_: results.append('first'),
+                    io_loop=self.io_loop)
+        pool.submit(os.getpid, lambda *_: results.append('canceled'),
+                    io_loop=self.io_loop).cancel()
+        pool.submit(os.getpid, lambda *_: self.stop(), io_loop=self.io_loop)
+
+        self.wait()
+        pool.stop()
+
+        self.assertEqual(results, ['first'])
+
+    def test_that_it_terminates_the_processes_of_the_canceled_tasks(self):
+        pool = ProcessPool(1, 10)
+        results = []
+
+        task = pool.submit(time.sleep, lambda *_: results.append('canceled'),
+                           (30,), io_loop=self.io_loop)
+        process = pool.workers[0].process
+        task.cancel()
+
+        pool.submit(os.getpid, lambda pid, _: self.stop(pid),
+                    io_loop=self.io_loop)
+        pid = self.wait()
+        pool.stop()
+
+        self.assertFalse(process.is_alive())
+        self.assertNotEqual(pid, process.pid)
+        self.assertEqual(results, [])
+
+    def test_that_it_respawns_the_dead_processes(self):
+        pool = ProcessPool(1, 10)
+        pool.submit(os._exit, lambda *outcome: self.stop(outcome), (1,),
+                    io_loop=self.io_loop)
+
+        result, error = self.wait()
+        respawned = pool.workers[0].process.is_alive()
+        pool.stop()
+
+        self.assertIsInstance(error, RuntimeError)
+        self.assertTrue(respawned)
@@ -0,0 +1,89 @@
+import os
+import time
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from plush import Plush
+from plush.profiling import Sampler, profile_token
+from plush.testing import case_for
+
+
+directory = tempfile.mkdtemp()
+app = Plush(__name__, PROFILE_SECRET='secret', PROFILE_DIR=directory)
+
+@app.get('/users/([0-9]+)')
+def user(request, id):
+    request.write('user %s' % id)
+
+
+class TestProfiler(case_for(app)):
+    def tearDown(self):
+        super(TestProfiler, self).tearDown()
+
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+
+    def test_that_it_profiles_the_requests_with_a_valid_token(self):
+        response = self.get('/users/1', headers={
+            'X-Plush-Profile': profile_token('secret')})
+
+        name = response.headers['X-Plush-Profile']
+        stats = pstats.Stats(os.path.join(directory, name))
+
+        self.assertTrue(name.startswith('users_0_9.'))
+        self.assertTrue(any(function == 'user' for (_, _, function)
+                            in stats.stats))
+
+    def test_that_it_accepts_the_token_as_a_query_argument(self):
+        response = self.get('/users/1?__profile=' + profile_token('secret'))
+
+        self.assertIn('X-Plush-Profile', response.headers)
+
+    def test_that_it_ignores_the_invalid_tokens(self):
+        response = self.get('/users/1', headers={
+            'X-Plush-Profile': profile_token('other')})
+
+        self.assertNotIn('X-Plush-Profile', response.headers)
+        self.assertEqual(os.listdir(directory), [])
+
+
+def burn(seconds):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        pass
+
+
+class TestSampler(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_that_it_aggregates_the_sampled_stacks(self):
+        sampler = Sampler(1, self.directory)
+        sampler.start()
+        try:
+            burn(0.2)
+        finally:
+            sampler.stop()
+
+        self.assertTrue(any('burn (' in stack for stack in sampler.stacks))
+
+        sampler.dump()
+
+        with open(sampler.path) as file:
+            stack, count = file.readline().rsplit(' ', 1)
+
+        self.assertEqual(int(count), max(sampler.stacks.values()))
+
+    def test_that_it_dumps_only_to_private_directories(self):
+        os.chmod(self.directory, 0o777)
+
+        sampler = Sampler(1, self.directory)
+        sampler.stacks['main'] += 1
+        sampler.dump()
+
+        self.assertEqual(os.listdir(self.directory), [])
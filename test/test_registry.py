@@ -1,3 +1,4 @@
+import threading
 import unittest
 
 from plush.registry import Registrable, Registry, \
@@ -67,10 +68,91 @@ class RegistrableTest(unittest.TestCase):
         Sub.register()
 
         self.assertEqual(
-            [(Sub, {'non_entry_specific': True})],
+            ((Sub, {'non_entry_specific': True}),),
             Registry.entries_with_data_for(Ent)
         )
 
+    def test_that_the_entries_are_cached_until_a_registration(self):
+        Ent = type('Ent', (Registrable,), {})
+        Ent.make_registry()
+
+        entries = Registry.entries_for(Ent)
+        self.assertIs(entries, Registry.entries_for(Ent))
+
+        Sub = type('Sub', (Ent,), {})
+        Sub.register()
+
+        self.assertEqual(entries, ())
+        self.assertEqual(Registry.entries_for(Ent), (Sub,))
+
+    def test_lookup_by_the_registration_data(self):
+        Ent = type('Ent', (Registrable,), {
+            'on_registration': classmethod(lambda cls: {
+                'name': cls.__name__.lower(),
+                'kind': cls.kind,
+                'tags': [],
+            }),
+        })
+        Ent.make_registry()
+
+        Json = type('Json', (Ent,), {'kind': 'codec'})
+        Yaml = type('Yaml', (Ent,), {'kind': 'codec'})
+        Gzip = type('Gzip', (Ent,), {'kind': 'transform'})
+        for cls in (Json, Yaml, Gzip):
+            cls.register()
+
+        self.assertEqual(Registry.lookup(Ent, name='json'), (Json,))
+        self.assertEqual(Registry.lookup(Ent, kind='codec'), (Json, Yaml))
+        self.assertEqual(Registry.lookup(Ent, kind='codec', name='yaml'),
+                         (Yaml,))
+        self.assertEqual(Registry.lookup(Ent, kind='codec', name='gzip'), ())
+        self.assertEqual(Registry.lookup(Ent, missing=True), ())
+        self.assertEqual(Registry.lookup(Ent), (Json, Yaml, Gzip))
+        self.assertEqual(Registry.lookup(Ent, tags=[]), (Json, Yaml, Gzip))
+        self.assertEqual(Registry.lookup(Ent, kind='codec', tags=['x']), ())
+
+    def test_lookup_tells_the_equal_values_of_other_types_apart(self):
+        Ent = type('Ent', (Registrable,), {
+            'on_registration': classmethod(lambda cls: {'kind': cls.kind}),
+        })
+        Ent.make_registry()
+
+        One = type('One', (Ent,), {'kind': 1})
+        Yes = type('Yes', (Ent,), {'kind': True})
+        One.register()
+        Yes.register()
+
+        self.assertEqual(Registry.lookup(Ent, kind=1), (One,))
+        self.assertEqual(Registry.lookup(Ent, kind=True), (Yes,))
+
+    def test_concurrent_registrations(self):
+        Ent = type('Ent', (Registrable,), {})
+        Ent.make_registry()
+
+        subs = [type('Sub%d' % index, (Ent,), {}) for index in xrange(200)]
+        def register_all(classes):
+            for cls in classes:
+                cls.register()
+
+        threads = [threading.Thread(target=register_all,
+                                    args=(subs[index::4],))
+                   for index in xrange(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(set(Registry.entries_for(Ent)), set(subs))
+
+    def test_that_subclass_checks_follow_the_registries(self):
+        Ent = type('Ent', (Registrable,), {})
+
+        self.assertFalse(issubclass(Ent, Registry))
+        Ent.make_registry()
+        self.assertTrue(issubclass(Ent, Registry))
+        Registry.clear()
+        self.assertFalse(issubclass(Ent, Registry))
+
     def test_decorators(self):
         @registry
         class Ent(Registrable): pass
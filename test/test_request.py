@@ -1,5 +1,10 @@
+import gc
 import json
+import socket
 
+from tornado.iostream import IOStream
+
+from plush import Plush
 from plush.backend import Backend
 from plush.testing import TestCase
 from plush.request import Request
@@ -44,6 +49,45 @@ class TestRequestFromFunction(TestCase):
 
         self.assertTrue(mixed_handler.name() == 'mixed')
 
+    def test_that_it_caches_classes_for_the_same_combination(self):
+        def cached(request): request.finish('cached')
+
+        self.assertTrue(Request.from_function(cached, methods=['GET']) is
+                        Request.from_function(cached, methods=['GET']))
+        self.assertFalse(Request.from_function(cached, methods=['GET']) is
+                         Request.from_function(cached, methods=['POST']))
+
+    def test_that_it_does_not_keep_the_unused_classes_alive(self):
+        def unused(request): request.finish('unused')
+
+        handler = Request.from_function(unused, methods=['GET'],
+                                         before=[lambda request: None])
+
+        del handler
+        gc.collect()
+
+        self.assertFalse(any(key[1] == 'unused' for key
+                             in Request._generated_classes.keys()))
+        self.assertFalse(any(key[0] is unused for key
+                             in Request._compiled_handlers.keys()))
+
+
+class TestRequestFromMethods(TestCase):
+    def get_app(self):
+        handler = Request.from_methods({
+            'GET': lambda req: req.finish('GET'),
+            'POST': lambda req: req.finish('POST'),
+        }, name='both')
+
+        return Backend([('/', handler)])
+
+    def test_that_it_dispatches_by_method(self):
+        self.assertEqual(self.fetch('/').body, 'GET')
+        self.assertEqual(self.fetch('/', method='POST', body='').body, 'POST')
+
+    def test_that_it_rejects_the_methods_not_in_the_table(self):
+        self.assertEqual(self.fetch('/', method='DELETE').code, 405)
+
 
 class TestRequestParam(TestCase):
     def get_app(self):
@@ -152,3 +196,84 @@ class TestRequestError(TestCase):
 
         self.assertEqual(response.code, 501)
         self.assertEqual(response.body, 'Status code')
+
+
+class TestRequestStreamJson(TestCase):
+    def get_app(self):
+        def streaming(request):
+            request.STREAM_CHUNK_SIZE = 16
+
+            count = request.param('count', type=int)
+            items = (dict(n=n) for n in xrange(count))
+
+            if request.param('ndjson', default=False):
+                request.stream_json(items, ndjson=True)
+            else:
+                request.send(items)
+
+        handler = Request.from_function(streaming, methods=['GET'])
+
+        return Backend([('/', handler)])
+
+    def test_that_it_streams_iterators_as_json_arrays(self):
+        response = self.get('/?count=100')
+
+        self.assertTrue('application/json' in response.headers['Content-Type'])
+        self.assertEqual([dict(n=n) for n in range(100)],
+                         json.loads(response.body))
+
+    def test_that_it_streams_empty_iterators(self):
+        self.assertEqual([], json.loads(self.get('/?count=0').body))
+
+    def test_that_it_streams_newline_delimited_json(self):
+        response = self.get('/?count=3&ndjson=1')
+
+        self.assertTrue('ndjson' in response.headers['Content-Type'])
+        self.assertEqual([dict(n=n) for n in range(3)],
+                         map(json.loads, response.body.splitlines()))
+
+
+class TestRequestStreamJsonKeepAlive(TestCase):
+    def get_app(self):
+        app = Plush(__name__)
+
+        @app.get('/')
+        def streaming(request):
+            request.STREAM_CHUNK_SIZE = 16
+            request.send(dict(n=n) for n in xrange(10))
+
+        return app.prepare()
+
+    def test_that_it_frames_the_streams_on_keep_alive_connections(self):
+        stream = IOStream(socket.socket(), io_loop=self.io_loop)
+        stream.connect(('localhost', self.get_http_port()), lambda: (
+            stream.write('GET / HTTP/1.1\r\nHost: localhost\r\n\r\n'),
+            stream.read_until('\r\n\r\n', self.stop)))
+        headers = self.wait()
+
+        stream.read_until('\r\n0\r\n\r\n', self.stop)
+        body = self.wait()
+        stream.close()
+
+        self.assertIn('Transfer-Encoding: chunked', headers)
+        self.assertIn('{"n":9}\r\n1\r\n]', body)
+
+
+class TestRequestNegotiation(TestCase):
+    def get_app(self):
+        handler = Request.from_function(lambda req: req.send([1, 2]),
+                                        methods=['GET'])
+
+        return Backend([('/', handler)])
+
+    def test_that_it_sends_json_by_default(self):
+        response = self.get('/')
+
+        self.assertTrue('application/json' in response.headers['Content-Type'])
+        self.assertEqual('Accept', response.headers['Vary'])
+
+    def test_that_it_sends_the_accepted_representation(self):
+        response = self.get('/', headers={'Accept': 'application/x-ndjson'})
+
+        self.assertTrue('ndjson' in response.headers['Content-Type'])
+        self.assertEqual('1\n2\n', response.body)
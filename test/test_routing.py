@@ -0,0 +1,119 @@
+import unittest
+
+from tornado.web import URLSpec
+
+from plush.backend import Backend
+from plush.testing import TestCase
+from plush.request import Request
+from plush.routing import DispatchIndex, split_literal_prefix, uncapture, \
+                          indexable
+
+
+def index_for(*patterns):
+    return DispatchIndex([URLSpec(pattern, None, name=pattern)
+                          for pattern in patterns])
+
+
+def matched(index, path):
+    spec = index.match(path)
+
+    return spec and spec.name
+
+
+class TestSplitLiteralPrefix(unittest.TestCase):
+    def test_that_it_splits_literal_patterns(self):
+        self.assertEqual(split_literal_prefix('/users/new$'),
+                         ('/users/new', None))
+
+    def test_that_it_splits_dynamic_tails(self):
+        self.assertEqual(split_literal_prefix(r'/users/(\d+)$'),
+                         ('/users/', r'(\d+)'))
+
+    def test_that_it_unescapes_literals(self):
+        self.assertEqual(split_literal_prefix(r'/robots\.txt$'),
+                         ('/robots.txt', None))
+
+    def test_that_it_gives_back_quantified_characters(self):
+        self.assertEqual(split_literal_prefix('/users/?$'),
+                         ('/users', '/?'))
+
+
+class TestUncapture(unittest.TestCase):
+    def test_that_it_rewrites_capturing_groups(self):
+        self.assertEqual(uncapture(r'(\d+)/(?P<name>\w+)'),
+                         r'(?:\d+)/(?:\w+)')
+
+    def test_that_it_keeps_escapes_and_classes(self):
+        self.assertEqual(uncapture(r'\(([()])'), r'\((?:[()])')
+
+
+class TestIndexable(unittest.TestCase):
+    def test_that_plain_patterns_are_indexable(self):
+        self.assertTrue(indexable(r'/users/(\d+|new)$'))
+
+    def test_that_top_level_alternations_are_not(self):
+        self.assertFalse(indexable(r'/users|/people$'))
+
+    def test_that_backreferences_are_not(self):
+        self.assertFalse(indexable(r'/(\w)/\1$'))
+
+
+class TestDispatchIndex(unittest.TestCase):
+    def test_that_it_matches_literal_routes(self):
+        index = index_for('/', '/users', '/users/new')
+
+        self.assertEqual(matched(index, '/users/new'), '/users/new')
+        self.assertEqual(matched(index, '/'), '/')
+
+    def test_that_it_matches_dynamic_routes(self):
+        index = index_for(r'/users/(\d+)', r'/users/(\d+)/posts/(\w+)')
+
+        self.assertEqual(matched(index, '/users/42/posts/hi'),
+                         r'/users/(\d+)/posts/(\w+)')
+        self.assertEqual(matched(index, '/users/42'), r'/users/(\d+)')
+
+    def test_that_the_first_registered_route_wins(self):
+        index = index_for(r'/users/(\w+)', '/users/new', r'/(.*)')
+
+        self.assertEqual(matched(index, '/users/new'), r'/users/(\w+)')
+        self.assertEqual(matched(index, '/people'), r'/(.*)')
+
+    def test_that_it_matches_unindexable_routes_in_order(self):
+        index = index_for(r'/(\w)/\1', r'/(\w)/(\w)')
+
+        self.assertEqual(matched(index, '/a/a'), r'/(\w)/\1')
+        self.assertEqual(matched(index, '/a/b'), r'/(\w)/(\w)')
+
+    def test_that_it_matches_more_routes_than_a_regex_can_hold(self):
+        index = index_for(*[r'/(\d+)/r%d' % n for n in range(250)])
+
+        self.assertEqual(matched(index, '/1/r0'), r'/(\d+)/r0')
+        self.assertEqual(matched(index, '/1/r249'), r'/(\d+)/r249')
+
+    def test_that_it_returns_none_when_nothing_matches(self):
+        index = index_for('/users', r'/users/(\d+)')
+
+        self.assertEqual(matched(index, '/users/abc'), None)
+        self.assertEqual(index.lookup('/nope'), [DispatchIndex.NOT_FOUND])
+
+
+class TestBackendDispatch(TestCase):
+    def get_app(self):
+        def respond_with(text):
+            return lambda request, *args: request.finish(text % args)
+
+        return Backend([
+            (r'/users/new', Request.from_function(respond_with('new'),
+                                                  methods=['GET'])),
+            (r'/users/(\d+)', Request.from_function(respond_with('user %s'),
+                                                    methods=['GET'])),
+        ])
+
+    def test_that_it_dispatches_to_literal_routes(self):
+        self.assertEqual(self.fetch('/users/new').body, 'new')
+
+    def test_that_it_passes_the_matched_groups(self):
+        self.assertEqual(self.fetch('/users/42').body, 'user 42')
+
+    def test_that_it_responds_with_not_found(self):
+        self.assertEqual(self.fetch('/users/abc').code, 404)
@@ -0,0 +1,81 @@
+import time
+
+from tornado.testing import AsyncTestCase
+
+from plush import Plush
+from plush.scheduler import Job
+
+
+class TestJob(AsyncTestCase):
+    def setUp(self):
+        super(TestJob, self).setUp()
+
+        self.app = Plush(__name__, io_loop=self.io_loop)
+        self.runs = []
+
+    def stop_after(self, milliseconds):
+        self.app.defer(milliseconds, self.stop)
+        self.wait()
+
+    def test_that_it_runs_on_the_interval_without_drifting(self):
+        job = self.app.every(20, lambda: self.runs.append(time.time()))
+        started = job.next_run - job.interval
+
+        self.stop_after(110)
+        job.stop()
+
+        self.assertEqual(len(self.runs), 5)
+        for run, at in enumerate(self.runs, 1):
+            self.assertAlmostEqual(at - started, run * 0.02, delta=0.01)
+
+    def test_that_it_skips_the_runs_on_overrun(self):
+        job = self.app.every(10, lambda done: self.runs.append(done),
+                             asynchronous=True)
+
+        self.stop_after(45)
+        job.stop()
+
+        self.assertEqual(len(self.runs), 1)
+        self.assertEqual(job.stats.skipped, 3)
+
+        self.runs[0]()
+
+        self.assertEqual(job.running, 0)
+        self.assertEqual(job.stats.runs, 1)
+
+    def test_that_it_queues_a_run_on_overrun(self):
+        job = self.app.every(10, lambda done: self.runs.append(done),
+                             asynchronous=True, overrun='queue')
+
+        self.stop_after(35)
+        self.runs[0]()
+        job.stop()
+
+        self.assertEqual(len(self.runs), 2)
+        self.assertEqual(job.stats.queued, 1)
+
+    def test_that_it_records_the_failures(self):
+        def failing():
+            raise RuntimeError
+
+        job = self.app.every(10, failing)
+
+        self.stop_after(25)
+        job.stop()
+
+        self.assertEqual(job.stats.failures, 2)
+
+    def test_that_it_waits_for_the_io_loop_to_start_the_jobs(self):
+        app = Plush(__name__)
+        job = app.every(10)(lambda: None)
+
+        self.assertFalse(job.started)
+
+        app.io_loop = self.io_loop
+        app.start_jobs()
+        job.stop()
+
+        self.assertIs(job.io_loop, self.io_loop)
+
+    def test_that_it_validates_the_overrun_policy(self):
+        self.assertRaises(ValueError, Job, 10, lambda: None, overrun='stack')
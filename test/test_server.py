@@ -0,0 +1,73 @@
+import time
+import socket
+
+from tornado.iostream import IOStream
+from tornado.testing import AsyncTestCase
+
+from plush.backend import Backend
+from plush.decorators import asynchronous
+from plush.server import Server
+from plush.testing import TestCase
+from plush.request import Request
+
+
+class TestBackendInFlight(TestCase):
+    def get_app(self):
+        def tracked(request):
+            request.finish(str(request.request in request.application.in_flight))
+
+        def hanging(request):
+            self.stop()
+
+        return Backend([
+            ('/', Request.from_function(tracked, methods=['GET'])),
+            ('/hanging', Request.from_function(hanging, methods=['GET'],
+                                               decorators=[asynchronous])),
+        ])
+
+    def test_that_it_tracks_the_in_flight_requests(self):
+        self.assertEqual(self.fetch('/').body, 'True')
+        self.assertFalse(self._app.in_flight)
+
+    def test_that_it_forgets_the_requests_of_the_closed_connections(self):
+        stream = IOStream(socket.socket(), io_loop=self.io_loop)
+        stream.connect(('localhost', self.get_http_port()), lambda: (
+            stream.write('GET /hanging HTTP/1.1\r\nHost: localhost\r\n\r\n')))
+        self.wait()
+
+        self.assertEqual(len(self._app.in_flight), 1)
+
+        stream.close()
+        self.io_loop.add_timeout(time.time() + 0.05, self.stop)
+        self.wait()
+
+        self.assertFalse(self._app.in_flight)
+
+    def test_that_it_closes_the_connections_when_draining(self):
+        self._app.drain()
+
+        self.assertEqual(self.fetch('/').code, 200)
+        self.assertTrue(self._app.draining)
+
+
+class TestServerDrain(AsyncTestCase):
+    def test_that_it_stops_when_nothing_is_in_flight(self):
+        backend = Backend([])
+        server = Server(backend, self.io_loop)
+
+        self.io_loop.add_callback(server.drain)
+        self.io_loop.start()
+
+        self.assertTrue(backend.draining)
+
+    def test_that_it_waits_for_the_in_flight_requests(self):
+        backend = Backend([])
+        backend.in_flight.add(type('Request', (object,), {'connection': None}))
+
+        server = Server(backend, self.io_loop)
+        server.drain_timeout = 0.2
+
+        self.io_loop.add_callback(server.drain)
+        self.io_loop.start()
+
+        self.assertTrue(backend.in_flight)
@@ -0,0 +1,30 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from plush.util.fs import is_private_directory, ensure_private_directory
+
+
+class PrivateDirectoryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_that_it_creates_private_directories(self):
+        path = os.path.join(self.directory, 'a', 'b')
+
+        self.assertTrue(ensure_private_directory(path))
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o700)
+
+    def test_that_it_rejects_the_directories_others_can_write_to(self):
+        os.chmod(self.directory, 0o777)
+
+        self.assertFalse(is_private_directory(self.directory))
+        self.assertFalse(ensure_private_directory(self.directory))
+
+    def test_that_the_missing_directories_are_not_private(self):
+        self.assertFalse(is_private_directory(
+            os.path.join(self.directory, 'missing')))
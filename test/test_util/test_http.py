@@ -1,6 +1,7 @@
 import unittest
 
-from plush.util.http import parse_content_type, encode_content_type
+from plush.util.http import parse_content_type, encode_content_type, \
+                            parse_accept, negotiate
 
 
 class TestParseContentType(unittest.TestCase):
@@ -16,6 +17,38 @@ class TestParseContentType(unittest.TestCase):
         self.assertEqual(parse_content_type('application/text; charset'),
                          ('application/text', {}))
 
+    def test_that_it_caches_by_the_raw_header(self):
+        self.assertTrue(parse_content_type('text/html; charset=utf-8') is
+                        parse_content_type('text/html; charset=utf-8'))
+
+
+class TestParseAccept(unittest.TestCase):
+    def test_that_it_parses_media_ranges_and_qualities(self):
+        self.assertEqual(parse_accept('text/html, application/json;q=0.5'),
+                         (('text/html', 1.0), ('application/json', 0.5)))
+
+    def test_that_it_skips_invalid_qualities(self):
+        self.assertEqual(parse_accept('text/html;q=high, */*'),
+                         (('*/*', 1.0),))
+
+
+class TestNegotiate(unittest.TestCase):
+    AVAILABLE = ('application/json', 'text/plain')
+
+    def test_that_it_picks_the_first_without_a_header(self):
+        self.assertEqual(negotiate(None, self.AVAILABLE), 'application/json')
+
+    def test_that_it_picks_the_highest_quality(self):
+        self.assertEqual(negotiate('application/json;q=0.2, text/*',
+                                   self.AVAILABLE), 'text/plain')
+
+    def test_that_it_prefers_the_most_specific_range(self):
+        self.assertEqual(negotiate('text/plain;q=0, */*;q=0.5',
+                                   self.AVAILABLE), 'application/json')
+
+    def test_that_it_returns_none_when_nothing_is_acceptable(self):
+        self.assertEqual(negotiate('image/png', self.AVAILABLE), None)
+
 
 class TestEncodeContentType(unittest.TestCase):
     def test_that_it_creates_proper_params(self):
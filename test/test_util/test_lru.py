@@ -0,0 +1,52 @@
+import unittest
+
+from plush.util.lru import LRUCache, memoize
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_that_it_gets_and_sets(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('b', 'default'), 'default')
+
+    def test_that_it_evicts_the_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertTrue('a' in cache)
+        self.assertFalse('b' in cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_that_it_can_limit_the_total_weight(self):
+        cache = LRUCache(5, weigh=len)
+        cache.set('a', 'aaa')
+        cache.set('b', 'bb')
+        cache.set('c', 'c')
+
+        self.assertFalse('a' in cache)
+        self.assertEqual(cache.weight, 3)
+
+    def test_that_it_pops(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+
+        self.assertEqual(cache.pop('a'), 1)
+        self.assertEqual(len(cache), 0)
+
+
+class MemoizeTest(unittest.TestCase):
+    def test_that_it_memoizes_by_arguments(self):
+        calls = []
+
+        @memoize(2)
+        def double(n):
+            calls.append(n)
+            return n * 2
+
+        self.assertEqual([double(1), double(1), double(2)], [2, 2, 4])
+        self.assertEqual(calls, [1, 2])
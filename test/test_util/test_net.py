@@ -0,0 +1,37 @@
+import socket
+import unittest
+
+from plush.util.net import REUSE_PORT_SUPPORTED, bind_sockets, clone_sockets
+
+
+class BindSocketsTest(unittest.TestCase):
+    def tearDown(self):
+        for sock in getattr(self, 'sockets', []):
+            sock.close()
+
+    def test_that_it_binds_listening_sockets(self):
+        self.sockets = bind_sockets(0, '127.0.0.1')
+        port = self.sockets[0].getsockname()[1]
+
+        client = socket.create_connection(('127.0.0.1', port))
+        client.close()
+
+    def test_that_it_can_only_reserve_the_address(self):
+        self.sockets = bind_sockets(0, '127.0.0.1', listen=False)
+        port = self.sockets[0].getsockname()[1]
+
+        with self.assertRaises(socket.error):
+            socket.create_connection(('127.0.0.1', port))
+
+    @unittest.skipUnless(REUSE_PORT_SUPPORTED, 'SO_REUSEPORT unsupported')
+    def test_that_it_clones_reuse_port_sockets(self):
+        self.sockets = bind_sockets(0, '127.0.0.1', reuse_port=True,
+                                    listen=False)
+        clones = clone_sockets(self.sockets)
+        self.sockets.extend(clones)
+
+        self.assertEqual(clones[0].getsockname(),
+                         self.sockets[0].getsockname())
+
+        client = socket.create_connection(clones[0].getsockname())
+        client.close()
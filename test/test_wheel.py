@@ -0,0 +1,86 @@
+from tornado.testing import AsyncTestCase
+
+from plush.wheel import TimingWheel
+from plush.deferred import Deferred
+
+
+class TestTimingWheel(AsyncTestCase):
+    def setUp(self):
+        super(TestTimingWheel, self).setUp()
+
+        self.wheel = TimingWheel(resolution=10, bits=2, levels=3,
+                                 io_loop=self.io_loop)
+        self.wheel.start = lambda: None
+        self.fired = []
+
+    def advance(self, ticks):
+        for _ in xrange(ticks):
+            self.wheel.advance()
+
+    def test_that_it_fires_the_timers_at_their_deadline(self):
+        for milliseconds in [10, 25, 70, 200, 640, 1000]:
+            self.wheel.schedule(milliseconds, lambda ms=milliseconds:
+                                self.fired.append((ms, self.wheel.current)))
+
+        self.advance(200)
+
+        self.assertEqual(self.fired, [(10, 1), (25, 3), (70, 7), (200, 20),
+                                      (640, 64), (1000, 100)])
+        self.assertEqual(self.wheel.pending, 0)
+
+    def test_that_it_does_not_fire_the_canceled_timers(self):
+        timer = self.wheel.schedule(100, lambda: self.fired.append(True))
+        timer.cancel()
+        timer.cancel()
+
+        self.advance(20)
+
+        self.assertFalse(self.fired)
+        self.assertFalse(timer.active)
+        self.assertEqual(self.wheel.pending, 0)
+
+    def test_that_the_callbacks_can_cancel_the_timers_of_the_same_tick(self):
+        timers = []
+
+        def cancel_the_others():
+            self.fired.append(True)
+            for timer in timers:
+                timer.cancel()
+
+        timers.extend(self.wheel.schedule(20, cancel_the_others)
+                      for _ in xrange(2))
+
+        self.advance(5)
+
+        self.assertEqual(self.fired, [True])
+        self.assertEqual(self.wheel.pending, 0)
+
+    def test_that_it_reschedules_the_timers_past_its_span(self):
+        self.wheel.schedule(1500, lambda: self.fired.append(
+            self.wheel.current))
+
+        self.advance(200)
+
+        self.assertEqual(self.fired, [150])
+
+
+class TestDeferredOnTimingWheel(AsyncTestCase):
+    def test_that_it_calls_the_callback(self):
+        wheel = TimingWheel(resolution=5, io_loop=self.io_loop)
+        Deferred(10, self.stop, self.io_loop, wheel=wheel)
+
+        self.wait()
+
+        self.assertIsNone(wheel.ticker)
+
+    def test_that_it_can_be_canceled(self):
+        wheel = TimingWheel(resolution=5, io_loop=self.io_loop)
+        fired = []
+
+        Deferred(10, lambda: fired.append(True), self.io_loop,
+                 wheel=wheel).cancel()
+        Deferred(20, self.stop, self.io_loop, wheel=wheel)
+
+        self.wait()
+
+        self.assertFalse(fired)